@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from ts.cache import LRUTTLCache
+
+User = get_user_model()
+
+# 인증에 필요한 컬럼만 캐시합니다. password(1000자)는 지연 로딩되며 check_password 등에서만 조회됩니다.
+# login/last_seen은 다른 프로세스의 presence tracker가 계속 갱신하므로 캐시하지 않습니다.
+# 지연 로딩된 필드는 save() 시 기록되지 않으므로, 캐시된 사용자를 저장해도 오래된 접속 상태를 덮어쓰지 않습니다.
+USER_CACHE_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields if field.attname not in ('password', 'login', 'last_seen')
+)
+
+user_cache = LRUTTLCache(
+    maxsize=settings.USER_CACHE['MAX_SIZE'],
+    ttl=settings.USER_CACHE['TTL'],
+)
+
+
+def _load_user_values(user_id):
+    return User.objects.filter(id=user_id).values_list(*USER_CACHE_FIELDS).first()
+
+
+def get_cached_user(user_id):
+    """
+    user_id로 사용자를 조회하며, 캐시에 있으면 DB를 거치지 않습니다.
+    - 캐시에는 컬럼 값만 저장하고 요청마다 새 User 인스턴스를 만들어 반환하므로,
+      뷰에서 request.user를 수정해도 다른 요청에 영향을 주지 않습니다.
+    - User.save()/delete() 시 signals에서 무효화됩니다.
+    """
+    values = user_cache.get_or_set(user_id, lambda: _load_user_values(user_id))
+    if values is None:
+        raise User.DoesNotExist('User matching query does not exist.')
+    return User.from_db(DEFAULT_DB_ALIAS, USER_CACHE_FIELDS, values)
+
+
+def invalidate_cached_user(*user_ids):
+    user_cache.invalidate(*user_ids)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication과 동일하게 동작하지만, 토큰의 user_id를 캐시된 사용자로 변환합니다.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        try:
+            user = get_cached_user(user_id)
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
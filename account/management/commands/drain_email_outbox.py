@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from account.outbox import worker
+
+
+class Command(BaseCommand):
+    help = 'email_outbox 테이블의 발송 대기 메일을 발송합니다. --loop를 주면 별도 프로세스로 계속 실행합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true')
+        parser.add_argument('--interval', type=float, default=None)
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or worker.config['POLL_INTERVAL']
+        while True:
+            sent = worker.drain()
+            if sent or not options['loop']:
+                self.stdout.write(f'{sent}건 발송, {worker.stats()}')
+            if not options['loop']:
+                break
+            close_old_connections()
+            time.sleep(interval)
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    # username__istartswith는 PostgreSQL에서 UPPER("username"::text) LIKE UPPER('...%')로 실행되므로
+    # 같은 식에 text_pattern_ops 인덱스를 만들어 DB 콜레이션과 관계없이 접두사 검색에 쓰이도록 함
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS user_username_upper_prefix_idx ON "user" (UPPER("username"::text) text_pattern_ops)'
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS user_username_upper_prefix_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0013_user_last_seen'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import (BaseUserManager, AbstractBaseUser, PermissionsMixin)
 
 
@@ -60,6 +61,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     image = models.ImageField(upload_to='images/', blank=True, null=True, default='images/default.png')
 
     login = models.BooleanField(default=False)
+    last_seen = models.DateTimeField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -74,6 +76,10 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     class Meta:
         db_table = 'user'
+        indexes = [
+            # presence sweeper가 온라인 사용자만 빠르게 찾기 위한 부분 인덱스
+            models.Index(fields=['login'], condition=models.Q(login=True), name='user_online_idx'),
+        ]
 
 
 class EmailVerification(models.Model):
@@ -90,3 +96,31 @@ class EmailVerification(models.Model):
     class Meta:
         db_table = 'user_email_verification'
 
+
+
+class EmailOutbox(models.Model):
+    """
+    발송 대기 중인 이메일을 저장하는 outbox 테이블입니다.
+    - 요청 트랜잭션 안에서는 행만 기록하고, 실제 SMTP 발송은 커밋 이후 account.outbox의 워커가 처리합니다.
+    - 발송에 실패하면 attempts를 늘리고 next_attempt_at을 지수적으로 미뤄 재시도합니다.
+    """
+    STATUS = (
+        ('PENDING', 'pending'),
+        ('SENT', 'sent'),
+        ('FAILED', 'failed'),
+    )
+    to = models.EmailField(max_length=254)
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    status = models.CharField(choices=STATUS, max_length=7, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True)
+
+    class Meta:
+        db_table = 'email_outbox'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_due_idx'),
+        ]
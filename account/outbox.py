@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(to, subject, body):
+    """
+    이메일을 outbox에 기록하고, 트랜잭션이 커밋된 뒤 워커를 깨웁니다.
+    SMTP 연결은 요청 트랜잭션 밖에서 워커가 맺으므로 요청이 SMTP 응답을 기다리지 않습니다.
+    """
+    mail = EmailOutbox.objects.create(to=to, subject=subject, body=body)
+    transaction.on_commit(worker.wake)
+    return mail
+
+
+class OutboxWorker:
+    """
+    email_outbox 테이블을 비우는 백그라운드 워커입니다.
+    - 한 번의 drain 동안 SMTP 연결 하나를 재사용하며, BATCH_SIZE 단위로 행을 가져와 발송합니다.
+    - 가져온 행은 LEASE초 동안 다른 워커가 가져가지 않도록 next_attempt_at을 미뤄둔 뒤 트랜잭션 밖에서 발송합니다.
+    - 실패한 행은 BACKOFF_BASE * 2^(attempts-1)초(최대 BACKOFF_MAX) 후 재시도하고, MAX_ATTEMPTS를 넘으면 FAILED로 남깁니다.
+    - 테스트에서는 스레드를 띄우지 않고 drain()을 직접 호출합니다.
+    """
+
+    def __init__(self, config=None):
+        self._config = config
+        self._event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = False
+        self.sent = 0
+        self.failed = 0
+        self.send_latency_total = 0.0
+        self.send_latency_max = 0.0
+        self.delivery_latency_max = 0.0
+
+    @property
+    def config(self):
+        return self._config or settings.EMAIL_OUTBOX
+
+    # 스레드 관리
+    def wake(self):
+        if not self.config['AUTOSTART']:
+            return
+        self.start()
+        self._event.set()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='email-outbox', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stopping = True
+        self._event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopping:
+            self._event.wait(self.config['POLL_INTERVAL'])
+            self._event.clear()
+            try:
+                self.drain()
+            except Exception:
+                logger.exception('email outbox drain failed')
+            finally:
+                close_old_connections()
+
+    # 발송
+    def claim_batch(self):
+        now = timezone.now()
+        with transaction.atomic():
+            rows = list(
+                EmailOutbox.objects.select_for_update(skip_locked=True)
+                .filter(status='PENDING', next_attempt_at__lte=now)
+                .order_by('next_attempt_at', 'id')[:self.config['BATCH_SIZE']]
+            )
+            if rows:
+                EmailOutbox.objects.filter(id__in=[row.id for row in rows]).update(
+                    next_attempt_at=now + timedelta(seconds=self.config['LEASE'])
+                )
+        return rows
+
+    def drain(self):
+        """
+        발송 가능한 행이 없을 때까지 배치를 반복해서 발송하고, 발송에 성공한 건수를 반환합니다.
+        """
+        total = 0
+        connection = None
+        try:
+            while True:
+                rows = self.claim_batch()
+                if not rows:
+                    break
+                if connection is None:
+                    try:
+                        connection = get_connection()
+                        connection.open()
+                    except Exception as e:
+                        # SMTP에 연결하지 못하면 가져온 행을 실패로 기록하여 백오프 후 재시도하도록 함
+                        # (그대로 빠져나가면 임대 시간이 지날 때마다 시도 횟수 없이 다시 가져가게 됨)
+                        for row in rows:
+                            self._mark_failed(row, e)
+                        connection = None
+                        break
+                total += self.send_batch(connection, rows)
+        finally:
+            if connection is not None:
+                connection.close()
+        return total
+
+    def send_batch(self, connection, rows):
+        sent_ids = []
+        for row in rows:
+            message = EmailMessage(row.subject, row.body, to=[row.to], connection=connection)
+            started = time.monotonic()
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                self._mark_failed(row, e)
+                continue
+            elapsed = time.monotonic() - started
+            self.send_latency_total += elapsed
+            self.send_latency_max = max(self.send_latency_max, elapsed)
+            sent_ids.append(row.id)
+
+        if sent_ids:
+            now = timezone.now()
+            EmailOutbox.objects.filter(id__in=sent_ids).update(status='SENT', sent_at=now, last_error='')
+            self.sent += len(sent_ids)
+            for row in rows:
+                if row.id in sent_ids:
+                    self.delivery_latency_max = max(self.delivery_latency_max, (now - row.created_at).total_seconds())
+        return len(sent_ids)
+
+    def _mark_failed(self, row, error):
+        attempts = row.attempts + 1
+        fields = {'attempts': attempts, 'last_error': str(error)}
+        if attempts >= self.config['MAX_ATTEMPTS']:
+            fields['status'] = 'FAILED'
+            self.failed += 1
+        else:
+            delay = min(self.config['BACKOFF_BASE'] * 2 ** (attempts - 1), self.config['BACKOFF_MAX'])
+            fields['next_attempt_at'] = timezone.now() + timedelta(seconds=delay)
+        EmailOutbox.objects.filter(id=row.id).update(**fields)
+        logger.warning('email outbox send failed (id=%s, attempts=%s): %s', row.id, attempts, error)
+
+    # 지표
+    def queue_depth(self):
+        return EmailOutbox.objects.filter(status='PENDING').count()
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue_depth(),
+            'sent': self.sent,
+            'failed': self.failed,
+            'send_latency_avg': (self.send_latency_total / self.sent) if self.sent else 0,
+            'send_latency_max': self.send_latency_max,
+            'delivery_latency_max': self.delivery_latency_max,
+        }
+
+
+worker = OutboxWorker()
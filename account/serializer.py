@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate, get_user_model
-from game.models import Game
+from game.models import UserStats
 from rest_framework_simplejwt.tokens import RefreshToken
 
 
@@ -72,19 +72,22 @@ class UserProfileStatsSerializer(serializers.ModelSerializer):
         model = User
         fields = ('username', 'image', 'win_rate', 'wins', 'losses')
 
+    def _get_stats(self, obj):
+        # user_stats 테이블에 행이 없으면 전적이 없는 사용자
+        try:
+            return obj.game_stats
+        except UserStats.DoesNotExist:
+            return UserStats(user=obj)
+
     def get_win_rate(self, obj):
-        # 승률 계산 로직
-        games_won = Game.objects.filter(winner=obj, player2__isnull=False).count()
-        games_lost = Game.objects.filter(loser=obj, player2__isnull=False).count()
-        total_games = games_won + games_lost
-        return (games_won / total_games * 100) if total_games > 0 else 0
+        return self._get_stats(obj).win_rate
 
     def get_wins(self, obj):
-        return Game.objects.filter(winner=obj, player2__isnull=False).count()
+        return self._get_stats(obj).wins
 
     def get_losses(self, obj):
-        return Game.objects.filter(loser=obj, player2__isnull=False).count()
-    
+        return self._get_stats(obj).losses
+
 class User2FASerializer(serializers.ModelSerializer):
     class Meta:
         model = User
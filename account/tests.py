@@ -0,0 +1,175 @@
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from loginCheck.middleware import get_user_from_token
+from .authentication import CachedJWTAuthentication, user_cache
+from .models import EmailOutbox, User
+from .outbox import OutboxWorker, enqueue
+
+
+class UnreachableBackend(BaseEmailBackend):
+    """SMTP 서버에 연결할 수 없는 상황"""
+
+    def open(self):
+        raise ConnectionRefusedError('smtp is down')
+
+    def send_messages(self, email_messages):
+        raise AssertionError('연결에 실패했으면 발송하지 않아야 함')
+
+
+class RejectingBackend(BaseEmailBackend):
+    """연결은 되지만 메시지 발송이 실패하는 상황"""
+
+    def send_messages(self, email_messages):
+        raise ValueError('mailbox unavailable')
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class EmailOutboxTest(TestCase):
+    def setUp(self):
+        self.worker = OutboxWorker({**settings.EMAIL_OUTBOX, 'AUTOSTART': False, 'MAX_ATTEMPTS': 3,
+                                    'BACKOFF_BASE': 5, 'BACKOFF_MAX': 600, 'LEASE': 60})
+
+    def make_due(self):
+        EmailOutbox.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+    def test_enqueue_then_drain_delivers(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            row = enqueue('user@test.com', 'subject', 'body')
+        self.assertEqual(self.worker.drain(), 1)
+        self.assertEqual([message.to for message in mail.outbox], [['user@test.com']])
+        row.refresh_from_db()
+        self.assertEqual(row.status, 'SENT')
+        self.assertIsNotNone(row.sent_at)
+        # 보낸 행은 다시 보내지 않음
+        self.assertEqual(self.worker.drain(), 0)
+
+    @override_settings(EMAIL_BACKEND='account.tests.RejectingBackend')
+    def test_send_failure_backs_off_and_counts_attempts(self):
+        row = enqueue('user@test.com', 'subject', 'body')
+        for attempts, delay in ((1, 5), (2, 10)):
+            before = timezone.now()
+            self.assertEqual(self.worker.drain(), 0)
+            row.refresh_from_db()
+            self.assertEqual((row.status, row.attempts), ('PENDING', attempts))
+            self.assertIn('mailbox unavailable', row.last_error)
+            self.assertGreaterEqual(row.next_attempt_at, before + timedelta(seconds=delay))
+            self.make_due()
+
+        self.worker.drain()
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), ('FAILED', 3))
+
+    @override_settings(EMAIL_BACKEND='account.tests.UnreachableBackend')
+    def test_connection_failure_marks_claimed_rows_failed(self):
+        rows = [enqueue(f'user{i}@test.com', 'subject', 'body') for i in range(2)]
+        before = timezone.now()
+        self.assertEqual(self.worker.drain(), 0)
+        for row in rows:
+            row.refresh_from_db()
+            self.assertEqual((row.status, row.attempts), ('PENDING', 1))
+            self.assertIn('smtp is down', row.last_error)
+            # 임대 시간(60초)이 아니라 백오프(5초) 후에 다시 시도
+            self.assertLess(row.next_attempt_at, before + timedelta(seconds=60))
+
+    def test_expired_lease_is_reclaimed(self):
+        row = enqueue('user@test.com', 'subject', 'body')
+        self.assertEqual([claimed.id for claimed in self.worker.claim_batch()], [row.id])
+        # 임대 중인 행은 다른 워커가 가져가지 않음
+        self.assertEqual(self.worker.claim_batch(), [])
+
+        # 발송 전에 워커가 죽어 임대 시간이 지나면 다시 가져감
+        self.make_due()
+        self.assertEqual([claimed.id for claimed in self.worker.claim_batch()], [row.id])
+        self.make_due()
+        self.assertEqual(self.worker.drain(), 1)
+
+
+class CachedJWTAuthenticationTest(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user('user', 'user@test.com', 'password')
+        self.token = AccessToken.for_user(self.user)
+        self.authenticator = CachedJWTAuthentication()
+
+    def authenticate(self, token=None):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token or self.token}')
+        user, _ = self.authenticator.authenticate(request)
+        return user
+
+    def test_second_request_uses_cache(self):
+        with self.assertNumQueries(1):
+            first = self.authenticate()
+        with self.assertNumQueries(0):
+            second = self.authenticate()
+        self.assertEqual(second.pk, self.user.pk)
+        # 요청마다 새 인스턴스를 반환하므로 한 요청에서 수정해도 다른 요청에 영향이 없음
+        self.assertIsNot(first, second)
+        first.username = 'changed'
+        self.assertEqual(self.authenticate().username, 'user')
+
+    def test_user_save_invalidates_cache(self):
+        self.authenticate()
+        self.user.username = 'renamed'
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate().username, 'renamed')
+
+    def test_saving_cached_user_keeps_presence(self):
+        self.authenticate()
+        # 다른 프로세스의 presence tracker가 접속 상태를 기록
+        seen_at = timezone.now()
+        User.objects.filter(id=self.user.id).update(login=True, last_seen=seen_at)
+
+        user = self.authenticate()
+        user.image = 'avatar.png'
+        user.save()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        response = client.patch('/api/account/change-username/', {'new_username': 'renamed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.username, self.user.image.name, self.user.login, self.user.last_seen),
+                         ('renamed', 'avatar.png', True, seen_at))
+
+    def test_inactive_user_is_rejected(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaisesMessage(AuthenticationFailed, 'User is inactive'):
+            self.authenticate()
+
+    def test_deleted_user_is_rejected(self):
+        self.authenticate()
+        self.user.delete()
+        with self.assertRaisesMessage(AuthenticationFailed, 'User not found'):
+            self.authenticate()
+
+
+class TokenAuthMiddlewareUserTest(TransactionTestCase):
+    """웹소켓 인증도 같은 캐시를 사용하며, 비활성화/삭제된 사용자는 익명 사용자로 처리됨"""
+
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user('user', 'user@test.com', 'password')
+        self.token = str(AccessToken.for_user(self.user))
+
+    async def test_inactive_or_deleted_user_is_anonymous(self):
+        self.assertEqual((await get_user_from_token(self.token)).pk, self.user.pk)
+
+        self.user.is_active = False
+        await sync_to_async(self.user.save)()
+        self.assertTrue((await get_user_from_token(self.token)).is_anonymous)
+
+        await sync_to_async(self.user.delete)()
+        self.assertTrue((await get_user_from_token(self.token)).is_anonymous)
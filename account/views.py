@@ -8,7 +8,6 @@ import pytz
 import requests
 from django.conf import settings
 from django.contrib.auth.hashers import make_password
-from django.core.mail import EmailMessage
 from django.db import IntegrityError, transaction
 from django.http import HttpResponse
 from rest_framework import generics, status
@@ -20,7 +19,9 @@ from rest_framework.views import APIView
 from rest_framework.viewsets import ViewSet
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from game.models import Game
+from game.models import Game, UserStats
+from game.results import attach_player2
+from . import outbox
 from .models import EmailVerification, User
 from .serializer import (User2FASerializer, UserDetailSerializer, UserImageUpdateSerializer, UserLanguageUpdateSerializer,
                          UserProfileStatsSerializer, UserSigninSerializer, UserSignupSerializer)
@@ -178,7 +179,7 @@ class EmailService:
                 if datetime.now(pytz.UTC) - user.emailverification.updated_at < timedelta(minutes=5):
                     verification.delete()
                     user.is_verified = True
-                    user.save()
+                    user.save(update_fields=['is_verified'])
                     return True
         return False
 
@@ -208,9 +209,8 @@ class EmailService:
         code = cls.get_verification_code()
         cls.email_verification_update(user, code, code_type)
         content = "다음 코드를 인증창에 입력해주세요.\n" + code
-        to = [user.email]
-        mail = EmailMessage("Verification code for TS", content, to=to)
-        mail.send()
+        # 실제 발송은 트랜잭션 커밋 후 outbox 워커가 처리
+        outbox.enqueue(user.email, "Verification code for TS", content)
 
 class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
@@ -270,11 +270,8 @@ class UserProfileStatsView(APIView):
 
     def get(self, request, *args, **kwargs):
         user = request.user
-        # player2가 존재하는 게임만 고려
-        games_won = Game.objects.filter(winner=user, player2__isnull=False).count()
-        games_lost = Game.objects.filter(loser=user, player2__isnull=False).count()
-        total_games = games_won + games_lost
-        win_rate = (games_won / total_games * 100) if total_games > 0 else 0
+        # player2가 존재하는 게임만 집계된 user_stats 테이블을 기본키로 조회
+        stats = UserStats.objects.filter(user_id=user.id).first() or UserStats(user_id=user.id)
 
         user_info = {
             "user_id": user.id,
@@ -285,9 +282,9 @@ class UserProfileStatsView(APIView):
         }
 
         game_info = {
-            "win_rate": win_rate,
-            "wins": games_won,
-            "losses": games_lost,
+            "win_rate": stats.win_rate,
+            "wins": stats.wins,
+            "losses": stats.losses,
         }
 
         return Response({
@@ -314,7 +311,7 @@ class ChangeUsernameView(APIView):
             return Response({'error': '새로운 username을 제공해야 합니다.'}, status=status.HTTP_400_BAD_REQUEST)
         try:
             user.username = new_username
-            user.save()
+            user.save(update_fields=['username'])
             return Response({'message': 'username이 성공적으로 변경되었습니다.'}, status=status.HTTP_200_OK)
         except IntegrityError:
             return Response({'error': '이미 존재하는 username입니다.'}, status=status.HTTP_409_CONFLICT)
@@ -359,7 +356,7 @@ class ChangePasswordView(generics.UpdateAPIView):
         if not user.check_password(old_password):
             return Response({"error": "기존 비밀번호가 일치하지 않습니다."}, status=status.HTTP_400_BAD_REQUEST)
         user.password = make_password(new_password)
-        user.save()
+        user.save(update_fields=['password'])
         return Response({"message": "비밀번호가 성공적으로 변경되었습니다."}, status=status.HTTP_200_OK)
 
 
@@ -377,7 +374,7 @@ class OtherUserProfileStatsView(APIView):
     def get(self, request, *args, **kwargs):
         user_id = kwargs.get('user_id')
         try:
-            user = User.objects.get(id=user_id)
+            user = User.objects.select_related('game_stats').get(id=user_id)
             serializer = UserProfileStatsSerializer(user)
             return Response(serializer.data)
         except User.DoesNotExist:
@@ -507,18 +504,15 @@ class Verify2FAView(APIView):
         
         if EmailService.verify_email(user, code, '2fa'):
             try:
-                game = Game.objects.get(game_id=game_id)
-                if game.player2 is not None:
-                    return Response({"error": "이미 player2가 등록된 게임입니다."}, status=status.HTTP_400_BAD_REQUEST)
-                
-                # 2FA 인증이 성공하면, player2를 업데이트
-                game.player2 = user
-                # winner와 loser 중 null인 필드에 player2를 할당
-                if game.winner is None and game.loser is not None:
-                    game.winner = user
-                elif game.loser is None and game.winner is not None:
-                    game.loser = user
-                game.save()
+                with transaction.atomic():
+                    game = Game.objects.get(game_id=game_id)
+                    if game.player2 is not None:
+                        return Response({"error": "이미 player2가 등록된 게임입니다."}, status=status.HTTP_400_BAD_REQUEST)
+
+                    # 2FA 인증이 성공하면, player2를 등록하고 winner와 loser 중 null인 필드에 player2를 할당
+                    # (version 조건부 UPDATE이므로 동시에 들어온 재시도는 하나만 성공)
+                    if not attach_player2(game, user):
+                        return Response({"error": "이미 player2가 등록된 게임입니다."}, status=status.HTTP_400_BAD_REQUEST)
                 return Response({"message": "2FA 인증이 성공적으로 완료되었으며, 게임 결과가 업데이트 되었습니다."}, status=status.HTTP_200_OK)
             except Game.DoesNotExist:
                 return Response({"error": "해당 게임 ID의 게임을 찾을 수 없습니다."}, status=status.HTTP_404_NOT_FOUND)
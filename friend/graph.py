@@ -0,0 +1,112 @@
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models import Q
+
+from ts.cache import LRUTTLCache
+from .models import Friends, FriendStatus
+
+
+class FriendAdjacency(namedtuple('FriendAdjacency', ['friends', 'pending_in', 'pending_out'])):
+    """
+    한 사용자의 친구 관계를 정렬된 int64 배열(array('q'))로 보관합니다.
+    - friends: 수락된 친구 id
+    - pending_in: 나에게 친구 요청을 보낸 사용자 id
+    - pending_out: 내가 친구 요청을 보낸 사용자 id
+    """
+
+    @staticmethod
+    def _contains(values, user_id):
+        index = bisect_left(values, user_id)
+        return index < len(values) and values[index] == user_id
+
+    def is_friend(self, user_id):
+        return self._contains(self.friends, user_id)
+
+    def has_pending_in(self, user_id):
+        return self._contains(self.pending_in, user_id)
+
+    def has_pending_out(self, user_id):
+        return self._contains(self.pending_out, user_id)
+
+    def related(self):
+        """친구이거나 요청을 주고받은 모든 사용자 id"""
+        return set(self.friends).union(self.pending_in, self.pending_out)
+
+
+class FriendGraph:
+    """
+    사용자별 친구/대기 중 요청 id 집합을 프로세스 내부에 캐시하는 서비스입니다.
+    - 캐시에 없는 사용자들은 friends 테이블을 한 번에 조회하여 채웁니다.
+    - Friends의 post_save/post_delete와, 시그널이 발생하지 않는 queryset update()/delete()가 커밋된 이후에
+      양쪽 사용자의 항목이 무효화됩니다.
+    - 다른 프로세스에서 일어난 변경은 최대 TTL초 동안 반영되지 않을 수 있으므로,
+      정확성이 필요한 쓰기 경로에서는 DB를 기준으로 판단합니다.
+    """
+
+    def __init__(self, maxsize=None, ttl=None):
+        self._cache = LRUTTLCache(
+            maxsize=maxsize or settings.FRIEND_GRAPH['CACHE_SIZE'],
+            ttl=ttl or settings.FRIEND_GRAPH['TTL'],
+        )
+
+    def get(self, user_id):
+        return self.get_many([user_id])[user_id]
+
+    def get_many(self, user_ids):
+        result = {}
+        cold = []
+        for user_id in user_ids:
+            adjacency = self._cache.get(user_id)
+            if adjacency is None:
+                cold.append(user_id)
+            else:
+                result[user_id] = adjacency
+        if cold:
+            result.update(self._load(cold))
+        return result
+
+    def _load(self, user_ids):
+        generation = self._cache.generation
+        user_ids = set(user_ids)
+        buckets = {user_id: ([], [], []) for user_id in user_ids}
+        rows = (Friends.objects.filter(Q(user1_id__in=user_ids) | Q(user2_id__in=user_ids))
+                .values_list('user1_id', 'user2_id', 'status'))
+        for user1_id, user2_id, status in rows.iterator(chunk_size=2000):
+            accepted = status == FriendStatus.ACCEPTED
+            if user1_id in buckets:
+                friends, _, pending_out = buckets[user1_id]
+                (friends if accepted else pending_out).append(user2_id)
+            if user2_id in buckets:
+                friends, pending_in, _ = buckets[user2_id]
+                (friends if accepted else pending_in).append(user1_id)
+
+        result = {}
+        for user_id, lists in buckets.items():
+            adjacency = FriendAdjacency(*(array('q', sorted(values)) for values in lists))
+            self._cache.set(user_id, adjacency, generation=generation)
+            result[user_id] = adjacency
+        return result
+
+    def friend_ids(self, user_id):
+        return self.get(user_id).friends
+
+    def are_friends(self, user_a_id, user_b_id):
+        return self.get(user_a_id).is_friend(user_b_id)
+
+    def pending_count(self, user_id):
+        return len(self.get(user_id).pending_in)
+
+    def invalidate(self, *user_ids):
+        self._cache.invalidate(*user_ids)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+
+friend_graph = FriendGraph()
@@ -0,0 +1,70 @@
+from django.db import migrations, models
+
+
+def backfill_canonical_pair(apps, schema_editor):
+    """
+    기존 행의 (pair_low, pair_high)를 채웁니다.
+    같은 두 사용자 사이에 방향만 다른 중복 행이 있으면 ACCEPTED 행(없으면 가장 먼저 생성된 행)만 남깁니다.
+    """
+    Friends = apps.get_model('friend', 'Friends')
+    kept = {}
+    duplicates = []
+    rows = Friends.objects.order_by('id').values_list('id', 'user1_id', 'user2_id', 'status')
+    for friend_id, user1_id, user2_id, status in rows.iterator(chunk_size=2000):
+        pair = (user1_id, user2_id) if user1_id < user2_id else (user2_id, user1_id)
+        if pair in kept:
+            kept_id, kept_status = kept[pair]
+            if kept_status != 'ACCEPTED' and status == 'ACCEPTED':
+                duplicates.append(kept_id)
+                kept[pair] = (friend_id, status)
+            else:
+                duplicates.append(friend_id)
+        else:
+            kept[pair] = (friend_id, status)
+
+    for start in range(0, len(duplicates), 1000):
+        Friends.objects.filter(id__in=duplicates[start:start + 1000]).delete()
+
+    updates = []
+    for (pair_low, pair_high), (friend_id, _) in kept.items():
+        updates.append(Friends(id=friend_id, pair_low=pair_low, pair_high=pair_high))
+    Friends.objects.bulk_update(updates, ['pair_low', 'pair_high'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('friend', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='friends',
+            name='pair_low',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='friends',
+            name='pair_high',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.RunPython(backfill_canonical_pair, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='friends',
+            name='pair_low',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='friends',
+            name='pair_high',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='friends',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='friends',
+            constraint=models.UniqueConstraint(fields=('pair_low', 'pair_high'), name='friends_pair_unique'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('friend', '0002_friends_canonical_pair'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='friends',
+            index=models.Index(fields=['user2', 'status', 'id'], name='friends_user2_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friends',
+            index=models.Index(fields=['user1', 'status', 'id'], name='friends_user1_status_idx'),
+        ),
+    ]
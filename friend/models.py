@@ -8,6 +8,12 @@ class FriendStatus(models.TextChoices):
     ACCEPTED = 'ACCEPTED', _('Accepted')
 
 class Friends(models.Model):
+    """
+    두 사용자 사이의 친구 요청/친구 관계입니다.
+    - user1은 요청을 보낸 사용자, user2는 요청을 받은 사용자입니다.
+    - pair_low/pair_high에는 두 user id를 정렬한 (작은 id, 큰 id) 쌍이 저장되며, 이 쌍에 unique 인덱스가 있어
+      방향과 관계없이 두 사용자 사이에는 하나의 행만 존재합니다. 저장 시 자동으로 채워집니다.
+    """
     user1 = models.ForeignKey(AppUser, on_delete=models.CASCADE, related_name='friends_user1')
     user2 = models.ForeignKey(AppUser, on_delete=models.CASCADE, related_name='friends_user2')
     status = models.CharField(
@@ -15,8 +21,35 @@ class Friends(models.Model):
         choices=FriendStatus.choices,
         default=FriendStatus.PENDING
     )
+    pair_low = models.BigIntegerField()
+    pair_high = models.BigIntegerField()
+
     class Meta:
-        unique_together = ('user1', 'user2')
         db_table = 'friends'
         ordering = ['id']
-        
\ No newline at end of file
+        constraints = [
+            models.UniqueConstraint(fields=['pair_low', 'pair_high'], name='friends_pair_unique'),
+        ]
+        indexes = [
+            # 받은 요청 목록(user2 기준)과 친구 목록(user1/user2 기준)을 id 순으로 조회
+            models.Index(fields=['user2', 'status', 'id'], name='friends_user2_status_idx'),
+            models.Index(fields=['user1', 'status', 'id'], name='friends_user1_status_idx'),
+        ]
+
+    @staticmethod
+    def canonical_pair(user_a_id, user_b_id):
+        return (user_a_id, user_b_id) if user_a_id < user_b_id else (user_b_id, user_a_id)
+
+    @classmethod
+    def between(cls, user_a_id, user_b_id):
+        """두 사용자 사이의 관계를 (pair_low, pair_high) 인덱스 한 번으로 조회하는 queryset"""
+        pair_low, pair_high = cls.canonical_pair(user_a_id, user_b_id)
+        return cls.objects.filter(pair_low=pair_low, pair_high=pair_high)
+
+    @classmethod
+    def are_friends(cls, user_a_id, user_b_id):
+        return cls.between(user_a_id, user_b_id).filter(status=FriendStatus.ACCEPTED).exists()
+
+    def save(self, *args, **kwargs):
+        self.pair_low, self.pair_high = self.canonical_pair(self.user1_id, self.user2_id)
+        super().save(*args, **kwargs)
@@ -0,0 +1,48 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from .graph import friend_graph
+
+logger = logging.getLogger(__name__)
+
+
+def friend_notification_group_name(user_id):
+    return f'friend_notify_{user_id}'
+
+
+def publish_friend_events(event, actor, rows):
+    """
+    커밋 이후 친구 요청의 양쪽 사용자 그룹(friend_notify_<id>)에 이벤트를 보냅니다.
+    - rows: [(friend_request_id, user1_id, user2_id), ...]
+    - 각 사용자에게는 변경이 반영된 받은 요청 수(pending)를 함께 보내므로 클라이언트가 목록을 다시 조회할 필요가 없습니다.
+    - 롤백되면 보내지 않습니다.
+    """
+    rows = list(rows)
+    actor_id, actor_username = actor.id, actor.username
+    transaction.on_commit(lambda: send_friend_events(event, actor_id, actor_username, rows))
+
+
+def send_friend_events(event, actor_id, actor_username, rows):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        # 변경한 프로세스의 캐시는 이미 무효화되었으므로 여기서 읽은 값이 최신
+        adjacencies = friend_graph.get_many({user_id for row in rows for user_id in row[1:]})
+        group_send = async_to_sync(channel_layer.group_send)
+        for friend_request_id, user1_id, user2_id in rows:
+            for user_id in (user1_id, user2_id):
+                group_send(friend_notification_group_name(user_id), {
+                    'type': 'friend.event',
+                    'event': event,
+                    'friendRequestId': friend_request_id,
+                    'userid': actor_id,
+                    'username': actor_username,
+                    'pending': len(adjacencies[user_id].pending_in),
+                })
+    except Exception:
+        # 알림 실패가 이미 커밋된 요청의 응답을 실패로 만들지 않도록 기록만 함
+        logger.exception('friend notification (%s) failed', event)
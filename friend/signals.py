@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Friends
+from .suggestions import invalidate_friend_caches
+
+
+@receiver(post_save, sender=Friends)
+@receiver(post_delete, sender=Friends)
+def friends_changed(sender, instance, **kwargs):
+    # 다른 사용자의 추천 결과는 TTL 동안 유지되지만, 관계가 바뀐 두 사용자의 결과는 바로 다시 계산
+    # 커밋 전에 무효화하면 다른 요청이 커밋 전 데이터로 캐시를 다시 채울 수 있으므로 커밋 이후에 무효화
+    user_ids = (instance.user1_id, instance.user2_id)
+    transaction.on_commit(lambda: invalidate_friend_caches(*user_ids))
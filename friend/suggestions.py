@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db.models import Case, Count, F, Q, When
+
+from ts.cache import LRUTTLCache
+from .graph import friend_graph
+from .models import Friends, FriendStatus
+
+# 사용자별 계산 결과를 짧은 시간 동안 재사용
+suggestion_cache = LRUTTLCache(maxsize=settings.FRIEND_GRAPH['CACHE_SIZE'], ttl=settings.FRIEND_GRAPH['SUGGESTION_TTL'])
+mutual_cache = LRUTTLCache(maxsize=settings.FRIEND_GRAPH['CACHE_SIZE'], ttl=settings.FRIEND_GRAPH['SUGGESTION_TTL'])
+
+
+def suggest_friends(user_id, limit):
+    """
+    친구의 친구를 함께 아는 친구 수(mutual) 순으로 정렬하여 [(user_id, mutual), ...]로 반환합니다.
+    - 나, 이미 친구인 사용자, 요청을 주고받은 사용자는 제외합니다.
+    - 내 친구 id 집합은 friend_graph 캐시에서 가져오고, 집계는 friends 테이블에 대한 GROUP BY 쿼리 한 번으로 처리합니다.
+    - 최대 개수(SUGGESTION_LIMIT)만큼 계산해 두고 limit에 맞게 잘라서 반환합니다.
+    """
+    ranked = suggestion_cache.get_or_set(
+        user_id, lambda: _suggest_friends(user_id, settings.FRIEND_GRAPH['SUGGESTION_LIMIT']))
+    return ranked[:limit]
+
+
+def _suggest_friends(user_id, limit):
+    adjacency = friend_graph.get(user_id)
+    friend_ids = list(adjacency.friends)
+    if not friend_ids:
+        return []
+    excluded = adjacency.related() | {user_id}
+    # 친구와 연결된 행에서 친구가 아닌 쪽이 후보
+    candidate = Case(When(user1_id__in=friend_ids, then=F('user2_id')), default=F('user1_id'))
+    rows = (Friends.objects.filter(Q(user1_id__in=friend_ids) | Q(user2_id__in=friend_ids), status=FriendStatus.ACCEPTED)
+            .annotate(candidate=candidate)
+            .exclude(candidate__in=excluded)
+            .values('candidate')
+            .annotate(mutual=Count('id'))
+            .order_by('-mutual', 'candidate')[:limit])
+    return [(row['candidate'], row['mutual']) for row in rows]
+
+
+def mutual_friend_ids(user_a_id, user_b_id):
+    """두 사용자의 공통 친구 id를 정렬된 목록으로 반환합니다. (캐시된 친구 집합의 교집합)"""
+    pair = Friends.canonical_pair(user_a_id, user_b_id)
+    return mutual_cache.get_or_set(pair, lambda: _mutual_friend_ids(*pair))
+
+
+def _mutual_friend_ids(user_a_id, user_b_id):
+    adjacencies = friend_graph.get_many([user_a_id, user_b_id])
+    smaller, larger = sorted((adjacencies[user_a_id].friends, adjacencies[user_b_id].friends), key=len)
+    return sorted(set(smaller).intersection(larger))
+
+
+def invalidate_friend_caches(*user_ids):
+    """
+    관계가 바뀐 사용자들의 친구 관계 캐시와 추천 결과, 그리고 그 사용자가 포함된 공통 친구 결과를 무효화합니다.
+    (공통 친구는 두 사용자의 친구 집합으로만 정해지므로, 다른 쌍의 결과는 바뀌지 않음)
+    """
+    friend_graph.invalidate(*user_ids)
+    suggestion_cache.invalidate(*user_ids)
+    changed = set(user_ids)
+    mutual_cache.invalidate_matching(lambda pair: pair[0] in changed or pair[1] in changed)
@@ -0,0 +1,201 @@
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from account.models import User
+from .graph import friend_graph
+from .models import Friends, FriendStatus
+from .suggestions import mutual_cache, suggestion_cache
+
+
+class FriendListQueryCountTest(TestCase):
+    def setUp(self):
+        friend_graph.clear()
+        self.user = User.objects.create_user('user', 'user@test.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_friends(self, count, status, incoming):
+        for i in range(count):
+            other = User.objects.create(username=f'{status.lower()}{i}', email=f'{status.lower()}{i}@test.com')
+            if incoming or i % 2:
+                Friends.objects.create(user1=other, user2=self.user, status=status)
+            else:
+                Friends.objects.create(user1=self.user, user2=other, status=status)
+
+    def assert_fixed_query_count(self, url):
+        # 전체 개수가 필요 없으면 친구 관계 캐시가 비어 있어도 페이지 조회만 함
+        friend_graph.clear()
+        with self.assertNumQueries(1):
+            self.client.get(url, {'total': 'false'})
+        for page_size in (1, 5, 20):
+            # 친구 관계 캐시가 비어 있으면 캐시 적재 + 페이지 조회
+            friend_graph.clear()
+            with self.assertNumQueries(2):
+                response = self.client.get(url, {'pageSize': page_size})
+            self.assertEqual(len(response.json()['friends']), min(page_size, 12))
+            self.assertEqual(response.json()['total'], 12)
+            with self.assertNumQueries(1):
+                self.client.get(url, {'pageSize': page_size})
+            with self.assertNumQueries(1):
+                response = self.client.get(url, {'pageSize': page_size, 'total': 'false'})
+            self.assertNotIn('total', response.json())
+
+    def test_pending_list_query_count(self):
+        self.create_friends(12, FriendStatus.PENDING, incoming=True)
+        self.assert_fixed_query_count('/api/friend/pending-friends/')
+
+    def test_accepted_list_query_count(self):
+        self.create_friends(12, FriendStatus.ACCEPTED, incoming=False)
+        self.assert_fixed_query_count('/api/friend/accepted-friends/')
+
+    def test_accepted_list_returns_counterpart(self):
+        self.create_friends(2, FriendStatus.ACCEPTED, incoming=False)
+        data = self.client.get('/api/friend/accepted-friends/').json()
+        self.assertEqual([friend['username'] for friend in data['friends']], ['accepted0', 'accepted1'])
+        self.assertEqual(data['friends'][0]['img'], '/media/images/default.png')
+        self.assertEqual(data['total'], 2)
+
+
+class FriendPairTest(TestCase):
+    def setUp(self):
+        friend_graph.clear()
+        self.alice = User.objects.create(username='alice', email='alice@test.com')
+        self.bob = User.objects.create(username='bob', email='bob@test.com')
+        self.request = Friends.objects.create(user1=self.alice, user2=self.bob)
+
+    def test_reverse_request_conflicts(self):
+        client = APIClient()
+        client.force_authenticate(self.bob)
+        response = client.post('/api/friend/send-friend-request/', {'user_id': self.alice.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+        # 조회를 건너뛴 동시 요청도 (pair_low, pair_high) unique 제약으로 막힘
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Friends.objects.create(user1=self.bob, user2=self.alice)
+        self.assertEqual(Friends.objects.count(), 1)
+
+    def test_lookups_are_symmetric(self):
+        self.assertEqual(list(Friends.between(self.alice.id, self.bob.id)), [self.request])
+        self.assertEqual(list(Friends.between(self.bob.id, self.alice.id)), [self.request])
+        self.assertFalse(Friends.are_friends(self.bob.id, self.alice.id))
+
+        Friends.objects.filter(id=self.request.id).update(status=FriendStatus.ACCEPTED)
+        self.assertTrue(Friends.are_friends(self.alice.id, self.bob.id))
+        self.assertTrue(Friends.are_friends(self.bob.id, self.alice.id))
+        self.assertTrue(friend_graph.are_friends(self.alice.id, self.bob.id))
+        self.assertTrue(friend_graph.are_friends(self.bob.id, self.alice.id))
+
+
+class FriendGraphTest(TestCase):
+    def setUp(self):
+        friend_graph.clear()
+        self.alice = User.objects.create(username='alice', email='alice@test.com')
+        self.bob = User.objects.create(username='bob', email='bob@test.com')
+
+    def test_adjacency_is_invalidated_on_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            request = Friends.objects.create(user1=self.alice, user2=self.bob)
+        self.assertEqual(list(friend_graph.get(self.bob.id).pending_in), [self.alice.id])
+        self.assertEqual(list(friend_graph.get(self.alice.id).pending_out), [self.bob.id])
+
+        with self.assertNumQueries(0):
+            self.assertFalse(friend_graph.are_friends(self.alice.id, self.bob.id))
+
+        request.status = FriendStatus.ACCEPTED
+        with self.captureOnCommitCallbacks(execute=True):
+            request.save()
+            # 커밋 전에는 무효화하지 않으므로, 다른 요청이 커밋 전 데이터로 캐시를 채우지 않음
+            self.assertFalse(friend_graph.are_friends(self.alice.id, self.bob.id))
+        self.assertTrue(friend_graph.are_friends(self.alice.id, self.bob.id))
+        self.assertEqual(friend_graph.pending_count(self.bob.id), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            request.delete()
+        self.assertEqual(len(friend_graph.friend_ids(self.bob.id)), 0)
+
+
+class FriendSuggestionTest(TestCase):
+    def setUp(self):
+        friend_graph.clear()
+        suggestion_cache.clear()
+        mutual_cache.clear()
+        self.me, self.a, self.b, self.c, self.d, self.e = [
+            User.objects.create(username=name, email=f'{name}@test.com') for name in ('me', 'a', 'b', 'c', 'd', 'e')
+        ]
+        for user1, user2 in ((self.me, self.a), (self.me, self.b), (self.a, self.c), (self.b, self.c),
+                             (self.a, self.d), (self.c, self.e), (self.a, self.b)):
+            Friends.objects.create(user1=user1, user2=user2, status=FriendStatus.ACCEPTED)
+        self.client = APIClient()
+        self.client.force_authenticate(self.me)
+
+    def test_suggestions_ranked_by_mutual_count(self):
+        response = self.client.get('/api/friend/suggestions/')
+        self.assertEqual([(card['id'], card['mutual']) for card in response.json()['suggestions']],
+                         [(self.c.id, 2), (self.d.id, 1)])
+
+        # 요청을 보낸 사용자는 제외
+        with self.captureOnCommitCallbacks(execute=True):
+            Friends.objects.create(user1=self.me, user2=self.c)
+        response = self.client.get('/api/friend/suggestions/', {'limit': 5})
+        self.assertEqual([card['id'] for card in response.json()['suggestions']], [self.d.id])
+
+    def test_suggestions_are_memoized(self):
+        self.client.get('/api/friend/suggestions/')
+        # 추천 결과와 친구 관계 캐시가 채워져 있으면 사용자 정보 조회만 남음
+        with self.assertNumQueries(1):
+            self.client.get('/api/friend/suggestions/', {'limit': 1})
+
+    def test_mutual_friends(self):
+        response = self.client.get(f'/api/friend/mutual/{self.c.id}/')
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual([card['id'] for card in response.json()['friends']], [self.a.id, self.b.id])
+        self.assertEqual(self.client.get('/api/friend/mutual/999999/').status_code, 404)
+
+    def test_mutual_friends_update_after_accept(self):
+        self.assertEqual(self.client.get(f'/api/friend/mutual/{self.e.id}/').json()['count'], 0)
+        # 캐시된 공통 친구 결과가 있어도 수락하면 바로 반영
+        request = Friends.objects.create(user1=self.e, user2=self.a)
+        client = APIClient()
+        client.force_authenticate(self.a)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post('/api/friend/accept-friend-request/', {'friend_request_id': request.id}, format='json')
+        response = self.client.get(f'/api/friend/mutual/{self.e.id}/')
+        self.assertEqual([card['id'] for card in response.json()['friends']], [self.a.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            request.delete()
+        self.assertEqual(self.client.get(f'/api/friend/mutual/{self.e.id}/').json()['count'], 0)
+
+
+class BulkFriendRequestTest(TestCase):
+    def setUp(self):
+        friend_graph.clear()
+        self.user = User.objects.create(username='user', email='user@test.com')
+        self.others = [User.objects.create(username=f'other{i}', email=f'other{i}@test.com') for i in range(4)]
+        self.received = [Friends.objects.create(user1=other, user2=self.user) for other in self.others[:3]]
+        self.sent = Friends.objects.create(user1=self.user, user2=self.others[3])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_accept(self):
+        friend_graph.get(self.user.id)
+        ids = [request.id for request in self.received[:2]] + [self.sent.id, 999999]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/friend/accept-friend-requests/', {'friend_request_ids': ids},
+                                        format='json')
+        self.assertEqual(response.json()['results'], {
+            str(self.received[0].id): 'accepted', str(self.received[1].id): 'accepted',
+            # 내가 보낸 요청은 수락할 수 없음
+            str(self.sent.id): 'not_found', '999999': 'not_found',
+        })
+        self.assertEqual(Friends.objects.filter(status=FriendStatus.ACCEPTED).count(), 2)
+        self.assertEqual(friend_graph.pending_count(self.user.id), 1)
+
+    def test_bulk_delete(self):
+        ids = [self.received[0].id, self.sent.id]
+        response = self.client.post('/api/friend/delete-friend-requests/', {'friend_request_ids': ids}, format='json')
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(Friends.objects.count(), 2)
+
+        response = self.client.post('/api/friend/delete-friend-requests/', {'friend_request_ids': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
@@ -1,5 +1,6 @@
 from django.urls import path
-from .views import FriendRequestView, FriendPendingListView, AcceptFriendRequestView, FriendAcceptedList, DeleteFriendRequestView
+from .views import FriendRequestView, FriendPendingListView, AcceptFriendRequestView, FriendAcceptedList, DeleteFriendRequestView, \
+    FriendSuggestionView, MutualFriendsView, BulkAcceptFriendRequestView, BulkDeleteFriendRequestView
 
 urlpatterns = [
     path('send-friend-request/', FriendRequestView.as_view(), name='send-friend-request'),
@@ -7,4 +8,8 @@ urlpatterns = [
     path('accept-friend-request/', AcceptFriendRequestView.as_view(), name='accept-friend-request'),
     path('accepted-friends/', FriendAcceptedList.as_view(), name='accepted-friends-list'),
     path('delete-friend-request/', DeleteFriendRequestView.as_view(), name='delete-friend-request'),
+    path('accept-friend-requests/', BulkAcceptFriendRequestView.as_view(), name='accept-friend-requests'),
+    path('delete-friend-requests/', BulkDeleteFriendRequestView.as_view(), name='delete-friend-requests'),
+    path('suggestions/', FriendSuggestionView.as_view(), name='friend-suggestions'),
+    path('mutual/<int:user_id>/', MutualFriendsView.as_view(), name='mutual-friends'),
 ]
\ No newline at end of file
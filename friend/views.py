@@ -1,14 +1,68 @@
 from django.http import JsonResponse
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from .graph import friend_graph
+from .suggestions import invalidate_friend_caches, mutual_friend_ids, suggest_friends
 from .models import Friends, FriendStatus
+from .notifications import publish_friend_events
 from django.core.paginator import Paginator
-from django.db import transaction
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Q, When
 from ts.exceptions import SelfRequestException, AlreadyFriendsOrRequested
 
 AppUser = get_user_model()
+image_storage = AppUser._meta.get_field('image').storage
+
+# 일괄 처리 API에서 한 번에 받을 수 있는 친구 요청 ID 수
+BULK_MAX_IDS = 500
+
+
+def friend_card(row):
+    return {
+        'id': row['friend_id'],
+        'username': row['friend_username'],
+        'email': row['friend_email'],
+        'img': image_storage.url(row['friend_image']) if row['friend_image'] else None,
+    }
+
+
+def paginate_friend_cards(request, rows, page, page_size, total=None):
+    """
+    friend_id/friend_username/friend_email/friend_image 컬럼을 가진 values() queryset을 페이지 단위로 응답합니다.
+    'total=false'이면 COUNT 쿼리 없이 해당 페이지만 조회합니다.
+    total 함수를 넘기면(친구 관계 캐시 등) COUNT 쿼리 대신 그 결과를 사용하며, 전체 개수가 필요할 때만 호출합니다.
+    """
+    if request.query_params.get('total', 'true').lower() == 'false':
+        if page < 1 or page_size < 1:
+            return JsonResponse({'error': 'Page not found'}, status=404)
+        offset = (page - 1) * page_size
+        friends = [friend_card(row) for row in rows[offset:offset + page_size]]
+        if page > 1 and not friends:
+            return JsonResponse({'error': 'Page not found'}, status=404)
+        return JsonResponse({
+            'page': page,
+            'pageSize': page_size,
+            'friends': friends
+        })
+
+    paginator = Paginator(rows, page_size)
+    if total is not None:
+        paginator.count = total()
+
+    try:
+        friends_page = paginator.page(page)
+    except:
+        return JsonResponse({'error': 'Page not found'}, status=404)
+
+    return JsonResponse({
+        'page': page,
+        'pageSize': page_size,
+        'total': paginator.count,
+        'totalPages': paginator.num_pages,
+        'friends': [friend_card(row) for row in friends_page]
+    })
 
 class FriendRequestView(APIView):
     """
@@ -31,10 +85,19 @@ class FriendRequestView(APIView):
                 raise SelfRequestException()
 
             friend_user = AppUser.objects.get(id=user_id)
-            if Friends.objects.filter(user1=request.user, user2=friend_user).exists() or Friends.objects.filter(user1=friend_user, user2=request.user).exists():
+            # 방향과 관계없이 (pair_low, pair_high) 인덱스 한 번으로 확인
+            if Friends.between(request.user.id, friend_user.id).exists():
                 raise AlreadyFriendsOrRequested()
 
-            Friends.objects.create(user1=request.user, user2=friend_user, status=FriendStatus.PENDING)
+            try:
+                with transaction.atomic():
+                    friend_request = Friends.objects.create(user1=request.user, user2=friend_user,
+                                                            status=FriendStatus.PENDING)
+            except IntegrityError:
+                # 동시에 들어온 중복 요청은 unique 제약으로 막힘
+                raise AlreadyFriendsOrRequested()
+            publish_friend_events('requested', request.user,
+                                  [(friend_request.id, request.user.id, friend_user.id)])
             return JsonResponse({'message': 'Friend request sent successfully'})
 
         except AppUser.DoesNotExist:
@@ -48,6 +111,9 @@ class FriendPendingListView(APIView):
     사용자가 받은 친구 요청 중 아직 수락되지 않은 요청의 목록을 확인할 수 있습니다.
     - 인증된 사용자만이 자신에게 온 대기 중인 친구 요청 목록을 조회할 수 있습니다.
     - 페이지네이션을 지원하여, 페이지 번호('page')와 페이지 당 항목 수('pageSize')를 쿼리 파라미터로 받습니다.
+    - 'total=false'를 주면 전체 개수(COUNT) 조회를 생략합니다.
+    - 요청을 보낸 사용자의 정보는 조인하여 필요한 컬럼만 가져오므로 페이지 크기와 관계없이 쿼리는 2번(COUNT 생략 시 1번)입니다.
+      전체 개수는 친구 관계 캐시(friend_graph)에서 가져오므로 캐시가 채워져 있으면 1번입니다.
     """
     permission_classes = [IsAuthenticated]
 
@@ -60,23 +126,12 @@ class FriendPendingListView(APIView):
         except ValueError:
             return JsonResponse({'error': 'Invalid page or pageSize'}, status=400)
 
-        pending_friends = Friends.objects.filter(user2=request.user, status=FriendStatus.PENDING).order_by('id')
-        paginator = Paginator(pending_friends, page_size)
-
-        try:
-            friends_page = paginator.page(page)
-        except:
-            return JsonResponse({'error': 'Page not found'}, status=404)
-
-        pending_list = [{'id': friend.user1.id, 'username': friend.user1.username, 'email': friend.user1.email, 'img': friend.user1.image.url if friend.user1.image else None} for friend in friends_page]
-
-        return JsonResponse({
-            'page': page,
-            'pageSize': page_size,
-            'total': paginator.count,
-            'totalPages': paginator.num_pages,
-            'friends': pending_list
-        })
+        pending_friends = (Friends.objects.filter(user2=request.user, status=FriendStatus.PENDING)
+                           .order_by('id')
+                           .values(friend_id=F('user1_id'), friend_username=F('user1__username'),
+                                   friend_email=F('user1__email'), friend_image=F('user1__image')))
+        return paginate_friend_cards(request, pending_friends, page, page_size,
+                                     total=lambda: friend_graph.pending_count(request.user.id))
 
 class AcceptFriendRequestView(APIView):
     """
@@ -104,15 +159,92 @@ class AcceptFriendRequestView(APIView):
 
         friend_request.status = FriendStatus.ACCEPTED
         friend_request.save()
+        publish_friend_events('accepted', request.user,
+                              [(friend_request.id, friend_request.user1_id, friend_request.user2_id)])
 
         return JsonResponse({'message': 'Friend request accepted successfully'})
     
+
+def parse_friend_request_ids(request):
+    """
+    요청 데이터의 'friend_request_ids'를 중복을 제거한 정수 목록으로 변환합니다.
+    형식이 잘못되었거나 비어 있거나 BULK_MAX_IDS개를 넘으면 None을 반환합니다.
+    """
+    ids = request.data.get('friend_request_ids')
+    if not isinstance(ids, list) or not ids or len(ids) > BULK_MAX_IDS:
+        return None
+    try:
+        return list(dict.fromkeys(int(friend_request_id) for friend_request_id in ids))
+    except (TypeError, ValueError):
+        return None
+
+
+def apply_bulk(request, queryset, apply, done):
+    """
+    queryset에 해당하는 대기 중 요청만 잠근 뒤 apply(queryset)으로 한 번에 UPDATE/DELETE하고,
+    요청한 ID마다 done 또는 'not_found' 결과를 돌려줍니다.
+    잠금은 이 트랜잭션(SELECT + UPDATE/DELETE 한 번씩) 동안만 유지됩니다.
+    커밋 이후 처리된 요청마다 done 이벤트를 친구 알림 그룹에 보냅니다.
+    """
+    friend_request_ids = parse_friend_request_ids(request)
+    if friend_request_ids is None:
+        return JsonResponse({'error': f'friend_request_ids must be a list of 1 to {BULK_MAX_IDS} IDs'}, status=400)
+
+    with transaction.atomic():
+        # 여러 요청이 겹치는 ID를 처리할 때 교착 상태가 생기지 않도록 ID 순서로 잠금
+        rows = list(queryset.filter(id__in=friend_request_ids, status=FriendStatus.PENDING)
+                    .select_for_update().order_by('id').values_list('id', 'user1_id', 'user2_id'))
+        if rows:
+            apply(Friends.objects.filter(id__in=[row[0] for row in rows]))
+            user_ids = {user_id for row in rows for user_id in row[1:]}
+            transaction.on_commit(lambda: invalidate_friend_caches(*user_ids))
+            publish_friend_events(done, request.user, rows)
+
+    matched = {row[0] for row in rows}
+    return JsonResponse({
+        'results': {str(friend_request_id): done if friend_request_id in matched else 'not_found'
+                    for friend_request_id in friend_request_ids},
+        'count': len(matched),
+    })
+
+
+class BulkAcceptFriendRequestView(APIView):
+    """
+    BulkAcceptFriendRequestView는 받은 친구 요청 여러 개를 한 번에 수락하는 API 엔드포인트를 제공합니다.
+    - 수락할 친구 요청의 ID 목록은 요청 데이터에서 'friend_request_ids'로 전달받습니다. (최대 BULK_MAX_IDS개)
+    - 나에게 온 대기 중인 요청만 수락하며, 하나의 트랜잭션에서 UPDATE 한 번으로 처리합니다.
+    - ID마다 'accepted' 또는 'not_found' 결과를 반환합니다.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return apply_bulk(request, Friends.objects.filter(user2=request.user),
+                          lambda queryset: queryset.update(status=FriendStatus.ACCEPTED), 'accepted')
+
+
+class BulkDeleteFriendRequestView(APIView):
+    """
+    BulkDeleteFriendRequestView는 친구 요청 여러 개를 한 번에 거절하거나 취소하는 API 엔드포인트를 제공합니다.
+    - 삭제할 친구 요청의 ID 목록은 요청 데이터에서 'friend_request_ids'로 전달받습니다. (최대 BULK_MAX_IDS개)
+    - 내가 보내거나 받은 대기 중인 요청만 삭제하며, 하나의 트랜잭션에서 DELETE 한 번으로 처리합니다.
+    - ID마다 'deleted' 또는 'not_found' 결과를 반환합니다.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return apply_bulk(request, Friends.objects.filter(Q(user1=request.user) | Q(user2=request.user)),
+                          lambda queryset: queryset.delete(), 'deleted')
+
+
 class FriendAcceptedList(APIView):
     """
     FriendAcceptedList는 친구 요청을 수락하여 현재 친구 관계에 있는 사용자 목록을 조회하는 API 엔드포인트를 제공합니다.
     사용자가 현재 친구 관계에 있는 사용자의 목록을 확인할 수 있습니다.
     - 인증된 사용자만이 자신의 친구 목록을 조회할 수 있습니다.
     - 페이지네이션을 지원하여, 페이지 번호('page')와 페이지 당 항목 수('pageSize')를 쿼리 파라미터로 받습니다.
+    - 'total=false'를 주면 전체 개수(COUNT) 조회를 생략합니다.
+    - 상대방 사용자의 정보는 조인하여 필요한 컬럼만 가져오므로 페이지 크기와 관계없이 쿼리는 2번(COUNT 생략 시 1번)입니다.
+      전체 개수는 친구 관계 캐시(friend_graph)에서 가져오므로 캐시가 채워져 있으면 1번입니다.
     """
     permission_classes = [IsAuthenticated]
 
@@ -125,36 +257,18 @@ class FriendAcceptedList(APIView):
         except ValueError:
             return JsonResponse({'error': 'Invalid page or pageSize'}, status=400)
 
-        accepted_friends = Friends.objects.filter(
-            Q(user1=request.user, status=FriendStatus.ACCEPTED) | 
-            Q(user2=request.user, status=FriendStatus.ACCEPTED)
-        ).distinct().order_by('id')
+        user_id = request.user.id
+        def counterpart(field):
+            # 내가 user1이면 user2가, 내가 user2이면 user1이 상대방
+            return Case(When(user1_id=user_id, then=F(f'user2{field}')), default=F(f'user1{field}'))
 
-        paginator = Paginator(accepted_friends, page_size)
+        accepted_friends = (Friends.objects.filter(Q(user1_id=user_id) | Q(user2_id=user_id), status=FriendStatus.ACCEPTED)
+                            .order_by('id')
+                            .values(friend_id=counterpart('_id'), friend_username=counterpart('__username'),
+                                    friend_email=counterpart('__email'), friend_image=counterpart('__image')))
+        return paginate_friend_cards(request, accepted_friends, page, page_size,
+                                     total=lambda: len(friend_graph.friend_ids(user_id)))
 
-        try:
-            friends_page = paginator.page(page)
-        except:
-            return JsonResponse({'error': 'Page not found'}, status=404)
-
-        accepted_list = []
-        for friend in friends_page:
-            friend_user = friend.user2 if friend.user1 == request.user else friend.user1
-            accepted_list.append({
-                'id': friend_user.id, 
-                'username': friend_user.username, 
-                'email': friend_user.email,
-                'img': friend_user.image.url if friend_user.image else None
-            })
-
-        return JsonResponse({
-            'page': page,
-            'pageSize': page_size,
-            'total': paginator.count,
-            'totalPages': paginator.num_pages,
-            'friends': accepted_list
-        })
-    
 class DeleteFriendRequestView(APIView):
     """
     DeleteFriendRequestView는 친구 요청을 삭제하는 API 엔드포인트를 제공합니다.
@@ -176,7 +290,63 @@ class DeleteFriendRequestView(APIView):
                 Q(user1=request.user, id=friend_request_id, status=FriendStatus.PENDING) |
                 Q(user2=request.user, id=friend_request_id, status=FriendStatus.PENDING)
             )
+            rows = [(friend_request.id, friend_request.user1_id, friend_request.user2_id)]
             friend_request.delete()
+            publish_friend_events('deleted', request.user, rows)
             return JsonResponse({'message': 'Friend request deleted successfully'})
         except Friends.DoesNotExist:
-            return JsonResponse({'error': 'Friend request not found or not in pending status'}, status=404)
\ No newline at end of file
+            return JsonResponse({'error': 'Friend request not found or not in pending status'}, status=404)
+
+def user_cards(user_ids):
+    """user_ids 순서대로 사용자 카드를 한 번의 쿼리로 가져옵니다."""
+    rows = AppUser.objects.filter(id__in=user_ids).values(
+        friend_id=F('id'), friend_username=F('username'), friend_email=F('email'), friend_image=F('image'))
+    cards = {row['friend_id']: friend_card(row) for row in rows}
+    return [cards[user_id] for user_id in user_ids if user_id in cards]
+
+
+class FriendSuggestionView(APIView):
+    """
+    FriendSuggestionView는 친구의 친구를 추천하는 API 엔드포인트를 제공합니다.
+    - 함께 아는 친구 수('mutual')가 많은 순으로 정렬하며, 이미 친구이거나 요청을 주고받은 사용자는 제외합니다.
+    - 'limit' 쿼리 파라미터로 개수를 정할 수 있습니다. (기본 10, 최대 FRIEND_GRAPH['SUGGESTION_LIMIT'])
+    - 집계는 SQL 한 번으로 처리하고, 결과는 사용자별로 FRIEND_GRAPH['SUGGESTION_TTL']초 동안 재사용합니다.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid limit'}, status=400)
+        if limit < 1:
+            return JsonResponse({'error': 'Invalid limit'}, status=400)
+        limit = min(limit, settings.FRIEND_GRAPH['SUGGESTION_LIMIT'])
+
+        ranked = suggest_friends(request.user.id, limit)
+        mutual = dict(ranked)
+        cards = user_cards([user_id for user_id, _ in ranked])
+        for card in cards:
+            card['mutual'] = mutual[card['id']]
+        return JsonResponse({'suggestions': cards})
+
+
+class MutualFriendsView(APIView):
+    """
+    MutualFriendsView는 나와 다른 사용자가 함께 아는 친구 목록을 조회하는 API 엔드포인트를 제공합니다.
+    - 두 사용자의 친구 id 집합(friend_graph 캐시)의 교집합으로 계산하며, 결과는 짧은 시간 동안 재사용합니다.
+    - 공통 친구의 정보는 한 번의 쿼리로 가져옵니다.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, user_id):
+        if user_id == request.user.id:
+            return JsonResponse({'error': 'Invalid user'}, status=400)
+
+        friend_ids = mutual_friend_ids(request.user.id, user_id)
+        if not friend_ids and not AppUser.objects.filter(id=user_id).exists():
+            return JsonResponse({'error': 'User not found'}, status=404)
+        return JsonResponse({
+            'count': len(friend_ids),
+            'friends': user_cards(friend_ids),
+        })
@@ -1,9 +1,21 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db.models import Q
 from .models import Game
 
+AppUser = get_user_model()
+
 @admin.register(Game)
 class GameAdmin(admin.ModelAdmin):
     list_display = ['game_id', 'winner', 'loser', 'game_mode', 'played_at']
     list_filter = ['game_mode', 'played_at']
-    search_fields = ['winner__username', 'loser__username']
+    list_select_related = ['winner', 'loser']
+    search_fields = ['^winner__username', '^loser__username']
 
+    def get_search_results(self, request, queryset, search_term):
+        # user를 조인한 OR 조건 대신, username 접두사 인덱스로 사용자를 먼저 찾고 winner/loser 인덱스로 게임을 조회
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        users = AppUser.objects.filter(username__istartswith=search_term).values('id')
+        return queryset.filter(Q(winner__in=users) | Q(loser__in=users)), False
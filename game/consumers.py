@@ -0,0 +1,134 @@
+import json
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+
+from .engine import FRAME_FIELDS, POSITION_SCALE, engine, game_group_name
+from .matchmaking import get_rating, matchmaker
+from .models import Game
+
+
+class MatchmakingConsumer(AsyncWebsocketConsumer):
+    """
+    레이팅 기반 매치메이킹 웹소켓 consumer입니다. (ws/game/matchmaking)
+    - {"type": "queue", "game_mode": "normal"}: 대기열에 들어가고 {"type": "queued", "gameMode", "rating"}로 응답합니다.
+    - {"type": "cancel"}: 대기열에서 나오고 {"type": "cancelled"}로 응답합니다. 연결이 끊겨도 대기열에서 나옵니다.
+    - 상대가 정해지면 Game을 미리 만들고
+      {"type": "match_found", "gameId": id, "gameMode": ..., "opponent": {"id", "username", "rating"}}를 push합니다.
+    """
+
+    async def connect(self):
+        if self.scope["user"].is_authenticated:
+            matchmaker.ensure_running()
+            await self.accept()
+
+    async def disconnect(self, close_code):
+        user = self.scope["user"]
+        if user.is_authenticated:
+            matchmaker.dequeue(user.id)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        if not text_data:
+            return
+        data = json.loads(text_data)
+        message_type = data.get('type')
+        if message_type == 'queue':
+            await self.queue(data.get('game_mode', 'normal'))
+        elif message_type == 'cancel':
+            matchmaker.dequeue(self.scope["user"].id)
+            await self.send(text_data=json.dumps({'type': 'cancelled'}))
+        else:
+            await self.send(text_data=json.dumps({'type': 'error', 'error': 'Unknown message type'}))
+
+    async def queue(self, game_mode):
+        if game_mode not in dict(Game.GAME_MODE_CHOICES):
+            await self.send(text_data=json.dumps({'type': 'error', 'error': 'Invalid game mode'}))
+            return
+        user = self.scope["user"]
+        rating = await get_rating(user.id, game_mode)
+        ticket = matchmaker.ticket(user.id, user.username, self.channel_name, game_mode, rating)
+        await self.send(text_data=json.dumps({'type': 'queued', 'gameMode': game_mode, 'rating': round(rating, 1)}))
+        opponent = matchmaker.enqueue(ticket)
+        if opponent is not None:
+            await matchmaker.dispatch(opponent, ticket)
+
+    async def match_found(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'match_found',
+            'gameId': event['gameId'],
+            'gameMode': event['gameMode'],
+            'opponent': event['opponent'],
+        }))
+
+    async def match_failed(self, event):
+        await self.send(text_data=json.dumps({'type': 'match_failed', 'gameMode': event['gameMode']}))
+
+
+class GameConsumer(AsyncWebsocketConsumer):
+    """
+    서버가 진행하는 실시간 게임 웹소켓 consumer입니다. (ws/game/play/<game_id>)
+    - Game의 player1/player2만 접속할 수 있으며, 결과가 이미 기록된 게임에는 접속할 수 없습니다.
+    - 접속하면 {"type": "joined", "side": 0(player1, 왼쪽) | 1(player2, 오른쪽), "gameMode", "tickRate",
+      "fields", "scale"}로 응답하고, 두 선수가 모두 접속하면 경기가 시작됩니다.
+    - {"type": "input", "direction": -1 | 0 | 1}: 내 패들의 이동 방향을 바꿉니다. (위: -1, 아래: 1)
+    - 매 틱 {"type": "frame", "t": tick, "m": mask, "v": [...]}를 push합니다.
+      mask의 i번째 비트가 켜진 fields[i]만 순서대로 v에 담기며, 위치 값은 scale을 곱한 정수입니다.
+    - 경기가 끝나면 결과를 기록하고 {"type": "game_over", "winner": user_id, "score": [p1, p2], "forfeit": bool}를 push합니다.
+    """
+
+    async def connect(self):
+        user = self.scope["user"]
+        self.game_id = self.scope["url_route"]["kwargs"]["game_id"]
+        self.side = None
+        if not user.is_authenticated:
+            await self.close()
+            return
+        game = await self.get_game()
+        if game is None or game['winner_id'] is not None or user.id not in (game['player1_id'], game['player2_id']):
+            await self.close()
+            return
+        self.side = 0 if user.id == game['player1_id'] else 1
+        await self.channel_layer.group_add(game_group_name(self.game_id), self.channel_name)
+        await self.accept()
+        await self.send(text_data=json.dumps({
+            'type': 'joined',
+            'side': self.side,
+            'gameMode': game['game_mode'],
+            'tickRate': settings.GAME_ENGINE['MODES'][game['game_mode']]['TICK_RATE'],
+            'fields': FRAME_FIELDS,
+            'scale': POSITION_SCALE,
+        }))
+        engine.join(self.game_id, game['game_mode'], (game['player1_id'], game['player2_id']), self.side)
+
+    async def disconnect(self, close_code):
+        if self.side is not None:
+            await self.channel_layer.group_discard(game_group_name(self.game_id), self.channel_name)
+            await engine.leave(self.game_id, self.side)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        if not text_data:
+            return
+        data = json.loads(text_data)
+        if data.get('type') == 'input':
+            try:
+                direction = int(data.get('direction', 0))
+            except (TypeError, ValueError):
+                return
+            engine.set_input(self.game_id, self.side, direction)
+
+    async def game_frame(self, event):
+        await self.send(text_data=event['text'])
+
+    async def game_over(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'game_over',
+            'winner': event['winner'],
+            'score': event['score'],
+            'forfeit': event['forfeit'],
+        }))
+
+    @database_sync_to_async
+    def get_game(self):
+        return (Game.objects.filter(game_id=self.game_id, player2__isnull=False)
+                .values('player1_id', 'player2_id', 'winner_id', 'game_mode').first())
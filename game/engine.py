@@ -0,0 +1,318 @@
+import asyncio
+import logging
+import math
+
+import numpy as np
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from .results import record_game_result
+
+logger = logging.getLogger(__name__)
+
+# 필드 좌표는 가로/세로 0~1, player1(왼쪽) 패들은 x=PADDLE_X, player2(오른쪽) 패들은 x=1-PADDLE_X
+PADDLE_X = 0.02
+BALL_RADIUS = 0.01
+MAX_BOUNCE_ANGLE = math.pi / 3
+OBSTACLE_WIDTH = 0.04
+OBSTACLE_HEIGHT = 0.2
+OBSTACLE_AMPLITUDE = 0.3
+OBSTACLE_PERIOD = 4  # 초
+
+# 상태 프레임 필드 (마스크의 비트 순서), 위치는 POSITION_SCALE을 곱한 정수로 보냄
+FRAME_FIELDS = ('ballX', 'ballY', 'paddle1', 'paddle2', 'score1', 'score2', 'obstacle')
+POSITION_SCALE = 10000
+FIELD_BITS = 1 << np.arange(len(FRAME_FIELDS))
+
+
+def game_group_name(game_id):
+    return f'game_{game_id}'
+
+
+class MatchBatch:
+    """
+    같은 game_mode로 진행 중인 여러 경기의 공/패들 상태를 NumPy 배열(경기당 한 행)로 보관하고
+    한 틱을 모든 경기에 대해 한 번에 계산합니다.
+    - Django나 이벤트 루프에 의존하지 않으므로 벤치마크에서도 그대로 사용합니다.
+    - 빈 행은 재사용하며, 자리가 모자라면 배열을 두 배로 늘립니다.
+    """
+
+    ARRAYS = ('game_ids', 'active', 'ball', 'velocity', 'paddles', 'inputs', 'scores', 'phase', 'sent')
+
+    def __init__(self, config, capacity=64, seed=None):
+        self.config = config
+        self.dt = 1 / config['TICK_RATE']
+        self.rng = np.random.default_rng(seed)
+        self.time = 0.0
+        self.slots = {}
+        self.game_ids = np.full(capacity, -1, dtype=np.int64)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.ball = np.full((capacity, 2), 0.5)
+        self.velocity = np.zeros((capacity, 2))
+        self.paddles = np.full((capacity, 2), 0.5)
+        self.inputs = np.zeros((capacity, 2))
+        self.scores = np.zeros((capacity, 2), dtype=np.int64)
+        # object 모드 장애물의 경기별 위상
+        self.phase = np.zeros(capacity)
+        # 마지막으로 보낸 프레임 (-1이면 다음 프레임에서 모든 필드를 보냄)
+        self.sent = np.full((capacity, len(FRAME_FIELDS)), -1, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _grow(self):
+        capacity = len(self.active)
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            filler = np.full((capacity,) + array.shape[1:], -1 if name in ('game_ids', 'sent') else 0, dtype=array.dtype)
+            setattr(self, name, np.concatenate([array, filler]))
+
+    def add(self, game_id):
+        free = np.flatnonzero(~self.active)
+        if not len(free):
+            self._grow()
+            free = np.flatnonzero(~self.active)
+        slot = int(free[0])
+        self.slots[game_id] = slot
+        self.game_ids[slot] = game_id
+        self.active[slot] = True
+        self.paddles[slot] = 0.5
+        self.inputs[slot] = 0
+        self.scores[slot] = 0
+        self.phase[slot] = self.rng.uniform(0, 2 * math.pi)
+        self.sent[slot] = -1
+        mask = np.zeros(len(self.active), dtype=bool)
+        mask[slot] = True
+        self._serve(mask, self.rng.choice([-1.0, 1.0], 1))
+        return slot
+
+    def remove(self, game_id):
+        slot = self.slots.pop(game_id)
+        self.active[slot] = False
+        self.game_ids[slot] = -1
+        return self.scores[slot].tolist()
+
+    def set_input(self, game_id, side, direction):
+        slot = self.slots.get(game_id)
+        if slot is not None:
+            self.inputs[slot, side] = max(-1, min(1, direction))
+
+    def _serve(self, mask, direction):
+        count = int(mask.sum())
+        angle = self.rng.uniform(-math.pi / 4, math.pi / 4, count)
+        speed = self.config['BALL_SPEED']
+        self.ball[mask] = 0.5
+        self.velocity[mask, 0] = direction * speed * np.cos(angle)
+        self.velocity[mask, 1] = speed * np.sin(angle)
+
+    def obstacle_y(self):
+        return 0.5 + OBSTACLE_AMPLITUDE * np.sin(2 * math.pi * self.time / OBSTACLE_PERIOD + self.phase)
+
+    def step(self):
+        """
+        모든 경기를 한 틱 진행하고 이번 틱에 끝난 경기를 [(game_id, winner_side), ...]로 반환합니다.
+        """
+        config, dt, active = self.config, self.dt, self.active
+        half = config['PADDLE_HEIGHT'] / 2
+        np.clip(self.paddles + self.inputs * (config['PADDLE_SPEED'] * dt), half, 1 - half, out=self.paddles)
+
+        previous_x = self.ball[:, 0].copy()
+        self.ball += self.velocity * dt
+        x, y = self.ball[:, 0], self.ball[:, 1]
+
+        # 위/아래 벽
+        low, high = y < BALL_RADIUS, y > 1 - BALL_RADIUS
+        y[low] = 2 * BALL_RADIUS - y[low]
+        y[high] = 2 * (1 - BALL_RADIUS) - y[high]
+        self.velocity[low, 1] = np.abs(self.velocity[low, 1])
+        self.velocity[high, 1] = -np.abs(self.velocity[high, 1])
+
+        if config['OBSTACLE']:
+            obstacle = self.obstacle_y()
+            hit = (active & (np.abs(x - 0.5) <= OBSTACLE_WIDTH / 2 + BALL_RADIUS)
+                   & (np.abs(y - obstacle) <= OBSTACLE_HEIGHT / 2 + BALL_RADIUS)
+                   & ((0.5 - x) * self.velocity[:, 0] > 0))
+            self.velocity[hit, 0] *= -1
+
+        # 패들 면을 이번 틱에 지나간 공만 검사 (빠른 공이 패들을 건너뛰지 않도록)
+        for side, sign in ((0, -1), (1, 1)):
+            face = (PADDLE_X if side == 0 else 1 - PADDLE_X) - sign * BALL_RADIUS
+            crossed = (active & (self.velocity[:, 0] * sign > 0)
+                       & ((previous_x - face) * sign < 0) & ((x - face) * sign >= 0))
+            offset = (y - self.paddles[:, side]) / (half + BALL_RADIUS)
+            hit = crossed & (np.abs(offset) <= 1)
+            if hit.any():
+                speed = np.minimum(np.hypot(self.velocity[hit, 0], self.velocity[hit, 1]) * config['BALL_ACCEL'],
+                                   config['MAX_BALL_SPEED'])
+                angle = offset[hit] * MAX_BOUNCE_ANGLE
+                self.velocity[hit, 0] = -sign * speed * np.cos(angle)
+                self.velocity[hit, 1] = speed * np.sin(angle)
+                x[hit] = face
+
+        # 공이 왼쪽 끝을 넘으면 player2 득점, 오른쪽 끝을 넘으면 player1 득점
+        conceded_left, conceded_right = active & (x < 0), active & (x > 1)
+        self.scores[conceded_left, 1] += 1
+        self.scores[conceded_right, 0] += 1
+        finished = active & (self.scores.max(axis=1) >= config['WIN_SCORE'])
+        # 실점한 쪽으로 다시 서브
+        for conceded, direction in ((conceded_left, -1.0), (conceded_right, 1.0)):
+            serve = conceded & ~finished
+            if serve.any():
+                self._serve(serve, direction)
+
+        self.time += dt
+        return [(int(self.game_ids[slot]), int(np.argmax(self.scores[slot])))
+                for slot in np.flatnonzero(finished)]
+
+    def state(self):
+        """FRAME_FIELDS 순서의 정수 상태 (경기당 한 행)"""
+        state = np.empty((len(self.active), len(FRAME_FIELDS)), dtype=np.int64)
+        state[:, 0:2] = np.rint(self.ball * POSITION_SCALE)
+        state[:, 2:4] = np.rint(self.paddles * POSITION_SCALE)
+        state[:, 4:6] = self.scores
+        state[:, 6] = np.rint(self.obstacle_y() * POSITION_SCALE) if self.config['OBSTACLE'] else 0
+        return state
+
+    def frames(self, tick, keyframe=False):
+        """
+        지난 프레임과 달라진 필드만 담은 프레임을 [(game_id, text), ...]로 반환합니다.
+        - {"type": "frame", "t": tick, "m": 바뀐 필드 비트마스크, "v": [바뀐 값, ...]}
+        - keyframe이면 모든 필드를 보내어, 프레임을 놓친 클라이언트도 상태를 복구할 수 있게 합니다.
+        """
+        state = self.state()
+        changed = (state != self.sent) | keyframe
+        changed &= self.active[:, None]
+        masks = changed @ FIELD_BITS
+        slots = np.flatnonzero(masks)
+        # 행 단위 NumPy 접근 대신 한 번에 파이썬 리스트로 변환하고, json.dumps 없이 문자열로 조립
+        rows, flags = state[slots].tolist(), changed[slots].tolist()
+        frames = []
+        for game_id, mask, row, flag in zip(self.game_ids[slots].tolist(), masks[slots].tolist(), rows, flags):
+            values = ','.join([str(value) for value, sent in zip(row, flag) if sent])
+            frames.append((game_id, f'{{"type":"frame","t":{tick},"m":{mask},"v":[{values}]}}'))
+        self.sent = state
+        return frames
+
+
+class GameEngine:
+    """
+    서버가 공/패들 상태를 결정하는 실시간 게임 엔진입니다.
+    - game_mode마다 MatchBatch 하나와 GAME_ENGINE['MODES'][mode]['TICK_RATE']로 도는 루프 태스크 하나를 둡니다.
+    - 두 선수가 모두 접속하면 경기를 시작하고, 끝나면 Game에 결과를 기록한 뒤 game.over 이벤트를 보냅니다.
+      결과 기록은 별도 태스크에서 하므로 DB 지연이 틱 루프를 멈추지 않습니다.
+    - 전송이나 기록이 실패해도 로그만 남기고 루프는 계속 돕니다. (한 경기의 오류로 같은 모드의 모든 경기가 멈추지 않도록)
+    - 한 선수의 연결이 끊기면 상대의 기권승으로 처리합니다.
+    - 경기 상태는 프로세스 내부에 있으므로 두 선수는 같은 프로세스로 연결되어야 합니다.
+    """
+
+    def __init__(self, channel_layer=None):
+        self.batches = {}
+        self.matches = {}
+        self._tasks = {}
+        self._channel_layer = channel_layer
+        # 진행 중인 결과 기록 태스크 (완료되기 전에 가비지 컬렉션되지 않도록 참조를 유지)
+        self._pending = set()
+
+    @property
+    def channel_layer(self):
+        return self._channel_layer or get_channel_layer()
+
+    def batch(self, game_mode):
+        if game_mode not in self.batches:
+            self.batches[game_mode] = MatchBatch(settings.GAME_ENGINE['MODES'][game_mode])
+        return self.batches[game_mode]
+
+    def join(self, game_id, game_mode, player_ids, side):
+        """선수 한 명이 접속했음을 기록하고, 두 명이 모두 모이면 경기를 시작합니다."""
+        match = self.matches.setdefault(game_id, {'game_mode': game_mode, 'player_ids': player_ids, 'joined': set()})
+        match['joined'].add(side)
+        batch = self.batch(game_mode)
+        if len(match['joined']) == 2 and game_id not in batch.slots:
+            batch.add(game_id)
+            self.ensure_running(game_mode)
+            return True
+        return False
+
+    def set_input(self, game_id, side, direction):
+        match = self.matches.get(game_id)
+        if match is not None:
+            self.batch(match['game_mode']).set_input(game_id, side, direction)
+
+    async def leave(self, game_id, side):
+        match = self.matches.get(game_id)
+        if match is None:
+            return
+        if game_id in self.batch(match['game_mode']).slots:
+            await self.finish(game_id, 1 - side, forfeit=True)
+        else:
+            match['joined'].discard(side)
+            if not match['joined']:
+                del self.matches[game_id]
+
+    def ensure_running(self, game_mode):
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(game_mode)
+        if task is not None and not task.done() and task.get_loop() is loop:
+            return
+        self._tasks[game_mode] = loop.create_task(self._run(game_mode))
+
+    async def _run(self, game_mode):
+        batch = self.batch(game_mode)
+        channel_layer = self.channel_layer
+        loop = asyncio.get_running_loop()
+        keyframe_interval = settings.GAME_ENGINE['KEYFRAME_INTERVAL']
+        tick = 0
+        next_at = loop.time()
+        while len(batch):
+            finished = batch.step()
+            failed, error = 0, None
+            for game_id, text in batch.frames(tick, keyframe=tick % keyframe_interval == 0):
+                try:
+                    await channel_layer.group_send(game_group_name(game_id), {'type': 'game.frame', 'text': text})
+                except Exception as e:
+                    failed, error = failed + 1, e
+            if failed:
+                # 채널 레이어 장애 시 경기마다 남기지 않고 틱마다 한 번만 기록
+                logger.warning('game engine %s tick %d: failed to send %d frames', game_mode, tick, failed,
+                               exc_info=error)
+            for game_id, winner_side in finished:
+                await self.finish(game_id, winner_side)
+            tick += 1
+            # 틱 간격을 고정하고, 밀린 경우에는 따라잡지 않고 다음 틱부터 다시 맞춤
+            next_at = max(next_at + batch.dt, loop.time())
+            await asyncio.sleep(next_at - loop.time())
+
+    async def finish(self, game_id, winner_side, forfeit=False):
+        match = self.matches.pop(game_id, None)
+        if match is None:
+            # 같은 틱에 기권과 정상 종료가 겹친 경우
+            return
+        score = self.batch(match['game_mode']).remove(game_id)
+        winner_id, loser_id = match['player_ids'][winner_side], match['player_ids'][1 - winner_side]
+        task = asyncio.get_running_loop().create_task(self._record(game_id, winner_id, loser_id, score, forfeit))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _record(self, game_id, winner_id, loser_id, score, forfeit):
+        """결과를 기록한 뒤 game.over를 보냅니다. 기록에 실패해도 경기는 끝났으므로 선수들에게는 알립니다."""
+        try:
+            await database_sync_to_async(record_game_result)(game_id, winner_id, loser_id)
+        except Exception:
+            logger.exception('game %s: failed to record result (winner=%s, loser=%s)', game_id, winner_id, loser_id)
+        try:
+            await self.channel_layer.group_send(game_group_name(game_id), {
+                'type': 'game.over',
+                'winner': winner_id,
+                'score': score,
+                'forfeit': forfeit,
+            })
+        except Exception:
+            logger.exception('game %s: failed to send game.over', game_id)
+
+    async def wait_pending(self):
+        """진행 중인 결과 기록이 모두 끝날 때까지 기다립니다."""
+        while self._pending:
+            await asyncio.gather(*self._pending)
+
+engine = GameEngine()
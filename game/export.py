@@ -0,0 +1,92 @@
+import csv
+import json
+from datetime import timezone
+
+from django.db.models import Q
+from rest_framework.renderers import BaseRenderer
+
+from .models import Game
+
+# 서버 측 커서에서 한 번에 가져오는 행 수
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = ['id', 'played_at', 'game_mode', 'result', 'opponent_id', 'opponent']
+
+
+def export_queryset(user):
+    """
+    내보낼 게임을 최신순으로, 상대방 이름을 조인한 dict로 조회합니다. (모델 인스턴스를 만들지 않음)
+    values_list()는 aiterator()에서 쿼리를 이벤트 루프 스레드에서 실행하므로 values()를 사용합니다.
+    """
+    return (Game.objects.filter(Q(winner=user) | Q(loser=user))
+            .order_by('-played_at', '-game_id')
+            .values('game_id', 'played_at', 'game_mode', 'winner_id',
+                    'player1_id', 'player1__username', 'player2_id', 'player2__username'))
+
+
+def export_row(row, user_id):
+    if row['player1_id'] == user_id:
+        opponent_id, opponent = row['player2_id'], row['player2__username']
+    else:
+        opponent_id, opponent = row['player1_id'], row['player1__username']
+    return {
+        'id': row['game_id'],
+        'played_at': row['played_at'].astimezone(timezone.utc).isoformat().replace('+00:00', 'Z'),
+        'game_mode': row['game_mode'],
+        'result': 'win' if row['winner_id'] == user_id else 'loss',
+        'opponent_id': opponent_id,
+        'opponent': opponent,
+    }
+
+
+class Echo:
+    """csv.writer가 쓴 한 줄을 그대로 돌려주는 파일 객체"""
+
+    def write(self, value):
+        return value
+
+
+async def stream_export(user, export_format):
+    """
+    사용자의 전체 게임 기록을 NDJSON 또는 CSV 한 줄씩 내보내는 비동기 제너레이터입니다.
+    - aiterator()로 서버 측 커서에서 EXPORT_CHUNK_SIZE행씩 읽으므로, ASGI(daphne)에서는 게임 수와 관계없이 메모리 사용량이 일정합니다.
+    """
+    writer = csv.writer(Echo()) if export_format == 'csv' else None
+    if writer:
+        yield writer.writerow(EXPORT_FIELDS)
+    async for row in export_queryset(user).aiterator(chunk_size=EXPORT_CHUNK_SIZE):
+        data = export_row(row, user.id)
+        if writer:
+            yield writer.writerow([data[field] for field in EXPORT_FIELDS])
+        else:
+            yield json.dumps(data, ensure_ascii=False) + '\n'
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    '?format=ndjson' 콘텐츠 협상용 렌더러입니다.
+    정상 응답은 StreamingHttpResponse로 직접 보내므로, 인증 실패 등 오류 응답만 한 줄의 JSON으로 렌더링합니다.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return (json.dumps(data, ensure_ascii=False) + '\n').encode(self.charset)
+
+
+class CSVRenderer(BaseRenderer):
+    """'?format=csv' 콘텐츠 협상용 렌더러입니다. 오류 응답은 키를 헤더로 한 한 행짜리 CSV로 렌더링합니다."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, dict):
+            data = {'detail': data}
+        writer = csv.writer(Echo())
+        return (writer.writerow(data.keys()) + writer.writerow(data.values())).encode(self.charset)
@@ -0,0 +1,87 @@
+from collections import defaultdict
+
+from .models import HeadToHead
+
+
+def pair_key(user_a_id, user_b_id):
+    """두 사용자의 (id가 작은 쪽, 큰 쪽) 순서쌍"""
+    return (user_a_id, user_b_id) if user_a_id < user_b_id else (user_b_id, user_a_id)
+
+
+def apply_head_to_head(games):
+    """
+    확정된 게임 결과를 두 사용자의 상대 전적(HeadToHead)에 반영합니다.
+    - 호출자의 트랜잭션 안에서, 없는 행을 한 번에 만들고(이미 있으면 무시) 순서쌍 순서대로 한 번에 잠근 뒤
+      bulk_update 한 번으로 저장합니다.
+    """
+    changes = defaultdict(lambda: [0, 0, None])
+    for game in games:
+        if game.winner_id is None or game.loser_id is None or game.winner_id == game.loser_id:
+            continue
+        key = (*pair_key(game.winner_id, game.loser_id), game.game_mode)
+        change = changes[key]
+        change[0 if game.winner_id == key[0] else 1] += 1
+        if change[2] is None or game.played_at > change[2]:
+            change[2] = game.played_at
+    if not changes:
+        return
+
+    HeadToHead.objects.bulk_create(
+        [HeadToHead(user_low_id=low, user_high_id=high, game_mode=game_mode) for low, high, game_mode in changes],
+        ignore_conflicts=True,
+    )
+    rows = (HeadToHead.objects.select_for_update()
+            .filter(user_low_id__in={key[0] for key in changes}, user_high_id__in={key[1] for key in changes},
+                    game_mode__in={key[2] for key in changes})
+            .order_by('user_low_id', 'user_high_id', 'game_mode'))
+    changed = []
+    for row in rows:
+        change = changes.get((row.user_low_id, row.user_high_id, row.game_mode))
+        if change is None:
+            continue
+        row.low_wins += change[0]
+        row.high_wins += change[1]
+        if row.last_played_at is None or change[2] > row.last_played_at:
+            row.last_played_at = change[2]
+        changed.append(row)
+    HeadToHead.objects.bulk_update(changed, ['low_wins', 'high_wins', 'last_played_at'], batch_size=1000)
+
+
+def revert_head_to_head(game):
+    """
+    삭제되는 게임의 결과를 상대 전적에서 되돌립니다.
+    last_played_at은 UserStats와 마찬가지로 되돌리지 않습니다.
+    """
+    if game.winner_id is None or game.loser_id is None or game.winner_id == game.loser_id:
+        return
+    low, high = pair_key(game.winner_id, game.loser_id)
+    row = (HeadToHead.objects.select_for_update()
+           .filter(user_low_id=low, user_high_id=high, game_mode=game.game_mode).first())
+    if row is None:
+        return
+    if game.winner_id == low:
+        row.low_wins = max(row.low_wins - 1, 0)
+    else:
+        row.high_wins = max(row.high_wins - 1, 0)
+    row.save(update_fields=['low_wins', 'high_wins'])
+
+
+def head_to_head(user_id, other_id):
+    """
+    user_id 기준의 상대 전적을 {'wins', 'losses', 'modes': {game_mode: {'wins', 'losses'}}, 'lastPlayedAt'}로 반환합니다.
+    """
+    low, high = pair_key(user_id, other_id)
+    result = {'wins': 0, 'losses': 0, 'modes': {}, 'lastPlayedAt': None}
+    last_played_at = None
+    for row in HeadToHead.objects.filter(user_low_id=low, user_high_id=high).order_by('game_mode'):
+        wins, losses = (row.low_wins, row.high_wins) if user_id == low else (row.high_wins, row.low_wins)
+        if not wins and not losses:
+            continue
+        result['wins'] += wins
+        result['losses'] += losses
+        result['modes'][row.game_mode] = {'wins': wins, 'losses': losses}
+        if row.last_played_at and (last_played_at is None or row.last_played_at > last_played_at):
+            last_played_at = row.last_played_at
+    if last_played_at is not None:
+        result['lastPlayedAt'] = last_played_at.strftime('%Y-%m-%d %H:%M:%S')
+    return result
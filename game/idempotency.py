@@ -0,0 +1,39 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+
+def request_fingerprint(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def expiry_cutoff():
+    return timezone.now() - timedelta(seconds=settings.IDEMPOTENCY['TTL'])
+
+
+def find_idempotent_result(user, key):
+    """기록된 키가 있으면 반환하고, TTL이 지난 키는 지운 뒤 None을 반환합니다."""
+    previous = IdempotencyKey.objects.filter(user=user, key=key).first()
+    if previous is not None and previous.created_at < expiry_cutoff():
+        previous.delete()
+        return None
+    return previous
+
+
+def remember_idempotent_result(user, key, fingerprint, game_id):
+    """
+    키와 생성한 game_id를 기록합니다.
+    같은 키로 동시에 들어온 다른 요청이 먼저 기록했으면 그 기록을 반환하며, 호출자는 자신의 트랜잭션을 롤백해야 합니다.
+    """
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(user=user, key=key, fingerprint=fingerprint, game_id=game_id)
+    except IntegrityError:
+        return IdempotencyKey.objects.get(user=user, key=key)
+    return None
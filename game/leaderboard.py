@@ -0,0 +1,118 @@
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from .models import Rating
+
+
+class ModeRanking:
+    """
+    한 game_mode의 레이팅 순위를 (-rating, user_id) 순서로 정렬된 리스트로 보관합니다.
+    - 순위 조회는 bisect로 O(log n)이며, 레이팅 변경은 기존 키를 지우고 다시 끼워 넣습니다.
+    - 동점이면 user_id가 작은 사용자가 앞 순위입니다.
+    """
+
+    def __init__(self, rows, loaded_at):
+        self.entries = {user_id: (rating, games) for user_id, rating, games in rows}
+        self.keys = sorted((-rating, user_id) for user_id, (rating, _) in self.entries.items())
+        self.loaded_at = loaded_at
+
+    def __len__(self):
+        return len(self.keys)
+
+    def update(self, user_id, rating, games):
+        previous = self.entries.get(user_id)
+        if previous is not None:
+            del self.keys[bisect_left(self.keys, (-previous[0], user_id))]
+        self.entries[user_id] = (rating, games)
+        insort(self.keys, (-rating, user_id))
+
+    def rank(self, user_id):
+        """1부터 시작하는 순위, 레이팅이 없으면 None"""
+        entry = self.entries.get(user_id)
+        if entry is None:
+            return None
+        return bisect_left(self.keys, (-entry[0], user_id)) + 1
+
+    def slice(self, start, stop):
+        """[(rank, user_id, rating, games), ...] (start, stop은 0부터 시작하는 위치)"""
+        start = max(start, 0)
+        return [(start + offset + 1, user_id, -negative_rating, self.entries[user_id][1])
+                for offset, (negative_rating, user_id) in enumerate(self.keys[start:stop])]
+
+
+class Leaderboard:
+    """
+    game_mode별 순위를 프로세스 내부에 보관하는 서비스입니다.
+    - 처음 조회할 때와 TTL이 지났을 때 rating 테이블을 (game_mode, -rating) 인덱스 순서로 한 번 읽습니다.
+    - 이 프로세스에서 확정된 게임의 레이팅 변경은 커밋 이후 update()로 바로 반영되고,
+      다른 프로세스의 변경은 최대 TTL초 뒤 다시 읽을 때 반영됩니다.
+    """
+
+    def __init__(self, ttl=None, clock=time.monotonic):
+        self._ttl = ttl
+        self.clock = clock
+        self._rankings = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return self._ttl or settings.LEADERBOARD['TTL']
+
+    def _ranking(self, game_mode):
+        # self._lock을 잡은 상태에서 호출
+        ranking = self._rankings.get(game_mode)
+        if ranking is None or ranking.loaded_at + self.ttl <= self.clock():
+            ranking = self._load(game_mode)
+            self._rankings[game_mode] = ranking
+        return ranking
+
+    def _load(self, game_mode):
+        loaded_at = self.clock()
+        rows = (Rating.objects.filter(game_mode=game_mode)
+                .order_by('-rating', 'user_id')
+                .values_list('user_id', 'rating', 'games'))
+        return ModeRanking(rows.iterator(chunk_size=10000), loaded_at)
+
+    def total(self, game_mode):
+        with self._lock:
+            return len(self._ranking(game_mode))
+
+    def top(self, game_mode, limit):
+        with self._lock:
+            return self._ranking(game_mode).slice(0, limit)
+
+    def around(self, game_mode, user_id, k):
+        """내 순위 앞뒤 k명 (레이팅이 없으면 빈 리스트)"""
+        with self._lock:
+            ranking = self._ranking(game_mode)
+            rank = ranking.rank(user_id)
+            if rank is None:
+                return []
+            return ranking.slice(rank - 1 - k, rank + k)
+
+    def rank(self, game_mode, user_id):
+        with self._lock:
+            return self._ranking(game_mode).rank(user_id)
+
+    def update(self, game_mode, rows):
+        """rows: [(user_id, rating, games), ...] 아직 읽지 않은 모드는 다음 조회 때 DB에서 읽으므로 무시합니다."""
+        with self._lock:
+            ranking = self._rankings.get(game_mode)
+            if ranking is not None:
+                for user_id, rating, games in rows:
+                    ranking.update(user_id, rating, games)
+
+    def invalidate(self, *game_modes):
+        with self._lock:
+            for game_mode in game_modes:
+                self._rankings.pop(game_mode, None)
+
+    def clear(self):
+        with self._lock:
+            self._rankings.clear()
+
+
+leaderboard = Leaderboard()
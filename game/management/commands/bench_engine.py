@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import numpy as np
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from game.engine import MatchBatch, game_group_name
+from game.models import Game
+from ts.bench import percentile
+
+
+class Command(BaseCommand):
+    help = ('MatchBatch로 N개의 경기를 동시에 진행하며 한 틱(물리 계산 + 델타 프레임 인코딩)에 걸리는 시간을 재고, '
+            '한 코어가 해당 모드의 틱 주기를 지키며 진행할 수 있는 경기 수를 추정합니다. '
+            '--transport를 주면 GameEngine과 같이 경기마다 순서대로 group_send하는 시간까지 포함합니다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=[mode for mode, _ in Game.GAME_MODE_CHOICES], default='normal')
+        parser.add_argument('--matches', type=int, action='append', help='동시 경기 수 (여러 번 지정 가능)')
+        parser.add_argument('--ticks', type=int, default=600, help='측정할 틱 수')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--transport', action='store_true',
+                            help='설정된 채널 레이어(CHANNEL_LAYERS)로 프레임을 실제로 전송하는 시간까지 측정')
+
+    def handle(self, *args, **options):
+        config = settings.GAME_ENGINE['MODES'][options['mode']]
+        loop = asyncio.new_event_loop()
+        try:
+            for matches in options['matches'] or [100, 1000, 5000]:
+                transport = FrameTransport(loop, get_channel_layer()) if options['transport'] else None
+                self.run(options['mode'], config, matches, options['ticks'], options['seed'], transport)
+        finally:
+            loop.close()
+        if not options['transport']:
+            self.stdout.write(self.style.WARNING(
+                '채널 레이어 전송(경기마다 순서대로 group_send)은 포함되지 않았으므로 실제 수용량은 이보다 적습니다. '
+                '--transport로 포함하여 측정하세요.'))
+
+    def run(self, mode, config, matches, ticks, seed, transport=None):
+        batch = MatchBatch(config, capacity=matches, seed=seed)
+        for game_id in range(matches):
+            batch.add(game_id)
+        next_game_id = matches
+        keyframe_interval = settings.GAME_ENGINE['KEYFRAME_INTERVAL']
+        if transport:
+            transport.subscribe(range(matches))
+
+        tick_times, step_times, send_times, frame_bytes = [], [], [], 0
+        finished_count = 0
+        for tick in range(ticks):
+            # 공을 따라가되 가끔 반응하지 않는 패들 (경기가 끝나도록)
+            gap = batch.ball[:, 1:2] - batch.paddles
+            batch.inputs[:] = np.sign(gap) * (np.abs(gap) > 0.05) * (batch.rng.random(batch.paddles.shape) > 0.2)
+
+            started = time.perf_counter()
+            finished = batch.step()
+            step_times.append(time.perf_counter() - started)
+            frames = batch.frames(tick, keyframe=tick % keyframe_interval == 0)
+            if transport:
+                sent = time.perf_counter()
+                transport.send(frames)
+                send_times.append(time.perf_counter() - sent)
+            tick_times.append(time.perf_counter() - started)
+
+            frame_bytes += sum(len(text) for _, text in frames)
+            for game_id, _ in finished:
+                batch.remove(game_id)
+                batch.add(next_game_id)
+                if transport:
+                    transport.unsubscribe([game_id])
+                    transport.subscribe([next_game_id])
+                next_game_id += 1
+            finished_count += len(finished)
+        if transport:
+            transport.unsubscribe(list(batch.slots))
+
+        mean = sum(tick_times) / len(tick_times)
+        tick_rate = config['TICK_RATE']
+        per_core = int(matches / (mean * tick_rate)) if mean else 0
+        self.stdout.write(f"{mode} x{matches}: tick p50={percentile(tick_times, 50) * 1000:.2f}ms "
+                          f"p99={percentile(tick_times, 99) * 1000:.2f}ms "
+                          f"(physics p50={percentile(step_times, 50) * 1000:.2f}ms"
+                          + (f", send p50={percentile(send_times, 50) * 1000:.2f}ms" if transport else '')
+                          + "), "
+                          f"frame {frame_bytes / max(matches * ticks, 1):.1f}B/match/tick, "
+                          f"finished {finished_count}, "
+                          f"~{per_core} matches/core at {tick_rate}Hz")
+
+
+class FrameTransport:
+    """
+    GameEngine과 같이 경기마다 순서대로 group_send하여 채널 레이어 전송 시간을 측정합니다.
+    경기마다 수신 채널 하나를 그룹에 넣어 실제로 전달되도록 합니다. (받은 메시지는 채널 용량을 넘으면 버려짐)
+    """
+
+    def __init__(self, loop, channel_layer):
+        self.loop = loop
+        self.channel_layer = channel_layer
+        self.channels = {}
+
+    def subscribe(self, game_ids):
+        self.loop.run_until_complete(self._subscribe(game_ids))
+
+    def unsubscribe(self, game_ids):
+        self.loop.run_until_complete(self._unsubscribe(game_ids))
+
+    def send(self, frames):
+        self.loop.run_until_complete(self._send(frames))
+
+    async def _subscribe(self, game_ids):
+        for game_id in game_ids:
+            self.channels[game_id] = await self.channel_layer.new_channel()
+            await self.channel_layer.group_add(game_group_name(game_id), self.channels[game_id])
+
+    async def _unsubscribe(self, game_ids):
+        for game_id in game_ids:
+            await self.channel_layer.group_discard(game_group_name(game_id), self.channels.pop(game_id))
+
+    async def _send(self, frames):
+        for game_id, text in frames:
+            await self.channel_layer.group_send(game_group_name(game_id), {'type': 'game.frame', 'text': text})
@@ -0,0 +1,102 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from game.matchmaking import Matchmaker
+from game.models import Game
+from ts.bench import percentile
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Command(BaseCommand):
+    help = ('가상의 시계로 플레이어 도착을 시뮬레이션하여 Matchmaker의 매칭 대기 시간(시뮬레이션 초)과 '
+            'enqueue/sweep 한 번에 걸리는 실제 시간을 측정합니다. (DB, 웹소켓 사용 없음)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--players', type=int, default=20000, help='도착할 플레이어 수')
+        parser.add_argument('--arrival-rate', type=float, default=200, help='초당 도착하는 플레이어 수')
+        parser.add_argument('--rating-mean', type=float, default=1500)
+        parser.add_argument('--rating-std', type=float, default=200)
+        parser.add_argument('--cancel-ratio', type=float, default=0.05, help='매칭 전에 취소하는 플레이어 비율')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        clock = SimulatedClock()
+        matchmaker = Matchmaker(clock=clock)
+        modes = [mode for mode, _ in Game.GAME_MODE_CHOICES]
+        interval = settings.MATCHMAKING['SWEEP_INTERVAL']
+
+        enqueued_at = {}
+        latencies = []
+        rating_gaps = []
+        enqueue_times, dequeue_times, sweep_times = [], [], []
+        peak_queue = cancelled = 0
+        cancels = []
+        next_sweep = interval
+
+        def record(pairs):
+            for ticket, other in pairs:
+                rating_gaps.append(abs(ticket.rating - other.rating))
+                for user_id in (ticket.user_id, other.user_id):
+                    latencies.append(clock.now - enqueued_at.pop(user_id))
+
+        def advance(until):
+            nonlocal next_sweep, cancelled
+            while next_sweep <= until:
+                clock.now = next_sweep
+                while cancels and cancels[0][0] <= clock.now:
+                    _, user_id = cancels.pop(0)
+                    started = time.perf_counter()
+                    ticket = matchmaker.dequeue(user_id)
+                    dequeue_times.append(time.perf_counter() - started)
+                    if ticket is not None:
+                        enqueued_at.pop(user_id)
+                        cancelled += 1
+                started = time.perf_counter()
+                pairs = matchmaker.sweep()
+                sweep_times.append(time.perf_counter() - started)
+                record(pairs)
+                next_sweep += interval
+            clock.now = until
+
+        arrival = 0.0
+        for user_id in range(options['players']):
+            arrival += rng.expovariate(options['arrival_rate'])
+            advance(arrival)
+            ticket = matchmaker.ticket(user_id, f'player{user_id}', f'channel{user_id}', rng.choice(modes),
+                                       rng.gauss(options['rating_mean'], options['rating_std']))
+            enqueued_at[user_id] = clock.now
+            started = time.perf_counter()
+            opponent = matchmaker.enqueue(ticket)
+            enqueue_times.append(time.perf_counter() - started)
+            if opponent is not None:
+                record([(opponent, ticket)])
+            elif rng.random() < options['cancel_ratio']:
+                cancels.append((clock.now + rng.uniform(1, 30), user_id))
+                cancels.sort()
+            peak_queue = max(peak_queue, len(matchmaker))
+
+        # 허용 범위가 최대가 될 때까지 남은 대기자 처리
+        config = settings.MATCHMAKING
+        advance(clock.now + (config['MAX_WINDOW'] - config['INITIAL_WINDOW']) / config['WIDEN_PER_SECOND'] + interval)
+
+        def us(values, p):
+            return f'{percentile(values, p) * 1e6:.1f}us'
+
+        self.stdout.write(f"players: {options['players']}, matched: {len(latencies)}, cancelled: {cancelled}, "
+                          f"unmatched: {len(matchmaker)}, peak queue: {peak_queue}")
+        self.stdout.write(f"match latency p50={percentile(latencies, 50):.2f}s p95={percentile(latencies, 95):.2f}s "
+                          f"p99={percentile(latencies, 99):.2f}s max={max(latencies, default=0):.2f}s")
+        self.stdout.write(f"rating gap p50={percentile(rating_gaps, 50):.1f} p95={percentile(rating_gaps, 95):.1f}")
+        self.stdout.write(f"enqueue p50={us(enqueue_times, 50)} p99={us(enqueue_times, 99)}, "
+                          f"dequeue p99={us(dequeue_times, 99)}, sweep p50={us(sweep_times, 50)} p99={us(sweep_times, 99)}")
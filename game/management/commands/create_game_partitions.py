@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from game.partitions import ensure_partitions, partition_name
+
+
+class Command(BaseCommand):
+    help = ('game 테이블의 월 파티션을 이번 달 이후까지 미리 만들고, 기본 파티션에 쌓인 게임을 해당 월 파티션으로 옮깁니다. '
+            '(PostgreSQL 전용, 매달 주기적으로 실행)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=settings.GAME_PARTITIONS['MONTHS_AHEAD'])
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            try:
+                created = ensure_partitions(cursor, options['months_ahead'])
+            except ValueError as e:
+                raise CommandError(str(e))
+        for month, moved in created:
+            self.stdout.write(f'{partition_name(month)} 생성 (기본 파티션에서 {moved}개 이동)')
+        self.stdout.write(self.style.SUCCESS(f'{len(created)}개의 파티션을 만들었습니다.'))
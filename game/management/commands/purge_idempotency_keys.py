@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from game.idempotency import expiry_cutoff
+from game.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "IDEMPOTENCY['TTL']이 지난 Idempotency-Key 기록을 지웁니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='한 번에 지울 행 수 (긴 잠금을 피하기 위해 나누어 삭제)')
+
+    def handle(self, *args, **options):
+        cutoff = expiry_cutoff()
+        deleted = 0
+        while True:
+            ids = list(IdempotencyKey.objects.filter(created_at__lt=cutoff)
+                       .values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'{deleted}개의 만료된 Idempotency-Key를 지웠습니다.'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, Max
+
+from game.head_to_head import pair_key
+from game.models import Game, HeadToHead
+from game.partitions import detached_history_message, detached_history_months
+
+
+class Command(BaseCommand):
+    help = ('game 테이블로부터 head_to_head(상대 전적) 테이블을 처음부터 다시 계산합니다. '
+            'game_rollup에는 상대 정보가 없으므로, 분리된 파티션이 있으면 --allow-partial 없이는 실행하지 않습니다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--allow-partial', action='store_true',
+                            help='분리된 파티션의 게임이 빠진 채로 다시 계산하여 저장')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        detached = detached_history_months()
+        if detached:
+            if not options['allow_partial']:
+                raise CommandError(detached_history_message(detached))
+            self.stdout.write(self.style.WARNING(detached_history_message(detached)))
+        pairs = {}
+        rows = (Game.objects.filter(player2__isnull=False, winner__isnull=False, loser__isnull=False)
+                .exclude(winner=F('loser'))
+                .values('winner_id', 'loser_id', 'game_mode')
+                .annotate(count=Count('game_id'), last_played_at=Max('played_at'))
+                .order_by())
+        for row in rows.iterator(chunk_size=5000):
+            low, high = pair_key(row['winner_id'], row['loser_id'])
+            pair = pairs.setdefault((low, high, row['game_mode']),
+                                    HeadToHead(user_low_id=low, user_high_id=high, game_mode=row['game_mode']))
+            if row['winner_id'] == low:
+                pair.low_wins += row['count']
+            else:
+                pair.high_wins += row['count']
+            if pair.last_played_at is None or row['last_played_at'] > pair.last_played_at:
+                pair.last_played_at = row['last_played_at']
+
+        HeadToHead.objects.all().delete()
+        HeadToHead.objects.bulk_create(pairs.values(), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{len(pairs)}개의 상대 전적을 다시 계산했습니다.'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+
+from game.models import Game, GameRollup, UserStats
+
+
+class Command(BaseCommand):
+    help = 'game 테이블과 분리된 파티션의 집계(game_rollup)로부터 user_stats 테이블을 처음부터 다시 계산합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        stats = {}
+
+        def merge(user_id, game_mode, result, count, last_played_at):
+            if not count:
+                return
+            entry = stats.setdefault(user_id, UserStats(user_id=user_id, mode_stats={}))
+            setattr(entry, result, getattr(entry, result) + count)
+            mode = entry.mode_stats.setdefault(game_mode, {'wins': 0, 'losses': 0})
+            mode[result] += count
+            if entry.last_played_at is None or last_played_at > entry.last_played_at:
+                entry.last_played_at = last_played_at
+
+        completed = Game.objects.filter(player2__isnull=False, winner__isnull=False, loser__isnull=False)
+        for field, result in (('winner', 'wins'), ('loser', 'losses')):
+            rows = (completed.values(f'{field}_id', 'game_mode')
+                    .annotate(count=Count('game_id'), last_played_at=Max('played_at'))
+                    .order_by())
+            for row in rows:
+                merge(row[f'{field}_id'], row['game_mode'], result, row['count'], row['last_played_at'])
+
+        rollups = (GameRollup.objects.values('user_id', 'game_mode')
+                   .annotate(wins=Sum('wins'), losses=Sum('losses'), last_played_at=Max('last_played_at'))
+                   .order_by())
+        for row in rollups:
+            for result in ('wins', 'losses'):
+                merge(row['user_id'], row['game_mode'], result, row[result], row['last_played_at'])
+
+        UserStats.objects.all().delete()
+        UserStats.objects.bulk_create(stats.values(), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{len(stats)}명의 게임 전적을 다시 계산했습니다.'))
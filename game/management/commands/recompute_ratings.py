@@ -0,0 +1,79 @@
+import time
+from itertools import chain
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+
+from game.leaderboard import leaderboard
+from game.models import Game, Rating
+from game.partitions import detached_history_message, detached_history_months
+from game.rating import replay_ratings
+
+
+class Command(BaseCommand):
+    help = ('game 테이블 전체를 played_at 순서로 재생하여 모드별 Elo 레이팅을 다시 계산합니다. '
+            '--check를 주면 저장된 값과 비교만 합니다. '
+            'rollup_game_partitions로 분리된 파티션의 게임은 재생할 수 없으므로, 분리된 게임이 있으면 '
+            '--allow-partial 없이는 저장하지 않습니다.')
+
+    def add_arguments(self, parser):
+        modes = [mode for mode, _ in Game.GAME_MODE_CHOICES]
+        parser.add_argument('--mode', action='append', choices=modes, help='계산할 game_mode (기본: 전체)')
+        parser.add_argument('--check', action='store_true', help='저장하지 않고 저장된 레이팅과의 차이만 출력')
+        parser.add_argument('--tolerance', type=float, default=1e-6, help='--check에서 같은 값으로 볼 오차')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--allow-partial', action='store_true',
+                            help='분리된 파티션의 게임이 빠진 채로 다시 계산하여 저장')
+
+    def handle(self, *args, **options):
+        modes = options['mode'] or [mode for mode, _ in Game.GAME_MODE_CHOICES]
+        detached = detached_history_months(modes)
+        if detached:
+            if not options['check'] and not options['allow_partial']:
+                raise CommandError(detached_history_message(detached))
+            self.stdout.write(self.style.WARNING(detached_history_message(detached)))
+        for mode in modes:
+            started = time.perf_counter()
+            pairs = self.load_games(mode)
+            loaded = time.perf_counter()
+            user_ids, ratings, games = replay_ratings(pairs[:, 0], pairs[:, 1])
+            computed = time.perf_counter()
+            if options['check']:
+                self.compare_ratings(mode, user_ids, ratings, options['tolerance'])
+            else:
+                self.save(mode, user_ids, ratings, games, options['batch_size'])
+            self.stdout.write(f'{mode}: {len(pairs)} games, {len(user_ids)} users '
+                              f'(load {loaded - started:.2f}s, compute {computed - loaded:.2f}s, '
+                              f'{"check" if options["check"] else "save"} {time.perf_counter() - computed:.2f}s)')
+
+    def load_games(self, mode):
+        rows = (Game.objects.filter(game_mode=mode, player2__isnull=False, winner__isnull=False, loser__isnull=False)
+                .exclude(winner=F('loser'))
+                .order_by('played_at', 'game_id')
+                .values_list('winner_id', 'loser_id'))
+        flat = np.fromiter(chain.from_iterable(rows.iterator(chunk_size=10000)), dtype=np.int64)
+        return flat.reshape(-1, 2)
+
+    @transaction.atomic
+    def save(self, mode, user_ids, ratings, games, batch_size):
+        Rating.objects.filter(game_mode=mode).delete()
+        Rating.objects.bulk_create(
+            (Rating(user_id=user_id, game_mode=mode, rating=rating, games=count)
+             for user_id, rating, count in zip(user_ids.tolist(), ratings.tolist(), games.tolist())),
+            batch_size=batch_size,
+        )
+        transaction.on_commit(lambda: leaderboard.invalidate(mode))
+
+    def compare_ratings(self, mode, user_ids, ratings, tolerance):
+        stored = dict(Rating.objects.filter(game_mode=mode).values_list('user_id', 'rating'))
+        expected = dict(zip(user_ids.tolist(), ratings.tolist()))
+        mismatched = [user_id for user_id in stored.keys() | expected.keys()
+                      if user_id not in stored or user_id not in expected
+                      or abs(stored[user_id] - expected[user_id]) > tolerance]
+        if mismatched:
+            self.stdout.write(self.style.WARNING(f'{mode}: {len(mismatched)}명의 레이팅이 다릅니다. '
+                                                 f'(예: {sorted(mismatched)[:10]})'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{mode}: 저장된 레이팅이 game 테이블과 일치합니다.'))
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from game.partitions import (add_months, check_partitioned, detach_partition, list_partitions, month_start,
+                             rollup_partition)
+
+
+class Command(BaseCommand):
+    help = ('HOT_MONTHS보다 오래된 game 월 파티션을 game_rollup에 집계한 뒤 game 테이블에서 분리합니다. '
+            '분리한 파티션은 기본적으로 ARCHIVE_SCHEMA로 옮겨집니다. (PostgreSQL 전용)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-months', type=int, default=settings.GAME_PARTITIONS['HOT_MONTHS'],
+                            help='이번 달을 포함해 game 테이블에 남겨 둘 개월 수')
+        parser.add_argument('--action', choices=['archive', 'detach', 'drop'], default='archive',
+                            help='archive: 보관 스키마로 이동, detach: 분리만 함, drop: 테이블 삭제')
+        parser.add_argument('--dry-run', action='store_true', help='대상 파티션만 출력')
+
+    def handle(self, *args, **options):
+        if options['keep_months'] < 1:
+            raise CommandError('--keep-months는 1 이상이어야 합니다.')
+        with connection.cursor() as cursor:
+            try:
+                check_partitioned(cursor)
+            except ValueError as e:
+                raise CommandError(str(e))
+            cutoff = add_months(month_start(timezone.now()), 1 - options['keep_months'])
+            targets = sorted((month, name) for month, name in list_partitions(cursor).items() if month < cutoff)
+
+            for month, name in targets:
+                if options['dry_run']:
+                    self.stdout.write(f'{name} (dry-run)')
+                    continue
+                # 파티션 하나씩 집계와 분리를 같은 트랜잭션에서 처리하여 집계 없이 분리되는 일이 없도록 함
+                with transaction.atomic():
+                    rows = rollup_partition(cursor, month, name)
+                    detach_partition(
+                        cursor, name,
+                        archive_schema=settings.GAME_PARTITIONS['ARCHIVE_SCHEMA'] if options['action'] == 'archive' else None,
+                        drop=options['action'] == 'drop',
+                    )
+                self.stdout.write(f'{name}: 집계 {rows}행, {options["action"]}')
+        self.stdout.write(self.style.SUCCESS(f'{len(targets)}개의 파티션을 처리했습니다.'))
+        if targets and not options['dry_run']:
+            # 분리된 게임은 사용자별 집계로만 남으므로 game 테이블 전체를 재생하는 명령어는 더 이상 같은 결과를 만들 수 없음
+            self.stdout.write(self.style.WARNING(
+                '분리된 게임은 rebuild_user_stats에만 game_rollup으로 반영됩니다. '
+                'recompute_ratings와 rebuild_head_to_head는 이 게임들을 다시 계산할 수 없으므로 '
+                '--allow-partial 없이는 실행되지 않습니다.'))
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import time
+from collections import namedtuple
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from sortedcontainers import SortedList
+
+from .models import Game, Rating
+
+logger = logging.getLogger(__name__)
+
+Ticket = namedtuple('Ticket', ['user_id', 'username', 'channel_name', 'game_mode', 'rating', 'enqueued_at'])
+
+
+def search_window(ticket, now):
+    """대기 시간에 따라 넓어지는 레이팅 허용 범위"""
+    config = settings.MATCHMAKING
+    waited = max(now - ticket.enqueued_at, 0)
+    return min(config['INITIAL_WINDOW'] + config['WIDEN_PER_SECOND'] * waited, config['MAX_WINDOW'])
+
+
+def can_match(a, b, now):
+    # 더 오래 기다린 쪽의 허용 범위를 기준으로 하여 대기 시간이 길어질수록 매칭되기 쉽게 함
+    return abs(a.rating - b.rating) <= max(search_window(a, now), search_window(b, now))
+
+
+class ModeQueue:
+    """
+    한 game_mode의 대기열을 (rating, enqueued_at, user_id) 순서로 SortedList에 보관합니다.
+    - 추가/삭제/위치 찾기가 모두 O(log n)이며, 파이썬 리스트의 insort/del처럼 원소를 밀어내지 않습니다.
+    - 레이팅이 가장 가까운 상대는 항상 정렬 위치의 바로 앞뒤에 있으므로 bisect로 찾습니다.
+    """
+
+    def __init__(self):
+        self.keys = SortedList()
+        self.tickets = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    @staticmethod
+    def key(ticket):
+        return ticket.rating, ticket.enqueued_at, ticket.user_id
+
+    def add(self, ticket):
+        self.tickets[ticket.user_id] = ticket
+        self.keys.add(self.key(ticket))
+
+    def remove(self, user_id):
+        ticket = self.tickets.pop(user_id, None)
+        if ticket is not None:
+            self.keys.remove(self.key(ticket))
+        return ticket
+
+    def nearest(self, ticket, now):
+        """ticket과 매칭 가능한 가장 가까운 레이팅의 상대 (ticket은 아직 대기열에 없어야 함)"""
+        index = self.keys.bisect_left(self.key(ticket))
+        candidates = [self.tickets[self.keys[i][2]] for i in (index - 1, index) if 0 <= i < len(self.keys)]
+        candidates = [other for other in candidates if can_match(ticket, other, now)]
+        return min(candidates, key=lambda other: abs(other.rating - ticket.rating), default=None)
+
+    def sweep(self, now):
+        """레이팅 순서로 이웃한 두 사람씩 확인하여 허용 범위가 넓어진 대기자끼리 매칭합니다. (O(n))"""
+        pairs = []
+        remaining = []
+        # SortedList의 인덱스 접근은 O(log n)이므로 한 번 리스트로 꺼내서 순회
+        keys = list(self.keys)
+        index = 0
+        while index < len(keys):
+            ticket = self.tickets[keys[index][2]]
+            if index + 1 < len(keys):
+                other = self.tickets[keys[index + 1][2]]
+                if can_match(ticket, other, now):
+                    pairs.append((ticket, other))
+                    index += 2
+                    continue
+            remaining.append(keys[index])
+            index += 1
+        if pairs:
+            self.keys = SortedList(remaining)
+            for ticket, other in pairs:
+                del self.tickets[ticket.user_id], self.tickets[other.user_id]
+        return pairs
+
+
+class Matchmaker:
+    """
+    game_mode별 대기열에서 레이팅이 비슷한 두 사용자를 매칭하는 프로세스 내부 매치메이커입니다.
+    - 대기열에 들어오는 순간 가장 가까운 상대를 찾아 바로 매칭하고,
+      없으면 대기열에 넣은 뒤 SWEEP_INTERVAL마다 넓어진 허용 범위로 다시 확인합니다.
+    - 이벤트 루프 안에서만 사용하므로 잠금이 없습니다.
+    - 대기열은 프로세스마다 따로 있으므로, 여러 daphne 프로세스를 띄우면 ws/game/matchmaking을 한 프로세스로 보내야 합니다.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.queues = {}
+        self.queued_modes = {}
+        self._task = None
+
+    def __len__(self):
+        return len(self.queued_modes)
+
+    def ticket(self, user_id, username, channel_name, game_mode, rating):
+        return Ticket(user_id, username, channel_name, game_mode, rating, self.clock())
+
+    def enqueue(self, ticket):
+        """바로 매칭되면 상대 ticket을, 아니면 None을 반환합니다."""
+        self.dequeue(ticket.user_id)
+        queue = self.queues.setdefault(ticket.game_mode, ModeQueue())
+        opponent = queue.nearest(ticket, self.clock())
+        if opponent is not None:
+            queue.remove(opponent.user_id)
+            del self.queued_modes[opponent.user_id]
+            return opponent
+        queue.add(ticket)
+        self.queued_modes[ticket.user_id] = ticket.game_mode
+        return None
+
+    def dequeue(self, user_id):
+        game_mode = self.queued_modes.pop(user_id, None)
+        if game_mode is None:
+            return None
+        return self.queues[game_mode].remove(user_id)
+
+    def sweep(self):
+        now = self.clock()
+        pairs = []
+        for queue in self.queues.values():
+            pairs.extend(queue.sweep(now))
+        for ticket, other in pairs:
+            del self.queued_modes[ticket.user_id], self.queued_modes[other.user_id]
+        return pairs
+
+    def ensure_running(self):
+        """현재 이벤트 루프에서 주기적인 sweep 태스크를 시작합니다."""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._task = loop.create_task(self._periodic())
+
+    async def _periodic(self):
+        while True:
+            await asyncio.sleep(settings.MATCHMAKING['SWEEP_INTERVAL'])
+            for ticket, other in self.sweep():
+                await self.dispatch(ticket, other)
+
+    async def dispatch(self, ticket, other):
+        """Game을 미리 만들고 두 사용자에게 match.found 이벤트를 보냅니다. 실패하면 match.failed를 보냅니다."""
+        channel_layer = get_channel_layer()
+        try:
+            game_id = await create_match_game(ticket, other)
+        except Exception:
+            logger.exception('matchmaking game creation failed')
+            for me in (ticket, other):
+                await channel_layer.send(me.channel_name, {'type': 'match.failed', 'gameMode': me.game_mode})
+            return
+        for me, opponent in ((ticket, other), (other, ticket)):
+            await channel_layer.send(me.channel_name, {
+                'type': 'match.found',
+                'gameId': game_id,
+                'gameMode': me.game_mode,
+                'opponent': {'id': opponent.user_id, 'username': opponent.username, 'rating': round(opponent.rating, 1)},
+            })
+
+
+@database_sync_to_async
+def get_rating(user_id, game_mode):
+    rating = Rating.objects.filter(user_id=user_id, game_mode=game_mode).values_list('rating', flat=True).first()
+    return settings.RATING['INITIAL'] if rating is None else rating
+
+
+@database_sync_to_async
+def create_match_game(ticket, other):
+    # 결과(winner/loser)는 게임이 끝난 뒤 기록되므로 아직 전적에 반영되지 않음
+    game = Game.objects.create(player1_id=ticket.user_id, player2_id=other.user_id, game_mode=ticket.game_mode)
+    return game.game_id
+
+
+matchmaker = Matchmaker()
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def backfill_user_stats(apps, schema_editor):
+    # 기존 게임으로 전적을 채움 (이후에는 게임 결과가 확정될 때 증분 갱신)
+    Game = apps.get_model('game', 'Game')
+    UserStats = apps.get_model('game', 'UserStats')
+    completed = Game.objects.filter(player2__isnull=False, winner__isnull=False, loser__isnull=False)
+    stats = {}
+    for field, result in (('winner', 'wins'), ('loser', 'losses')):
+        rows = (completed.values(f'{field}_id', 'game_mode')
+                .annotate(count=Count('game_id'), last_played_at=Max('played_at'))
+                .order_by())
+        for row in rows.iterator(chunk_size=5000):
+            entry = stats.setdefault(row[f'{field}_id'], UserStats(user_id=row[f'{field}_id'], mode_stats={}))
+            setattr(entry, result, getattr(entry, result) + row['count'])
+            mode = entry.mode_stats.setdefault(row['game_mode'], {'wins': 0, 'losses': 0})
+            mode[result] += row['count']
+            if entry.last_played_at is None or row['last_played_at'] > entry.last_played_at:
+                entry.last_played_at = row['last_played_at']
+    UserStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0011_alter_emailverification_type'),
+        ('game', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='game_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('losses', models.PositiveIntegerField(default=0)),
+                ('mode_stats', models.JSONField(default=dict)),
+                ('last_played_at', models.DateTimeField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'user_stats',
+            },
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0002_user_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['winner', '-played_at', '-game_id'], name='game_winner_played_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['loser', '-played_at', '-game_id'], name='game_loser_played_idx'),
+        ),
+    ]
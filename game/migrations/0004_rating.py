@@ -0,0 +1,61 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_ratings(apps, schema_editor):
+    # 기존 게임을 played_at 순서로 재생하여 레이팅을 채움 (recompute_ratings와 같은 계산)
+    Game = apps.get_model('game', 'Game')
+    Rating = apps.get_model('game', 'Rating')
+    initial, k_factor = settings.RATING['INITIAL'], settings.RATING['K_FACTOR']
+    ratings = {}
+    rows = (Game.objects.filter(player2__isnull=False, winner__isnull=False, loser__isnull=False)
+            .exclude(winner=models.F('loser'))
+            .order_by('played_at', 'game_id')
+            .values_list('game_mode', 'winner_id', 'loser_id'))
+    for game_mode, winner_id, loser_id in rows.iterator(chunk_size=5000):
+        winner = ratings.setdefault((winner_id, game_mode), [initial, 0])
+        loser = ratings.setdefault((loser_id, game_mode), [initial, 0])
+        delta = k_factor * (1 - 1 / (1 + 10 ** ((loser[0] - winner[0]) / 400)))
+        winner[0] += delta
+        loser[0] -= delta
+        winner[1] += 1
+        loser[1] += 1
+    Rating.objects.bulk_create(
+        (Rating(user_id=user_id, game_mode=game_mode, rating=rating, games=games)
+         for (user_id, game_mode), (rating, games) in ratings.items()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0003_game_history_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Rating',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_mode', models.CharField(choices=[('normal', 'Normal'), ('speed', 'Speed'), ('object', 'Object')], max_length=100)),
+                ('rating', models.FloatField(default=1500)),
+                ('games', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ratings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'rating',
+                'indexes': [models.Index(fields=['game_mode', '-rating'], name='rating_mode_rating_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='rating',
+            constraint=models.UniqueConstraint(fields=('user', 'game_mode'), name='rating_user_mode_unique'),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0005_game_version_idempotency_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_mode', models.CharField(choices=[('normal', 'Normal'), ('speed', 'Speed'), ('object', 'Object')], max_length=100)),
+                ('month', models.DateField()),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('losses', models.PositiveIntegerField(default=0)),
+                ('last_played_at', models.DateTimeField(null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'game_rollup',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='gamerollup',
+            constraint=models.UniqueConstraint(fields=('user', 'game_mode', 'month'), name='game_rollup_unique'),
+        ),
+    ]
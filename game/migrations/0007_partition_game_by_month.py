@@ -0,0 +1,97 @@
+from datetime import date, datetime, timezone
+
+from django.db import migrations
+
+# 파티션을 미리 만들어 둘 개월 수 (이후에는 'create_game_partitions' 명령어로 관리)
+MONTHS_AHEAD = 3
+
+
+def month_bounds(start, end):
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        lower = date(year, month, 1)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        yield lower, date(year, month, 1)
+
+
+def capture_definitions(cursor):
+    cursor.execute("SELECT indexname, indexdef FROM pg_indexes "
+                   "WHERE schemaname = current_schema() AND tablename = 'game' AND indexname <> 'game_pkey'")
+    indexes = cursor.fetchall()
+    cursor.execute("SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                   "WHERE conrelid = 'game'::regclass AND contype = 'f'")
+    foreign_keys = cursor.fetchall()
+    return indexes, foreign_keys
+
+
+def rebuild_game_table(schema_editor, partitioned):
+    """
+    game 테이블을 played_at 월 단위 범위 파티션 테이블로(partitioned=False이면 일반 테이블로) 다시 만듭니다.
+    - 파티션 키가 기본 키에 포함되어야 하므로 기본 키는 (game_id, played_at)이 되고, game_id는 시퀀스로 계속 유일합니다.
+    - 기존 인덱스와 FK 정의를 그대로 옮기며, 데이터 복사 후 인덱스를 만듭니다.
+    - 테이블 전체를 복사하므로 행 수에 비례하는 시간 동안 game 테이블이 잠깁니다.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    execute = schema_editor.execute
+    with schema_editor.connection.cursor() as cursor:
+        indexes, foreign_keys = capture_definitions(cursor)
+
+    # 인덱스 이름은 스키마 안에서 유일해야 하므로 기존 테이블의 인덱스를 먼저 지움 (복사도 빨라짐)
+    for name, _ in indexes:
+        execute(f'DROP INDEX {schema_editor.quote_name(name)}')
+    execute('ALTER TABLE game RENAME CONSTRAINT game_pkey TO game_old_pkey')
+    execute('ALTER TABLE game RENAME TO game_old')
+
+    if partitioned:
+        execute('CREATE TABLE game (LIKE game_old INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (played_at)')
+        # 파티션 테이블에는 identity 컬럼을 쓸 수 없으므로 일반 시퀀스를 사용 (되돌렸다가 다시 적용하면 남아 있음)
+        execute('CREATE SEQUENCE IF NOT EXISTS game_id_seq AS integer')
+        execute("ALTER TABLE game ALTER COLUMN game_id SET DEFAULT nextval('game_id_seq')")
+        execute('ALTER TABLE game ADD CONSTRAINT game_pkey PRIMARY KEY (game_id, played_at)')
+
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute('SELECT MIN(played_at) FROM game_old')
+            oldest = cursor.fetchone()[0]
+        today = datetime.now(timezone.utc).date()
+        year, month = divmod(today.month - 1 + MONTHS_AHEAD, 12)
+        last = date(today.year + year, month + 1, 1)
+        for lower, upper in month_bounds(oldest.date() if oldest else today, last):
+            execute(f"CREATE TABLE game_p{lower:%Y_%m} PARTITION OF game "
+                    f"FOR VALUES FROM ('{lower.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')")
+        # 아직 만들지 않은 월의 게임을 받는 파티션 ('create_game_partitions'가 해당 월로 옮김)
+        execute('CREATE TABLE game_default PARTITION OF game DEFAULT')
+    else:
+        execute('CREATE TABLE game (LIKE game_old INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        execute('ALTER TABLE game ADD CONSTRAINT game_pkey PRIMARY KEY (game_id)')
+
+    # game_old와 함께 시퀀스가 지워지지 않도록 소유 관계를 먼저 끊음
+    execute('ALTER SEQUENCE game_id_seq OWNED BY NONE')
+    execute('INSERT INTO game SELECT * FROM game_old')
+    execute("SELECT setval('game_id_seq', COALESCE((SELECT MAX(game_id) FROM game), 0) + 1, false)")
+    execute('DROP TABLE game_old')
+    execute('ALTER SEQUENCE game_id_seq OWNED BY game.game_id')
+
+    for _, definition in indexes:
+        execute(definition)
+    for name, definition in foreign_keys:
+        execute(f'ALTER TABLE game ADD CONSTRAINT {schema_editor.quote_name(name)} {definition}')
+
+
+def partition(apps, schema_editor):
+    rebuild_game_table(schema_editor, partitioned=True)
+
+
+def unpartition(apps, schema_editor):
+    rebuild_game_table(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0006_game_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
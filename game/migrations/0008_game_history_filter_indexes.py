@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0007_partition_game_by_month'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='game',
+            name='loser',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='games_lost', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='game',
+            name='winner',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='games_won', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['winner', 'game_mode', '-played_at', '-game_id'], name='game_winner_mode_played_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['loser', 'game_mode', '-played_at', '-game_id'], name='game_loser_mode_played_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['winner', 'loser', '-played_at', '-game_id'], name='game_winner_loser_played_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['loser', 'winner', '-played_at', '-game_id'], name='game_loser_winner_played_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def backfill_head_to_head(apps, schema_editor):
+    # 기존 게임으로 상대 전적을 채움 (이후에는 게임 결과가 확정될 때 증분 갱신)
+    Game = apps.get_model('game', 'Game')
+    HeadToHead = apps.get_model('game', 'HeadToHead')
+    if apps.get_model('game', 'GameRollup').objects.exists():
+        # 분리된 파티션의 게임은 상대 정보 없이 사용자별로만 집계되어 있으므로 빠진 채로 채우지 않음
+        raise RuntimeError('game 테이블에서 분리된 파티션이 있어 상대 전적을 채울 수 없습니다. '
+                           '보관 스키마의 파티션을 다시 붙인(ALTER TABLE game ATTACH PARTITION ...) 뒤 마이그레이션하세요.')
+    rows = (Game.objects.filter(player2__isnull=False, winner__isnull=False, loser__isnull=False)
+            .exclude(winner=models.F('loser'))
+            .values('winner_id', 'loser_id', 'game_mode')
+            .annotate(count=Count('game_id'), last_played_at=Max('played_at'))
+            .order_by())
+    pairs = {}
+    for row in rows.iterator(chunk_size=5000):
+        low, high = sorted((row['winner_id'], row['loser_id']))
+        pair = pairs.setdefault((low, high, row['game_mode']),
+                                HeadToHead(user_low_id=low, user_high_id=high, game_mode=row['game_mode']))
+        if row['winner_id'] == low:
+            pair.low_wins += row['count']
+        else:
+            pair.high_wins += row['count']
+        if pair.last_played_at is None or row['last_played_at'] > pair.last_played_at:
+            pair.last_played_at = row['last_played_at']
+    HeadToHead.objects.bulk_create(pairs.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0008_game_history_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeadToHead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_mode', models.CharField(choices=[('normal', 'Normal'), ('speed', 'Speed'), ('object', 'Object')], max_length=100)),
+                ('low_wins', models.PositiveIntegerField(default=0)),
+                ('high_wins', models.PositiveIntegerField(default=0)),
+                ('last_played_at', models.DateTimeField(null=True)),
+                ('user_high', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_low', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'head_to_head',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='headtohead',
+            constraint=models.UniqueConstraint(fields=('user_low', 'user_high', 'game_mode'), name='head_to_head_pair_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='headtohead',
+            constraint=models.CheckConstraint(check=models.Q(('user_low__lt', models.F('user_high'))), name='head_to_head_pair_order'),
+        ),
+        migrations.RunPython(backfill_head_to_head, migrations.RunPython.noop),
+    ]
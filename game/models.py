@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth import get_user_model
 
@@ -12,11 +13,154 @@ class Game(models.Model):
     game_id = models.AutoField(primary_key=True)
     player1 = models.ForeignKey(AppUser, related_name='games_as_player1', on_delete=models.CASCADE)
     player2 = models.ForeignKey(AppUser, related_name='games_as_player2', on_delete=models.CASCADE, null=True)
-    winner = models.ForeignKey(AppUser, related_name='games_won', on_delete=models.CASCADE, null=True)
-    loser = models.ForeignKey(AppUser, related_name='games_lost', on_delete=models.CASCADE, null=True)
+    # winner/loser 단독 인덱스는 아래 (winner|loser, ...) 복합 인덱스가 대신하므로 만들지 않음
+    winner = models.ForeignKey(AppUser, related_name='games_won', on_delete=models.CASCADE, null=True, db_index=False)
+    loser = models.ForeignKey(AppUser, related_name='games_lost', on_delete=models.CASCADE, null=True, db_index=False)
     game_mode = models.CharField(max_length=100, choices=GAME_MODE_CHOICES, default='normal')
     played_at = models.DateTimeField(auto_now_add=True)
+    # player2/결과를 등록할 때마다 증가하며, UPDATE ... WHERE version = n으로 동시 수정을 감지
+    version = models.PositiveIntegerField(default=0)
 
     class Meta:
         db_table = 'game'
-        
\ No newline at end of file
+        indexes = [
+            # 게임 히스토리 조회(winner/loser 기준, 최신순) 및 커서 페이지네이션용
+            models.Index(fields=['winner', '-played_at', '-game_id'], name='game_winner_played_idx'),
+            models.Index(fields=['loser', '-played_at', '-game_id'], name='game_loser_played_idx'),
+            # 게임 히스토리의 game_mode / 상대방 필터용
+            models.Index(fields=['winner', 'game_mode', '-played_at', '-game_id'], name='game_winner_mode_played_idx'),
+            models.Index(fields=['loser', 'game_mode', '-played_at', '-game_id'], name='game_loser_mode_played_idx'),
+            models.Index(fields=['winner', 'loser', '-played_at', '-game_id'], name='game_winner_loser_played_idx'),
+            models.Index(fields=['loser', 'winner', '-played_at', '-game_id'], name='game_loser_winner_played_idx'),
+        ]
+
+
+class UserStats(models.Model):
+    """
+    사용자별 게임 전적을 비정규화하여 저장하는 테이블입니다.
+    - 게임에 player2가 등록되어 결과가 확정되는 시점에 같은 트랜잭션 안에서 증분 갱신됩니다.
+    - mode_stats에는 game_mode별 승/패가 {'normal': {'wins': 0, 'losses': 0}, ...} 형태로 저장됩니다.
+    - 'rebuild_user_stats' 명령어로 game 테이블로부터 전체를 다시 계산할 수 있습니다.
+    """
+    user = models.OneToOneField(AppUser, related_name='game_stats', on_delete=models.CASCADE, primary_key=True)
+    wins = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    mode_stats = models.JSONField(default=dict)
+    last_played_at = models.DateTimeField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'user_stats'
+
+    @property
+    def total(self):
+        return self.wins + self.losses
+
+    @property
+    def win_rate(self):
+        return (self.wins / self.total * 100) if self.total > 0 else 0
+
+    def add_result(self, game_mode, won, played_at):
+        field = 'wins' if won else 'losses'
+        setattr(self, field, getattr(self, field) + 1)
+        mode = self.mode_stats.setdefault(game_mode, {'wins': 0, 'losses': 0})
+        mode[field] += 1
+        if self.last_played_at is None or played_at > self.last_played_at:
+            self.last_played_at = played_at
+
+    def remove_result(self, game_mode, won):
+        field = 'wins' if won else 'losses'
+        setattr(self, field, max(getattr(self, field) - 1, 0))
+        mode = self.mode_stats.get(game_mode)
+        if mode is not None:
+            mode[field] = max(mode[field] - 1, 0)
+
+
+class Rating(models.Model):
+    """
+    사용자별, game_mode별 Elo 레이팅입니다.
+    - 게임 결과가 확정되는 시점에 UserStats와 같은 트랜잭션 안에서 증분 갱신됩니다.
+    - 'recompute_ratings' 명령어로 game 테이블 전체를 played_at 순서로 다시 계산할 수 있습니다.
+    """
+    user = models.ForeignKey(AppUser, related_name='ratings', on_delete=models.CASCADE)
+    game_mode = models.CharField(max_length=100, choices=Game.GAME_MODE_CHOICES)
+    rating = models.FloatField(default=settings.RATING['INITIAL'])
+    games = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'rating'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'game_mode'], name='rating_user_mode_unique'),
+        ]
+        indexes = [
+            # 모드별 순위 조회용
+            models.Index(fields=['game_mode', '-rating'], name='rating_mode_rating_idx'),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """
+    게임 결과 생성 요청의 Idempotency-Key를 기록하는 테이블입니다.
+    - 같은 사용자가 같은 키로 다시 요청하면 게임을 새로 만들지 않고 처음 만든 game_id를 돌려줍니다.
+    - (user, key) unique 제약으로 동시에 들어온 재시도 중 하나만 기록됩니다.
+    - IDEMPOTENCY['TTL']이 지난 키는 'purge_idempotency_keys' 명령어로 지웁니다.
+    """
+    user = models.ForeignKey(AppUser, related_name='+', on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    # 같은 키로 다른 내용을 보낸 요청을 구분하기 위한 요청 본문의 sha256
+    fingerprint = models.CharField(max_length=64)
+    # game 테이블과 잠금/삭제가 엮이지 않도록 FK 대신 정수로 저장
+    game_id = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'idempotency_key'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
+
+
+class GameRollup(models.Model):
+    """
+    game 테이블에서 분리(detach)된 월 파티션의 전적을 사용자, game_mode, 월별로 집계한 테이블입니다.
+    - 'rollup_game_partitions' 명령어가 오래된 파티션을 분리하기 전에 채웁니다.
+    - 'rebuild_user_stats'는 game 테이블과 이 테이블을 합쳐 전적을 다시 계산합니다.
+    """
+    user = models.ForeignKey(AppUser, related_name='game_rollups', on_delete=models.CASCADE)
+    game_mode = models.CharField(max_length=100, choices=Game.GAME_MODE_CHOICES)
+    month = models.DateField()
+    wins = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    last_played_at = models.DateTimeField(null=True)
+
+    class Meta:
+        db_table = 'game_rollup'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'game_mode', 'month'], name='game_rollup_unique'),
+        ]
+
+
+class HeadToHead(models.Model):
+    """
+    두 사용자 사이의 game_mode별 상대 전적입니다.
+    - (user_low, user_high)는 id가 작은 사용자와 큰 사용자의 순서쌍으로, 한 쌍당 모드별로 한 행만 존재합니다.
+    - 게임 결과가 확정/삭제되는 시점에 UserStats와 같은 트랜잭션 안에서 증분 갱신됩니다.
+    """
+    # user_low로 시작하는 조회는 (user_low, user_high, game_mode) 유니크 인덱스를 사용
+    user_low = models.ForeignKey(AppUser, related_name='+', on_delete=models.CASCADE, db_index=False)
+    user_high = models.ForeignKey(AppUser, related_name='+', on_delete=models.CASCADE)
+    game_mode = models.CharField(max_length=100, choices=Game.GAME_MODE_CHOICES)
+    low_wins = models.PositiveIntegerField(default=0)
+    high_wins = models.PositiveIntegerField(default=0)
+    last_played_at = models.DateTimeField(null=True)
+
+    class Meta:
+        db_table = 'head_to_head'
+        constraints = [
+            models.UniqueConstraint(fields=['user_low', 'user_high', 'game_mode'], name='head_to_head_pair_unique'),
+            models.CheckConstraint(check=models.Q(user_low__lt=models.F('user_high')), name='head_to_head_pair_order'),
+        ]
@@ -0,0 +1,161 @@
+import re
+from datetime import date
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import GameRollup
+
+DEFAULT_PARTITION = 'game_default'
+PARTITION_NAME = re.compile(r'^game_p(\d{4})_(\d{2})$')
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    year, index = divmod(month.month - 1 + count, 12)
+    return date(month.year + year, index + 1, 1)
+
+
+def partition_name(month):
+    return f'game_p{month:%Y_%m}'
+
+
+def bound(month):
+    # 세션 시간대와 관계없이 UTC 기준 월 경계
+    return f'{month.isoformat()} 00:00:00+00'
+
+
+def is_partitioned(cursor):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('game')")
+    row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def check_partitioned(cursor):
+    """game 테이블이 파티션 테이블이 아니면 ValueError (SQLite 등 다른 DB 포함)"""
+    if connection.vendor != 'postgresql' or not is_partitioned(cursor):
+        raise ValueError('game 테이블이 PostgreSQL 파티션 테이블이 아닙니다.')
+
+
+def list_partitions(cursor):
+    """game 테이블에 붙어 있는 월 파티션의 {시작 월: 테이블 이름} (기본 파티션 제외)"""
+    cursor.execute(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.oid = 'game'::regclass"
+    )
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[date(int(match[1]), int(match[2]), 1)] = name
+    return partitions
+
+
+def create_partition(cursor, month):
+    """
+    month의 파티션을 만들고, 기본 파티션에 들어가 있던 해당 월의 게임을 새 파티션으로 옮깁니다.
+    기본 파티션에 해당 월의 행이 있으면 파티션을 바로 만들 수 없으므로, 기본 파티션을 잠시 분리한 뒤 다시 붙입니다.
+    호출하는 쪽에서 트랜잭션으로 감싸야 합니다.
+    """
+    name, lower, upper = partition_name(month), bound(month), bound(add_months(month, 1))
+    create = (f'CREATE TABLE {name} PARTITION OF game '
+              f"FOR VALUES FROM ('{lower}') TO ('{upper}')")
+    cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE played_at >= %s AND played_at < %s)',
+                   [lower, upper])
+    if not cursor.fetchone()[0]:
+        cursor.execute(create)
+        return 0
+
+    cursor.execute(f'ALTER TABLE game DETACH PARTITION {DEFAULT_PARTITION}')
+    cursor.execute(create)
+    cursor.execute(f'INSERT INTO game SELECT * FROM {DEFAULT_PARTITION} WHERE played_at >= %s AND played_at < %s',
+                   [lower, upper])
+    moved = cursor.rowcount
+    cursor.execute(f'DELETE FROM {DEFAULT_PARTITION} WHERE played_at >= %s AND played_at < %s', [lower, upper])
+    cursor.execute(f'ALTER TABLE game ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT')
+    return moved
+
+
+def ensure_partitions(cursor, months_ahead=None):
+    """
+    기본 파티션에 들어가 있는 가장 오래된 월부터 이번 달 + months_ahead까지 빠진 파티션을 만듭니다.
+    만든 (월, 옮긴 행 수) 목록을 반환합니다.
+    """
+    check_partitioned(cursor)
+    if months_ahead is None:
+        months_ahead = settings.GAME_PARTITIONS['MONTHS_AHEAD']
+    existing = list_partitions(cursor)
+    current = month_start(timezone.now())
+    cursor.execute(f'SELECT MIN(played_at) FROM {DEFAULT_PARTITION}')
+    oldest = cursor.fetchone()[0]
+    month = min(month_start(oldest), current) if oldest else current
+
+    created = []
+    while month <= add_months(current, months_ahead):
+        if month not in existing:
+            created.append((month, create_partition(cursor, month)))
+        month = add_months(month, 1)
+    return created
+
+
+def rollup_partition(cursor, month, name):
+    """
+    파티션 하나의 완료된 게임을 game_rollup에 (사용자, game_mode, 월) 단위로 집계합니다.
+    같은 월을 다시 집계하면 값을 덮어쓰므로 여러 번 실행해도 결과가 같습니다.
+    """
+    completed = 'player2_id IS NOT NULL AND winner_id IS NOT NULL AND loser_id IS NOT NULL'
+    cursor.execute(
+        'INSERT INTO game_rollup (user_id, game_mode, month, wins, losses, last_played_at) '
+        'SELECT user_id, game_mode, %s, SUM(win), SUM(loss), MAX(played_at) FROM ('
+        f'  SELECT winner_id AS user_id, game_mode, 1 AS win, 0 AS loss, played_at FROM {name} WHERE {completed}'
+        '   UNION ALL'
+        f'  SELECT loser_id, game_mode, 0, 1, played_at FROM {name} WHERE {completed}'
+        ') results GROUP BY user_id, game_mode '
+        'ON CONFLICT (user_id, game_mode, month) DO UPDATE '
+        'SET wins = EXCLUDED.wins, losses = EXCLUDED.losses, last_played_at = EXCLUDED.last_played_at',
+        [month],
+    )
+    return cursor.rowcount
+
+
+def detach_partition(cursor, name, archive_schema=None, drop=False):
+    """
+    파티션을 game 테이블에서 분리합니다.
+    - 분리된 테이블은 사용자 삭제를 막지 않도록 FK 제약을 지웁니다.
+    - archive_schema가 주어지면 해당 스키마로 옮기고, drop이면 테이블을 지웁니다.
+    """
+    # 같은 트랜잭션에서 바뀐 행의 지연된 FK 검사가 남아 있으면 ALTER TABLE이 실패하므로 먼저 검사
+    cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+    cursor.execute(f'ALTER TABLE game DETACH PARTITION {name}')
+    cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+    if drop:
+        cursor.execute(f'DROP TABLE {name}')
+        return
+    cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'", [name])
+    for (constraint,) in cursor.fetchall():
+        cursor.execute(f'ALTER TABLE {name} DROP CONSTRAINT {connection.ops.quote_name(constraint)}')
+    if archive_schema:
+        schema = connection.ops.quote_name(archive_schema)
+        cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {schema}')
+        cursor.execute(f'ALTER TABLE {name} SET SCHEMA {schema}')
+
+
+def detached_history_months(game_modes=None):
+    """rollup_game_partitions로 game 테이블에서 분리되어 game_rollup에만 집계가 남은 월 목록"""
+    rollups = GameRollup.objects.all()
+    if game_modes:
+        rollups = rollups.filter(game_mode__in=game_modes)
+    return list(rollups.order_by('month').values_list('month', flat=True).distinct())
+
+
+def detached_history_message(months):
+    return (f'{len(months)}개월({months[0]:%Y-%m} ~ {months[-1]:%Y-%m})의 게임이 game 테이블에서 분리되어 '
+            '사용자별 집계(game_rollup)만 남아 있으므로, game 테이블만으로 다시 계산하면 그 게임들이 빠집니다. '
+            '보관 스키마의 파티션을 다시 붙이거나(ALTER TABLE game ATTACH PARTITION ...), '
+            '빠진 결과를 감수하려면 --allow-partial을 주세요.')
@@ -0,0 +1,115 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .leaderboard import leaderboard
+from .models import Rating
+
+
+def elo_delta(winner_rating, loser_rating, k_factor=None):
+    """
+    승자가 얻는(패자가 잃는) 레이팅 변화량을 계산합니다.
+    float와 NumPy 배열 모두 받을 수 있습니다.
+    """
+    if k_factor is None:
+        k_factor = settings.RATING['K_FACTOR']
+    expected = 1 / (1 + 10 ** ((loser_rating - winner_rating) / 400))
+    return k_factor * (1 - expected)
+
+
+def apply_rating(game):
+    """
+    확정된 게임 결과로 두 사용자의 해당 모드 레이팅을 갱신합니다.
+    - 호출자의 트랜잭션 안에서 user_id 순서대로 행 잠금을 잡습니다.
+    - 커밋 이후 이 프로세스의 순위표(leaderboard)에 반영합니다.
+    """
+    if game.winner_id is None or game.loser_id is None or game.winner_id == game.loser_id:
+        return
+    ratings = {}
+    for user_id in sorted((game.winner_id, game.loser_id)):
+        ratings[user_id], _ = Rating.objects.select_for_update().get_or_create(user_id=user_id, game_mode=game.game_mode)
+    winner, loser = ratings[game.winner_id], ratings[game.loser_id]
+    delta = elo_delta(winner.rating, loser.rating)
+    winner.rating += delta
+    loser.rating -= delta
+    for rating in (winner, loser):
+        rating.games += 1
+        rating.save(update_fields=['rating', 'games', 'updated_at'])
+    rows = [(rating.user_id, rating.rating, rating.games) for rating in (winner, loser)]
+    transaction.on_commit(lambda: leaderboard.update(game.game_mode, rows))
+
+
+def apply_ratings(games):
+    """
+    여러 게임 결과를 played_at 순서대로 레이팅에 반영합니다. (일괄 등록용)
+    - 필요한 행을 한 번에 만들고(이미 있으면 무시) 한 번에 잠근 뒤, 메모리에서 순서대로 계산하여 bulk_update 한 번으로 저장합니다.
+    """
+    games = sorted((game for game in games
+                    if game.winner_id is not None and game.loser_id is not None and game.winner_id != game.loser_id),
+                   key=lambda game: (game.played_at, game.game_id))
+    if not games:
+        return
+    keys = {(user_id, game.game_mode) for game in games for user_id in (game.winner_id, game.loser_id)}
+    Rating.objects.bulk_create([Rating(user_id=user_id, game_mode=game_mode) for user_id, game_mode in keys],
+                               ignore_conflicts=True)
+    rows = (Rating.objects.select_for_update()
+            .filter(user_id__in={user_id for user_id, _ in keys}, game_mode__in={game_mode for _, game_mode in keys})
+            .order_by('user_id', 'game_mode'))
+    ratings = {(rating.user_id, rating.game_mode): rating for rating in rows}
+
+    for game in games:
+        winner, loser = ratings[game.winner_id, game.game_mode], ratings[game.loser_id, game.game_mode]
+        delta = elo_delta(winner.rating, loser.rating)
+        winner.rating += delta
+        loser.rating -= delta
+        winner.games += 1
+        loser.games += 1
+
+    changed = [ratings[key] for key in keys]
+    now = timezone.now()
+    for rating in changed:
+        rating.updated_at = now
+    Rating.objects.bulk_update(changed, ['rating', 'games', 'updated_at'], batch_size=1000)
+
+    by_mode = {}
+    for rating in changed:
+        by_mode.setdefault(rating.game_mode, []).append((rating.user_id, rating.rating, rating.games))
+    transaction.on_commit(lambda: [leaderboard.update(game_mode, rows) for game_mode, rows in by_mode.items()])
+
+
+def replay_ratings(winner_ids, loser_ids, initial=None, k_factor=None):
+    """
+    played_at 순서로 정렬된 한 모드의 게임 목록을 처음부터 재생하여 레이팅을 계산합니다.
+    - 반환값: (user_ids, ratings, games) NumPy 배열
+    - Elo는 순서에 의존하지만 서로 다른 사용자끼리의 게임은 서로 영향을 주지 않으므로,
+      각 게임을 '두 사용자의 직전 게임 wave + 1' wave에 배치하고 wave 단위로 한 번에 계산합니다.
+      같은 wave 안에서는 한 사용자가 두 번 나오지 않으므로 순차 계산과 결과가 같습니다.
+    """
+    if initial is None:
+        initial = settings.RATING['INITIAL']
+    winner_ids = np.asarray(winner_ids, dtype=np.int64)
+    loser_ids = np.asarray(loser_ids, dtype=np.int64)
+    user_ids, inverse = np.unique(np.concatenate([winner_ids, loser_ids]), return_inverse=True)
+    winners, losers = inverse[:len(winner_ids)], inverse[len(winner_ids):]
+    ratings = np.full(len(user_ids), initial, dtype=np.float64)
+    games = np.bincount(inverse, minlength=len(user_ids))
+    if not len(winners):
+        return user_ids, ratings, games
+
+    # wave 배정은 게임 순서를 따라야 하므로 한 번 순회 (파이썬 int 리스트가 NumPy 원소 접근보다 빠름)
+    last_wave = [0] * len(user_ids)
+    waves = [0] * len(winners)
+    for i, (winner, loser) in enumerate(zip(winners.tolist(), losers.tolist())):
+        wave = max(last_wave[winner], last_wave[loser]) + 1
+        waves[i] = last_wave[winner] = last_wave[loser] = wave
+
+    waves = np.asarray(waves)
+    order = np.argsort(waves, kind='stable')
+    bounds = np.flatnonzero(np.diff(waves[order])) + 1
+    for index in np.split(order, bounds):
+        winner, loser = winners[index], losers[index]
+        delta = elo_delta(ratings[winner], ratings[loser], k_factor)
+        ratings[winner] += delta
+        ratings[loser] -= delta
+    return user_ids, ratings, games
@@ -0,0 +1,120 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .head_to_head import apply_head_to_head, revert_head_to_head
+from .models import Game, UserStats
+from .rating import apply_rating, apply_ratings
+
+
+def is_completed(game):
+    # player2와 승패가 모두 등록된 게임만 전적에 반영합니다.
+    # (매치메이킹으로 미리 만든 게임은 결과가 기록될 때 반영됨)
+    return game.player2_id is not None and game.winner_id is not None and game.loser_id is not None
+
+
+def apply_game_result(game):
+    """
+    확정된 게임 결과를 파생 테이블(UserStats, Rating, HeadToHead)에 반영합니다.
+    - 게임을 저장하는 호출자의 트랜잭션 안에서 호출되어야 합니다.
+    - player2나 승패가 비어 있는 게임은 아직 확정되지 않았으므로 무시합니다.
+    - 데드락을 피하기 위해 user_id 순서대로 행 잠금을 잡습니다.
+    """
+    if not is_completed(game):
+        return
+    outcomes = [(user_id, won) for user_id, won in ((game.winner_id, True), (game.loser_id, False)) if user_id is not None]
+    for user_id, won in sorted(outcomes):
+        stats, _ = UserStats.objects.select_for_update().get_or_create(user_id=user_id)
+        stats.add_result(game.game_mode, won, game.played_at)
+        stats.save()
+    apply_rating(game)
+    apply_head_to_head([game])
+
+
+def apply_game_results(games):
+    """
+    여러 게임 결과를 한 번에 파생 테이블에 반영합니다. (일괄 등록용)
+    - 사용자별 변경량을 모은 뒤, 없는 UserStats 행을 한 번에 만들고(이미 있으면 무시),
+      user_id 순서로 한 번에 잠가 bulk_update 한 번으로 저장합니다.
+    """
+    games = [game for game in games if is_completed(game)]
+    if not games:
+        return
+    outcomes = defaultdict(list)
+    for game in games:
+        outcomes[game.winner_id].append((game.game_mode, True, game.played_at))
+        outcomes[game.loser_id].append((game.game_mode, False, game.played_at))
+
+    UserStats.objects.bulk_create([UserStats(user_id=user_id, mode_stats={}) for user_id in outcomes],
+                                  ignore_conflicts=True)
+    rows = list(UserStats.objects.select_for_update().filter(user_id__in=outcomes.keys()).order_by('user_id'))
+    now = timezone.now()
+    for stats in rows:
+        for game_mode, won, played_at in outcomes[stats.user_id]:
+            stats.add_result(game_mode, won, played_at)
+        stats.updated_at = now
+    UserStats.objects.bulk_update(rows, ['wins', 'losses', 'mode_stats', 'last_played_at', 'updated_at'],
+                                  batch_size=1000)
+    apply_ratings(games)
+    apply_head_to_head(games)
+
+
+def revert_game_result(game):
+    """
+    삭제되는 게임의 결과를 파생 테이블에서 되돌립니다.
+    - 회원 탈퇴로 게임이 CASCADE 삭제될 때 상대방의 전적을 game 테이블과 일치시키기 위해 사용합니다.
+    - last_played_at은 되돌리지 않으며, 정확한 값이 필요하면 'rebuild_user_stats'를 실행합니다.
+    - Elo 레이팅은 순서에 의존하여 되돌릴 수 없으므로, 필요하면 'recompute_ratings'로 다시 계산합니다.
+    """
+    if not is_completed(game):
+        return
+    outcomes = [(user_id, won) for user_id, won in ((game.winner_id, True), (game.loser_id, False)) if user_id is not None]
+    for user_id, won in sorted(outcomes):
+        stats = UserStats.objects.select_for_update().filter(user_id=user_id).first()
+        if stats is None:
+            continue
+        stats.remove_result(game.game_mode, won)
+        stats.save()
+    revert_head_to_head(game)
+
+
+def attach_player2(game, player2):
+    """
+    game에 player2를 등록하고, winner와 loser 중 비어 있는 쪽을 player2로 채웁니다.
+    - 읽은 시점의 version이고 player2가 아직 비어 있을 때만 UPDATE ... WHERE version = n AND player2_id IS NULL로
+      갱신하므로 행 잠금 없이 동시 수정을 감지합니다. 조건이 맞지 않으면 아무것도 하지 않고 False를 반환합니다.
+    - 이미 등록된 player2는 바꾸거나 지울 수 없습니다. (Rating은 되돌릴 수 없으므로, 결과를 지웠다가 다시 등록하면
+      파생 테이블에 두 번 반영됨)
+    - 성공하면 game 인스턴스를 갱신하고, 새로 확정된 결과를 같은 트랜잭션에서 파생 테이블에 반영합니다.
+    """
+    player2_id = player2.id if player2 is not None else None
+    winner_id, loser_id = game.winner_id, game.loser_id
+    if winner_id is None and loser_id is not None:
+        winner_id = player2_id
+    elif loser_id is None and winner_id is not None:
+        loser_id = player2_id
+
+    updated = Game.objects.filter(game_id=game.game_id, version=game.version, player2__isnull=True).update(
+        player2_id=player2_id, winner_id=winner_id, loser_id=loser_id, version=F('version') + 1)
+    if not updated:
+        return False
+    game.player2, game.winner_id, game.loser_id = player2, winner_id, loser_id
+    game.version += 1
+    apply_game_result(game)
+    return True
+
+
+def record_game_result(game_id, winner_id, loser_id):
+    """
+    서버에서 진행한 경기의 결과를 Game에 기록하고 파생 테이블에 반영합니다.
+    결과가 비어 있을 때만 조건부 UPDATE로 기록하며, 이미 기록된 게임이면 False를 반환합니다.
+    """
+    with transaction.atomic():
+        updated = Game.objects.filter(game_id=game_id, winner__isnull=True, loser__isnull=True).update(
+            winner_id=winner_id, loser_id=loser_id, version=F('version') + 1)
+        if not updated:
+            return False
+        apply_game_result(Game.objects.get(game_id=game_id))
+    return True
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Game
+from .results import revert_game_result
+
+
+@receiver(post_delete, sender=Game)
+def game_deleted(sender, instance, **kwargs):
+    revert_game_result(instance)
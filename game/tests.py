@@ -1,3 +1,587 @@
-from django.test import TestCase
+import asyncio
+import json
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from datetime import datetime, timezone as dt_timezone
+from unittest import skipUnless
+
+from django.db import connection, transaction
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from account.models import User
+from loginCheck.middleware import TokenAuthMiddleware
+from loginCheck.urls import websocket_urlpatterns
+from . import views
+from .engine import GameEngine, MatchBatch
+from .leaderboard import leaderboard
+from .matchmaking import Matchmaker
+from .partitions import list_partitions
+from .models import Game, GameRollup, HeadToHead, IdempotencyKey, Rating, UserStats
+from .results import apply_game_result, attach_player2
+
+
+class RatingTest(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create(username=f'user{i}', email=f'user{i}@test.com') for i in range(4)]
+
+    def play(self, winner, loser, game_mode='normal'):
+        with transaction.atomic():
+            game = Game.objects.create(player1=winner, player2=loser, winner=winner, loser=loser, game_mode=game_mode)
+            apply_game_result(game)
+
+    def ratings(self, game_mode='normal'):
+        return dict(Rating.objects.filter(game_mode=game_mode).values_list('user_id', 'rating'))
+
+    def test_incremental_update(self):
+        a, b = self.users[:2]
+        self.play(a, b)
+        self.assertEqual(self.ratings(), {a.id: 1516, b.id: 1484})
+        self.play(a, b, 'speed')
+        self.assertEqual(Rating.objects.get(user=a, game_mode='normal').games, 1)
+        self.assertEqual(Rating.objects.get(user=a, game_mode='speed').games, 1)
+
+    def test_recompute_matches_incremental(self):
+        a, b, c, d = self.users
+        for winner, loser in ((a, b), (c, d), (a, c), (d, b), (b, a), (a, d), (c, b)):
+            self.play(winner, loser)
+        incremental = self.ratings()
+
+        # manage.py와 같이 시스템 체크를 실행해도 동작해야 함
+        out = StringIO()
+        call_command('recompute_ratings', '--check', stdout=out, skip_checks=False)
+        self.assertIn('일치', out.getvalue())
+
+        Rating.objects.all().delete()
+        call_command('recompute_ratings', stdout=StringIO(), skip_checks=False)
+        for user_id, rating in self.ratings().items():
+            self.assertAlmostEqual(rating, incremental[user_id])
+
+
+class LeaderboardTest(TestCase):
+    def setUp(self):
+        leaderboard.clear()
+        self.users = [User.objects.create(username=f'user{i}', email=f'user{i}@test.com') for i in range(6)]
+        Rating.objects.bulk_create([
+            Rating(user=user, game_mode='normal', rating=1500 + 10 * i, games=i + 1) for i, user in enumerate(self.users)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[2])
+
+    def test_top_and_around_me(self):
+        response = self.client.get('/api/games/leaderboard', {'mode': 'normal', 'limit': 2, 'around': 'me', 'k': 1})
+        data = response.json()
+        self.assertEqual(data['total'], 6)
+        self.assertEqual([entry['id'] for entry in data['top']], [self.users[5].id, self.users[4].id])
+        self.assertEqual(data['rank'], 4)
+        self.assertEqual([entry['rank'] for entry in data['around']], [3, 4, 5])
+        self.assertEqual(data['around'][1]['id'], self.users[2].id)
+
+        # 순위가 메모리에 올라온 뒤에는 사용자 정보 조회만 남음
+        with self.assertNumQueries(1):
+            self.client.get('/api/games/leaderboard', {'around': 'me'})
+
+    def test_rating_change_is_applied_after_commit(self):
+        leaderboard.top('normal', 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            game = Game.objects.create(player1=self.users[0], player2=self.users[5],
+                                       winner=self.users[0], loser=self.users[5])
+            apply_game_result(game)
+        self.assertEqual(leaderboard.rank('normal', self.users[0].id),
+                         Rating.objects.filter(game_mode='normal', rating__gt=Rating.objects.get(
+                             user=self.users[0], game_mode='normal').rating).count() + 1)
+
+    def test_invalid_mode(self):
+        self.assertEqual(self.client.get('/api/games/leaderboard', {'mode': 'chess'}).status_code, 400)
+
+
+class MatchmakerTest(TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.matchmaker = Matchmaker(clock=lambda: self.now)
+
+    def enqueue(self, user_id, rating, game_mode='normal'):
+        return self.matchmaker.enqueue(self.matchmaker.ticket(user_id, f'user{user_id}', f'ch{user_id}', game_mode, rating))
+
+    def test_immediate_match_picks_nearest_rating(self):
+        self.assertIsNone(self.enqueue(1, 1500))
+        self.assertIsNone(self.enqueue(2, 1540, 'speed'))
+        self.assertIsNone(self.enqueue(3, 1600))
+        self.assertEqual(self.enqueue(4, 1580).user_id, 3)
+        self.assertEqual(len(self.matchmaker), 2)
+
+    def test_window_widens_over_time(self):
+        self.enqueue(1, 1500)
+        self.enqueue(2, 1700)
+        self.assertEqual(self.matchmaker.sweep(), [])
+        self.now = 20
+        pairs = self.matchmaker.sweep()
+        self.assertEqual([(a.user_id, b.user_id) for a, b in pairs], [(1, 2)])
+        self.assertEqual(len(self.matchmaker), 0)
+
+    def test_dequeue(self):
+        self.enqueue(1, 1500)
+        self.assertEqual(self.matchmaker.dequeue(1).user_id, 1)
+        self.assertIsNone(self.enqueue(2, 1500))
+
+
+class MatchmakingConsumerTest(TransactionTestCase):
+    async def test_match_found_creates_game(self):
+        users = await sync_to_async(lambda: [
+            User.objects.create_user(name, f'{name}@test.com', 'password') for name in ('alice', 'bob')
+        ])()
+        application = TokenAuthMiddleware(websocket_urlpatterns)
+        sockets = []
+        for user in users:
+            socket = WebsocketCommunicator(application, f'/ws/game/matchmaking?token={AccessToken.for_user(user)}')
+            await socket.connect()
+            await socket.send_to(text_data=json.dumps({'type': 'queue', 'game_mode': 'speed'}))
+            self.assertEqual(json.loads(await socket.receive_from())['type'], 'queued')
+            sockets.append(socket)
+
+        events = [json.loads(await socket.receive_from()) for socket in sockets]
+        self.assertEqual({event['type'] for event in events}, {'match_found'})
+        self.assertEqual(events[0]['gameId'], events[1]['gameId'])
+        self.assertEqual(events[0]['opponent']['id'], users[1].id)
+        game = await Game.objects.aget(game_id=events[0]['gameId'])
+        self.assertEqual((game.player1_id, game.player2_id, game.game_mode, game.winner_id),
+                         (users[0].id, users[1].id, 'speed', None))
+        for socket in sockets:
+            await socket.disconnect()
+
+
+class MatchBatchTest(TestCase):
+    def setUp(self):
+        self.batch = MatchBatch(settings.GAME_ENGINE['MODES']['normal'], capacity=1, seed=0)
+
+    def test_frames_are_delta_encoded(self):
+        self.batch.add(1)
+        self.batch.add(2)
+        first = dict(self.batch.frames(0))
+        self.assertEqual(json.loads(first[1])['m'], 0b1111111)
+        self.batch.step()
+        # 공만 움직였으므로 ballX/ballY만 전송
+        second = json.loads(dict(self.batch.frames(1))[1])
+        self.assertEqual((second['m'], len(second['v'])), (0b11, 2))
+
+    def test_idle_player_loses(self):
+        self.batch.add(1)
+        # player2 패들만 공을 따라감
+        finished = []
+        for _ in range(100000):
+            self.batch.inputs[:, 1] = (self.batch.ball[:, 1] > self.batch.paddles[:, 1]) * 2 - 1
+            self.batch.inputs[:, 0] = 0
+            finished = self.batch.step()
+            if finished:
+                break
+        self.assertEqual(finished, [(1, 1)])
+        self.assertEqual(self.batch.remove(1)[1], settings.GAME_ENGINE['MODES']['normal']['WIN_SCORE'])
+
+
+class GameConsumerTest(TransactionTestCase):
+    async def test_disconnect_forfeits_and_records_result(self):
+        alice, bob = await sync_to_async(lambda: [
+            User.objects.create_user(name, f'{name}@test.com', 'password') for name in ('alice', 'bob')
+        ])()
+        game = await Game.objects.acreate(player1=alice, player2=bob, game_mode='normal')
+        application = TokenAuthMiddleware(websocket_urlpatterns)
+        sockets = []
+        for user in (alice, bob):
+            socket = WebsocketCommunicator(application, f'/ws/game/play/{game.game_id}?token={AccessToken.for_user(user)}')
+            connected, _ = await socket.connect()
+            self.assertTrue(connected)
+            self.assertEqual(json.loads(await socket.receive_from())['type'], 'joined')
+            sockets.append(socket)
+
+        frame = json.loads(await sockets[0].receive_from())
+        self.assertEqual(frame['type'], 'frame')
+        await sockets[0].send_to(text_data=json.dumps({'type': 'input', 'direction': 1}))
+
+        await sockets[1].disconnect()
+        while (event := json.loads(await sockets[0].receive_from()))['type'] == 'frame':
+            pass
+        self.assertEqual((event['type'], event['winner'], event['forfeit']), ('game_over', alice.id, True))
+        await game.arefresh_from_db()
+        self.assertEqual((game.winner_id, game.loser_id), (alice.id, bob.id))
+        self.assertEqual((await UserStats.objects.aget(user=alice)).wins, 1)
+        await sockets[0].disconnect()
+
+        # 결과가 기록된 게임에는 다시 접속할 수 없음
+        socket = WebsocketCommunicator(application, f'/ws/game/play/{game.game_id}?token={AccessToken.for_user(alice)}')
+        connected, _ = await socket.connect()
+        self.assertFalse(connected)
+
+
+class BrokenChannelLayer:
+    """프레임 전송만 실패하는 채널 레이어"""
+
+    def __init__(self):
+        self.events = []
+
+    async def group_send(self, group, message):
+        if message['type'] == 'game.frame':
+            raise ConnectionError('channel layer is down')
+        self.events.append(message)
+
+
+class GameEngineFaultTest(TransactionTestCase):
+    async def test_failures_do_not_stop_other_matches(self):
+        alice, bob = await sync_to_async(lambda: [
+            User.objects.create_user(name, f'{name}@test.com', 'password') for name in ('alice', 'bob')
+        ])()
+        broken = await Game.objects.acreate(player1=alice, player2=bob, game_mode='normal')
+        healthy = await Game.objects.acreate(player1=alice, player2=bob, game_mode='normal')
+        layer = BrokenChannelLayer()
+        engine = GameEngine(channel_layer=layer)
+        for side in (0, 1):
+            # 없는 사용자를 패자로 기록하면 커밋할 때 외래 키 오류가 남
+            engine.join(broken.game_id, 'normal', (alice.id, 999999), side)
+            engine.join(healthy.game_id, 'normal', (alice.id, bob.id), side)
+        task = engine._tasks['normal']
+
+        with self.assertLogs('game.engine', 'WARNING') as logs:
+            await asyncio.sleep(0.1)
+            await engine.leave(broken.game_id, 1)
+            await engine.wait_pending()
+        self.assertTrue(any('failed to send' in line for line in logs.output))
+        self.assertTrue(any('failed to record result' in line for line in logs.output))
+        self.assertFalse(task.done())
+        self.assertIn(healthy.game_id, engine.batch('normal').slots)
+
+        await engine.leave(healthy.game_id, 1)
+        await engine.wait_pending()
+        await asyncio.wait_for(task, 1)
+        await healthy.arefresh_from_db()
+        self.assertEqual((healthy.winner_id, healthy.loser_id), (alice.id, bob.id))
+        # 기록에 실패한 경기도 선수들에게는 종료를 알림
+        self.assertEqual([event['type'] for event in layer.events], ['game.over', 'game.over'])
+
+
+class GameBulkResultTest(TestCase):
+    def setUp(self):
+        leaderboard.clear()
+        self.users = [User.objects.create(username=f'user{i}', email=f'user{i}@test.com') for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def test_bulk_results(self):
+        a, b, c = (user.email for user in self.users)
+        items = [
+            {'winner': a, 'loser': b, 'player2': b, 'game_mode': 'normal'},
+            {'winner': c, 'player2': a, 'game_mode': 'speed'},
+            {'winner': a, 'loser': 'nobody@test.com', 'game_mode': 'normal'},
+            {'winner': a, 'loser': c, 'game_mode': 'chess'},
+            {'winner': b, 'loser': c, 'game_mode': 'normal'},
+        ]
+        # 이메일 조회 + INSERT + 전적, 레이팅, 상대 전적(각각 INSERT/SELECT/UPDATE) + 세이브포인트 2번
+        with self.assertNumQueries(13):
+            response = self.client.post('/api/games/results/bulk', items, format='json')
+        self.assertEqual(response.status_code, 201)
+        results = response.json()['results']
+        self.assertEqual([('gameId' in result) for result in results], [True, True, False, False, True])
+        self.assertEqual(response.json()['created'], 3)
+
+        stats = {stats.user_id: stats for stats in UserStats.objects.all()}
+        self.assertEqual((stats[self.users[0].id].wins, stats[self.users[0].id].losses), (1, 1))
+        self.assertEqual(stats[self.users[2].id].mode_stats, {'speed': {'wins': 1, 'losses': 0}})
+        # player2가 없는 결과는 아직 전적에 반영되지 않음
+        self.assertNotIn(self.users[1].id, {user_id for user_id, stats in stats.items() if stats.wins})
+        self.assertEqual(Rating.objects.get(user=self.users[0], game_mode='normal').rating, 1516)
+
+        # 한 건씩 반영한 것과 같은 레이팅
+        out = StringIO()
+        call_command('recompute_ratings', '--check', stdout=out)
+        self.assertNotIn('다릅니다', out.getvalue())
+
+
+class GameResultConcurrencyTest(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice', email='alice@test.com')
+        self.bob = User.objects.create(username='bob', email='bob@test.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def test_idempotent_create(self):
+        data = {'winner': self.alice.email, 'game_mode': 'normal'}
+        first = self.client.post('/api/games/results', data, format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+        second = self.client.post('/api/games/results', data, format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual(first.json()['gameId'], second.json()['gameId'])
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Game.objects.count(), 1)
+
+        other = self.client.post('/api/games/results', {**data, 'game_mode': 'speed'}, format='json',
+                                 HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual(other.status_code, 422)
+
+        call_command('purge_idempotency_keys', stdout=StringIO())
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    def test_stale_version_is_rejected(self):
+        game = Game.objects.create(player1=self.alice, winner=self.alice, game_mode='normal')
+        stale = Game.objects.get(game_id=game.game_id)
+        self.assertTrue(attach_player2(game, self.bob))
+        # 먼저 읽은 인스턴스로는 덮어쓸 수 없음
+        self.assertFalse(attach_player2(stale, None))
+        game.refresh_from_db()
+        self.assertEqual((game.player2_id, game.loser_id, game.version), (self.bob.id, self.bob.id, 1))
+        self.assertEqual(UserStats.objects.get(user=self.bob).losses, 1)
+
+        response = self.client.patch(f'/api/games/result/{game.game_id}/', {'player2': self.bob.email, 'version': 0},
+                                     format='json')
+        self.assertEqual(response.status_code, 409)
+
+    def test_registered_player2_cannot_be_cleared_and_set_again(self):
+        game = Game.objects.create(player1=self.alice, winner=self.alice, game_mode='normal')
+        url = f'/api/games/result/{game.game_id}/'
+        self.assertEqual(self.client.patch(url, {'player2': self.bob.email}, format='json').status_code, 200)
+
+        # player2를 지웠다가 다시 등록해도 결과가 두 번 반영되지 않음
+        self.assertEqual(self.client.patch(url, {'player2': ''}, format='json').status_code, 409)
+        self.assertEqual(self.client.patch(url, {'player2': self.bob.email}, format='json').status_code, 409)
+        game.refresh_from_db()
+        self.assertEqual((game.player2_id, game.version), (self.bob.id, 1))
+        self.assertEqual(UserStats.objects.get(user=self.alice).wins, 1)
+        self.assertEqual(Rating.objects.get(user=self.alice, game_mode='normal').games, 1)
+        self.assertEqual(HeadToHead.objects.get().low_wins + HeadToHead.objects.get().high_wins, 1)
+
+
+@skipUnless(connection.vendor == 'postgresql', '파티션은 PostgreSQL에서만 사용')
+class GamePartitionTest(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice', email='alice@test.com')
+        self.bob = User.objects.create(username='bob', email='bob@test.com')
+
+    def create_game(self, winner, loser, played_at):
+        game = Game.objects.create(player1=winner, player2=loser, winner=winner, loser=loser, game_mode='normal')
+        Game.objects.filter(game_id=game.game_id).update(played_at=played_at)
+        return game
+
+    def partition_of(self, game):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM game WHERE game_id = %s', [game.game_id])
+            return cursor.fetchone()[0]
+
+    def test_old_partitions_are_rolled_up_and_detached(self):
+        old = datetime(2001, 5, 10, tzinfo=dt_timezone.utc)
+        games = [self.create_game(self.alice, self.bob, old), self.create_game(self.bob, self.alice, old),
+                 self.create_game(self.alice, self.bob, old)]
+        recent = Game.objects.create(player1=self.alice, player2=self.bob, winner=self.alice, loser=self.bob,
+                                     game_mode='normal')
+        self.assertEqual(self.partition_of(games[0]), 'game_default')
+
+        call_command('create_game_partitions', stdout=StringIO())
+        self.assertEqual(self.partition_of(games[0]), 'game_p2001_05')
+        with connection.cursor() as cursor:
+            self.assertIn(datetime(2001, 5, 1).date(), list_partitions(cursor))
+
+        call_command('rollup_game_partitions', stdout=StringIO())
+        self.assertEqual(list(Game.objects.values_list('game_id', flat=True)), [recent.game_id])
+        rollup = GameRollup.objects.get(user=self.alice, game_mode='normal')
+        self.assertEqual((rollup.month.isoformat(), rollup.wins, rollup.losses, rollup.last_played_at),
+                         ('2001-05-01', 2, 1, old))
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM archive.game_p2001_05")
+            self.assertEqual(cursor.fetchone()[0], 3)
+
+        # 분리된 파티션의 전적도 합쳐서 다시 계산
+        call_command('rebuild_user_stats', stdout=StringIO())
+        stats = UserStats.objects.get(user=self.alice)
+        self.assertEqual((stats.wins, stats.losses), (3, 1))
+        self.assertEqual(stats.mode_stats['normal'], {'wins': 3, 'losses': 1})
+
+        # 분리된 게임을 재생할 수 없는 명령어는 명시적으로 허용하지 않으면 실패
+        with self.assertRaises(CommandError):
+            call_command('recompute_ratings', stdout=StringIO())
+
+        # 보관된 게임이 있어도 사용자를 지울 수 있음
+        self.bob.delete()
+
+
+class DetachedHistoryGuardTest(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice', email='alice@test.com')
+        self.bob = User.objects.create(username='bob', email='bob@test.com')
+        game = Game.objects.create(player1=self.alice, player2=self.bob, winner=self.alice, loser=self.bob,
+                                   game_mode='normal')
+        apply_game_result(game)
+        # rollup_game_partitions가 오래된 파티션을 분리한 상태
+        GameRollup.objects.create(user=self.alice, game_mode='normal', month=datetime(2001, 5, 1).date(), wins=3)
+
+    def test_full_recompute_refuses_when_history_is_detached(self):
+        for command in ('recompute_ratings', 'rebuild_head_to_head'):
+            with self.assertRaisesMessage(CommandError, '--allow-partial'):
+                call_command(command, stdout=StringIO())
+        self.assertEqual(Rating.objects.get(user=self.alice, game_mode='normal').games, 1)
+
+        # --check는 저장하지 않으므로 경고만 출력
+        out = StringIO()
+        call_command('recompute_ratings', '--check', stdout=out)
+        self.assertIn('2001-05', out.getvalue())
+        # 다른 모드는 분리된 게임이 없으므로 그대로 실행
+        call_command('recompute_ratings', '--mode', 'speed', stdout=StringIO())
+
+        call_command('rebuild_head_to_head', '--allow-partial', stdout=StringIO())
+        self.assertEqual(HeadToHead.objects.get().low_wins, 1)
+
+
+class GameExportTest(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice', email='alice@test.com')
+        self.bob = User.objects.create(username='bob', email='bob@test.com')
+        self.games = [
+            Game.objects.create(player1=self.alice, player2=self.bob, winner=self.alice, loser=self.bob, game_mode='normal'),
+            Game.objects.create(player1=self.bob, player2=self.alice, winner=self.bob, loser=self.alice, game_mode='speed'),
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    @staticmethod
+    def read(response):
+        # daphne처럼 비동기로 스트림을 소비
+        async def collect():
+            return b''.join([chunk async for chunk in response.streaming_content])
+        return async_to_sync(collect)().decode()
+
+    def test_ndjson_export(self):
+        response = self.client.get('/api/games/users/me/games/export')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([(row['id'], row['result'], row['opponent']) for row in rows],
+                         [(self.games[1].game_id, 'loss', 'bob'), (self.games[0].game_id, 'win', 'bob')])
+
+    def test_csv_export(self):
+        response = self.client.get('/api/games/users/me/games/export', {'format': 'csv'})
+        lines = self.read(response).splitlines()
+        self.assertEqual(lines[0], 'id,played_at,game_mode,result,opponent_id,opponent')
+        self.assertEqual(lines[1].split(',')[2:], ['speed', 'loss', str(self.bob.id), 'bob'])
+        self.assertEqual(len(lines), 3)
+
+        self.assertEqual(self.client.get('/api/games/users/me/games/export', {'format': 'xml'}).status_code, 404)
+
+
+class GameHistoryFilterTest(TestCase):
+    def setUp(self):
+        self.alice, self.bob, self.bobby, self.carol = [
+            User.objects.create(username=name, email=f'{name}@test.com') for name in ('alice', 'bob', 'bobby', 'carol')
+        ]
+        self.games = {}
+        for key, (winner, loser, mode, day) in {
+            'bob_normal': (self.alice, self.bob, 'normal', 1),
+            'bob_speed': (self.bob, self.alice, 'speed', 2),
+            'bobby_normal': (self.alice, self.bobby, 'normal', 3),
+            'carol_normal': (self.carol, self.alice, 'normal', 4),
+        }.items():
+            game = Game.objects.create(player1=winner, player2=loser, winner=winner, loser=loser, game_mode=mode)
+            Game.objects.filter(game_id=game.game_id).update(
+                played_at=datetime(2024, 3, day, 12, tzinfo=dt_timezone.utc))
+            self.games[key] = game.game_id
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def history(self, **params):
+        response = self.client.get('/api/games/users/me/games/history', {'pageSize': 10, **params})
+        return [game['id'] for game in response.json()['games']]
+
+    def test_filters(self):
+        games = self.games
+        self.assertEqual(self.history(game_mode='normal'),
+                         [games['carol_normal'], games['bobby_normal'], games['bob_normal']])
+        # 상대방 username 접두사, 대소문자 무시
+        self.assertEqual(self.history(opponent='BOB'), [games['bobby_normal'], games['bob_speed'], games['bob_normal']])
+        self.assertEqual(self.history(opponent='bob', game_mode='speed'), [games['bob_speed']])
+        # 날짜만 주면 'to'는 그날 끝까지 포함
+        self.assertEqual(self.history(**{'from': '2024-03-02', 'to': '2024-03-03'}),
+                         [games['bobby_normal'], games['bob_speed']])
+        self.assertEqual(self.history(**{'to': '2024-03-02T12:00:00Z', 'cursor': ''}),
+                         [games['bob_speed'], games['bob_normal']])
+
+        for params in ({'game_mode': 'chess'}, {'from': 'yesterday'}):
+            response = self.client.get('/api/games/users/me/games/history', params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_filter_query_count(self):
+        params = {'opponent': 'bob', 'game_mode': 'normal', 'from': '2024-03-01'}
+        # 상대방 조회는 서브쿼리로 합쳐지므로 COUNT + 페이지 조회
+        with self.assertNumQueries(2):
+            self.history(**params)
+        with self.assertNumQueries(1):
+            self.history(cursor='', **params)
+
+    @skipUnless(connection.vendor == 'postgresql', 'EXPLAIN 형식이 PostgreSQL 기준')
+    def test_filters_use_indexes(self):
+        with connection.cursor() as cursor:
+            # 행이 적으면 순차 탐색이 더 싸므로, 인덱스로 처리할 수 있는지만 확인
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = User.objects.filter(username__istartswith='bo').values('id').explain()
+        self.assertIn('user_username_upper_prefix_idx', plan)
+
+        for filters in ({'game_mode': 'normal'}, {'opponent': 'bo'}, {'played_from': datetime(2024, 3, 2, tzinfo=dt_timezone.utc)}):
+            plan = views.GameHistoryView.get_queryset(self.alice, **filters).explain()
+            self.assertNotIn('Seq Scan on game', plan, filters)
+            self.assertNotIn('Seq Scan on "user"', plan, filters)
+
+
+class HeadToHeadTest(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice', email='alice@test.com')
+        self.bob = User.objects.create(username='bob', email='bob@test.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.bob)
+
+    def play(self, winner, loser, game_mode='normal'):
+        game = Game.objects.create(player1=winner, player2=loser, winner=winner, loser=loser, game_mode=game_mode)
+        apply_game_result(game)
+        return game
+
+    def test_pair_aggregate_is_maintained(self):
+        games = [self.play(self.alice, self.bob), self.play(self.bob, self.alice), self.play(self.bob, self.alice, 'speed')]
+        # 결과가 확정되지 않은 게임은 반영하지 않음
+        apply_game_result(Game.objects.create(player1=self.alice, winner=self.alice, game_mode='normal'))
+        row = HeadToHead.objects.get(game_mode='normal')
+        self.assertEqual((row.user_low_id, row.user_high_id, row.low_wins, row.high_wins),
+                         (self.alice.id, self.bob.id, 1, 1))
+
+        response = self.client.get(f'/api/games/h2h/{self.alice.id}/', {'limit': 2})
+        data = response.json()
+        self.assertEqual((data['wins'], data['losses']), (2, 1))
+        self.assertEqual(data['modes'], {'normal': {'wins': 1, 'losses': 1}, 'speed': {'wins': 1, 'losses': 0}})
+        self.assertEqual([(game['id'], game['winner']) for game in data['games']],
+                         [(games[2].game_id, True), (games[1].game_id, True)])
+        self.assertEqual(data['opponent']['username'], 'alice')
+
+        games[1].delete()
+        data = self.client.get(f'/api/games/h2h/{self.alice.id}/').json()
+        self.assertEqual(data['modes']['normal'], {'wins': 0, 'losses': 1})
+
+    def test_query_count(self):
+        for _ in range(3):
+            self.play(self.alice, self.bob)
+        # 상대방 조회 + 집계 조회 + 최근 게임 조회
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/games/h2h/{self.alice.id}/')
+        self.assertEqual(response.json()['losses'], 3)
+        self.assertEqual(self.client.get(f'/api/games/h2h/{self.bob.id}/').status_code, 400)
+        self.assertEqual(self.client.get('/api/games/h2h/999999/').status_code, 404)
+
+    def test_unfinished_games_are_not_listed(self):
+        self.play(self.alice, self.bob)
+        # player2가 아직 없는 게임은 집계에도, 최근 게임에도 포함하지 않음
+        Game.objects.create(player1=self.alice, winner=self.alice, loser=self.bob, game_mode='normal')
+        data = self.client.get(f'/api/games/h2h/{self.alice.id}/').json()
+        self.assertEqual((data['losses'], len(data['games'])), (1, 1))
+
+    def test_rebuild_repairs_drift(self):
+        self.play(self.alice, self.bob)
+        self.play(self.bob, self.alice, 'speed')
+        HeadToHead.objects.filter(game_mode='normal').update(low_wins=7)
+        HeadToHead.objects.filter(game_mode='speed').delete()
+
+        call_command('rebuild_head_to_head', stdout=StringIO())
+        self.assertEqual(sorted(HeadToHead.objects.values_list('game_mode', 'low_wins', 'high_wins')),
+                         [('normal', 1, 0), ('speed', 0, 1)])
@@ -3,6 +3,10 @@ from . import views
 
 urlpatterns = [
     path('results', views.GameResultView.as_view(), name='game_results'),
+    path('results/bulk', views.GameBulkResultView.as_view(), name='game_results_bulk'),
     path('result/<int:game_id>/', views.GameResultView.as_view(), name='game_result'),
     path('users/me/games/history', views.GameHistoryView.as_view(), name='game_history'),
+    path('users/me/games/export', views.GameHistoryExportView.as_view(), name='game_history_export'),
+    path('h2h/<int:user_id>/', views.HeadToHeadView.as_view(), name='head_to_head'),
+    path('leaderboard', views.LeaderboardView.as_view(), name='leaderboard'),
 ]
\ No newline at end of file
@@ -2,15 +2,30 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from .export import CSVRenderer, NDJSONRenderer, stream_export
+from .head_to_head import head_to_head
+from .leaderboard import leaderboard
 from .models import Game
+from .idempotency import find_idempotent_result, remember_idempotent_result, request_fingerprint
+from .results import apply_game_results, attach_player2
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
 from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.db.models import Q
 from ts.exceptions import InvalidGameModeException, PlayerNotMatchedException
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
+from datetime import datetime, time, timedelta, timezone
+from django.utils import timezone as timezone_utils
+from django.utils.dateparse import parse_date, parse_datetime
 AppUser = get_user_model()
 
+# 일괄 등록 API에서 한 번에 받을 수 있는 게임 결과 수
+BULK_MAX_RESULTS = 500
+# 상대 전적 API에서 함께 반환할 수 있는 최근 게임 수
+H2H_MAX_GAMES = 50
+
 class GameResultView(APIView):
     """
     GameResultView는 게임 결과를 생성하고 업데이트하는 API 엔드포인트를 제공합니다.
@@ -19,12 +34,23 @@ class GameResultView(APIView):
     - 인증된 사용자만이 게임 결과를 생성하거나 업데이트할 수 있습니다.
     - 게임 모드가 유효하지 않은 경우, InvalidGameModeException 예외를 발생시킵니다.
     - 게임 결과를 업데이트할 때, 요청자가 게임의 첫 번째 참가자와 일치하지 않으면 PlayerNotMatchedException 예외를 발생시킵니다.
+    - POST에 'Idempotency-Key' 헤더를 주면 같은 키로 재시도한 요청은 새 게임을 만들지 않고 처음 만든 gameId를 돌려줍니다.
+    - PATCH는 행 잠금 없이 version 조건부 UPDATE로 저장하며, 그 사이 다른 요청이 게임을 바꿨으면 409를 반환합니다.
+      본문에 'version'을 주면 그 version일 때만 수정합니다.
     """
     permission_classes = [IsAuthenticated]
 
     @transaction.atomic
     def post(self, request):
         player1 = request.user
+        idempotency_key = request.headers.get('Idempotency-Key')
+        fingerprint = request_fingerprint(request.data)
+        if idempotency_key:
+            if len(idempotency_key) > 255:
+                return Response({"error": "Idempotency-Key is too long."}, status=status.HTTP_400_BAD_REQUEST)
+            previous = find_idempotent_result(player1, idempotency_key)
+            if previous is not None:
+                return self.replay(previous, fingerprint)
         winner_email = request.data.get('winner')
         loser_email = request.data.get('loser')
         game_mode = request.data.get('game_mode')
@@ -48,12 +74,28 @@ class GameResultView(APIView):
                 game_mode=game_mode
             )
             game_id = game.game_id
+            if idempotency_key:
+                previous = remember_idempotent_result(player1, idempotency_key, fingerprint, game_id)
+                if previous is not None:
+                    # 같은 키로 동시에 들어온 요청이 먼저 게임을 만들었으므로 이 요청이 만든 게임은 버림
+                    transaction.set_rollback(True)
+                    return self.replay(previous, fingerprint)
             return Response({"message": "Game created successfully", "gameId": game_id}, status=status.HTTP_201_CREATED)
         except AppUser.DoesNotExist:
             return Response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @staticmethod
+    def replay(previous, fingerprint):
+        if previous.fingerprint != fingerprint:
+            return Response({"error": "Idempotency-Key was already used with a different request."},
+                            status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        response = Response({"message": "Game created successfully", "gameId": previous.game_id},
+                            status=status.HTTP_201_CREATED)
+        response['Idempotent-Replayed'] = 'true'
+        return response
+
     @transaction.atomic
     def patch(self, request, **kwargs):
         game_id = kwargs.get('game_id')
@@ -63,7 +105,17 @@ class GameResultView(APIView):
             game = Game.objects.get(game_id=game_id)
             if player1 != game.player1:
                 raise PlayerNotMatchedException()
-            
+            # 클라이언트가 마지막으로 본 version을 보내면 그 사이에 바뀐 게임은 수정하지 않음
+            expected_version = request.data.get('version')
+            if expected_version is not None and int(expected_version) != game.version:
+                return Response({"error": "Game was modified by another request.", "version": game.version},
+                                status=status.HTTP_409_CONFLICT)
+
+            # 이미 player2가 등록된 게임은 결과가 반영되었으므로 바꾸거나 지울 수 없음
+            if game.player2_id is not None:
+                return Response({"error": "Player2 is already registered.", "version": game.version},
+                                status=status.HTTP_409_CONFLICT)
+
             # player2_email을 사용하여 User 인스턴스를 조회
             player2 = None  # player2 초기화
             if player2_email:
@@ -71,23 +123,97 @@ class GameResultView(APIView):
                     player2 = AppUser.objects.get(email=player2_email)
                 except AppUser.DoesNotExist:
                     return Response({"error": "Player2 is not found."}, status=status.HTTP_404_NOT_FOUND)
-            
-            # player2 인스턴스를 game의 player2 필드에 할당
-            game.player2 = player2
-
-            # winner와 loser 중 null인 필드에 player2를 할당
-            if game.winner is None and game.loser is not None:
-                game.winner = player2
-            elif game.loser is None and game.winner is not None:
-                game.loser = player2
-
-            game.save()
-            return Response({"message": "Game updated successfully"}, status=status.HTTP_200_OK)
+
+            # player2를 등록하고 winner와 loser 중 null인 필드에 player2를 할당
+            if not attach_player2(game, player2):
+                return Response({"error": "Game was modified by another request."}, status=status.HTTP_409_CONFLICT)
+            return Response({"message": "Game updated successfully", "version": game.version}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        
+
+
+class GameBulkResultView(APIView):
+    """
+    GameBulkResultView는 여러 게임 결과를 한 번에 등록하는 API 엔드포인트를 제공합니다. (토너먼트, 오프라인 클라이언트 동기화)
+    - 요청 본문은 게임 결과 배열(또는 {"results": [...]})이며, 각 항목은 GameResultView.post와 같은
+      'winner', 'loser', 'game_mode'에 선택적으로 'player2'(이메일)를 받습니다. player1은 요청한 사용자입니다.
+    - player2가 주어지면 PATCH와 같이 비어 있는 winner/loser를 player2로 채우고, 전적/레이팅에 바로 반영합니다.
+    - 모든 이메일은 email__in 쿼리 한 번으로 조회하고, 유효한 항목은 한 트랜잭션에서 bulk_create로 저장합니다.
+    - 항목마다 {"index", "gameId"} 또는 {"index", "error"}를 반환합니다. (최대 BULK_MAX_RESULTS개)
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        items = request.data.get('results') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items or len(items) > BULK_MAX_RESULTS:
+            return Response({'error': f'Expected a list of 1 to {BULK_MAX_RESULTS} results.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        emails = {item.get(field) for item in items if isinstance(item, dict)
+                  for field in ('winner', 'loser', 'player2') if item.get(field)}
+        users = {user.email: user for user in AppUser.objects.filter(email__in=emails).only('id', 'email')}
+        modes = {choice[0] for choice in Game.GAME_MODE_CHOICES}
+
+        results = []
+        games = []
+        for index, item in enumerate(items):
+            try:
+                games.append((index, self.build_game(request.user, item, users, modes)))
+            except (InvalidGameModeException, ValueError) as e:
+                results.append({'index': index, 'error': str(e)})
+
+        with transaction.atomic():
+            created = Game.objects.bulk_create([game for _, game in games])
+            apply_game_results(created)
+        results.extend({'index': index, 'gameId': game.game_id} for (index, _), game in zip(games, created))
+        results.sort(key=lambda result: result['index'])
+
+        return Response({'created': len(created), 'results': results},
+                        status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+
+    @staticmethod
+    def build_game(player1, item, users, modes):
+        if not isinstance(item, dict):
+            raise ValueError('Each result must be an object.')
+
+        def resolve(field):
+            email = item.get(field)
+            if not email:
+                return None
+            if email not in users:
+                raise ValueError(f'{field} is not found.')
+            return users[email]
+
+        winner, loser, player2 = resolve('winner'), resolve('loser'), resolve('player2')
+        if winner is None and loser is None:
+            raise ValueError('Both winner and loser are required.')
+        if item.get('game_mode') not in modes:
+            raise InvalidGameModeException()
+        if player2 is not None:
+            # PATCH와 같이 winner와 loser 중 null인 필드에 player2를 할당
+            if winner is None:
+                winner = player2
+            elif loser is None:
+                loser = player2
+        if winner is not None and winner == loser:
+            raise ValueError('winner and loser must be different users.')
+        return Game(player1=player1, player2=player2, winner=winner, loser=loser, game_mode=item['game_mode'])
+
 
 class GameHistoryView(APIView):
+    """
+    GameHistoryView는 로그인한 사용자의 게임 히스토리를 최신순으로 조회하는 API 엔드포인트를 제공합니다.
+    - 'page'와 'pageSize' 쿼리 파라미터로 기존 페이지 번호 기반 페이지네이션을 지원합니다.
+    - 'cursor' 쿼리 파라미터가 주어지면 커서(keyset) 기반 페이지네이션으로 동작합니다.
+      첫 페이지는 빈 값('?cursor=')으로 요청하고, 이후에는 응답의 'nextCursor'('<played_at>,<game_id>')를 그대로 전달합니다.
+      페이지 깊이와 관계없이 (winner, played_at), (loser, played_at) 인덱스 범위만 읽으므로 응답 시간이 일정합니다.
+    - 커서 모드에서는 COUNT 쿼리를 생략하며, 'total=true'를 주면 전체 게임 수를 함께 반환합니다.
+    - 상대방 정보는 player1/player2를 조인하여 한 번의 쿼리로 가져옵니다.
+    - 'game_mode', 'opponent'(상대방 username 접두사, 대소문자 무시), 'from'/'to'(날짜 또는 ISO 8601 시각,
+      날짜만 주면 'to'는 그날 끝까지 포함) 쿼리 파라미터로 결과를 거를 수 있으며, 두 페이지네이션 방식 모두에 적용됩니다.
+      각 조건은 (winner|loser, game_mode, played_at), (winner|loser, 상대방, played_at) 인덱스와
+      user 테이블의 UPPER(username) 접두사 인덱스로 처리됩니다.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -98,9 +224,20 @@ class GameHistoryView(APIView):
             page_size = int(page_size)
         except ValueError:
             return Response({'error': 'Invalid page or pageSize'}, status=status.HTTP_400_BAD_REQUEST)
+        if page_size < 1:
+            return Response({'error': 'Invalid page or pageSize'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            filters = self.parse_filters(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         user = request.user
-        games = Game.objects.filter(Q(winner=user) | Q(loser=user)).order_by('-played_at')
+        games = self.get_queryset(user, **filters)
+
+        if 'cursor' in request.query_params:
+            return self.get_cursor_page(request, games, page_size)
+
         paginator = Paginator(games, page_size)
 
         try:
@@ -110,15 +247,7 @@ class GameHistoryView(APIView):
         except EmptyPage:
             return Response({'error': 'Page out of range'}, status=status.HTTP_404_NOT_FOUND)
 
-        games_data = [{
-            "id": game.game_id,
-            "other": (game.player2.username if game.player2 else "N/A") if game.player1 == user else (game.player1.username if game.player1 else "N/A"),
-            "other_img": game.player2.image.url if game.player2 is not None and game.player1 == user else game.player1.image.url if game.player1 is not None else None,
-            "winner": True if game.winner == user else False,
-            "game_mode": game.game_mode,
-            "played_at": game.played_at.strftime('%Y-%m-%d %H:%M:%S')
-        } for game in games_page]
-
+        games_data = [self.serialize_game(game, user) for game in games_page]
 
         return Response({
             'page': page,
@@ -126,4 +255,233 @@ class GameHistoryView(APIView):
             'total': paginator.count,
             'totalPages': paginator.num_pages,
             'games': games_data
-        })
\ No newline at end of file
+        })
+
+    def get_cursor_page(self, request, games, page_size):
+        user = request.user
+        cursor = request.query_params.get('cursor')
+        include_total = request.query_params.get('total', 'false').lower() == 'true'
+        total = games.count() if include_total else None
+
+        if cursor:
+            try:
+                played_at, game_id = self.decode_cursor(cursor)
+            except ValueError:
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+            games = games.filter(Q(played_at__lt=played_at) | Q(played_at=played_at, game_id__lt=game_id))
+
+        # 다음 페이지 존재 여부를 알기 위해 한 건을 더 조회
+        rows = list(games[:page_size + 1])
+        next_cursor = self.encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+
+        data = {
+            'pageSize': page_size,
+            'nextCursor': next_cursor,
+            'games': [self.serialize_game(game, user) for game in rows[:page_size]],
+        }
+        if include_total:
+            data['total'] = total
+        return Response(data)
+
+    @staticmethod
+    def parse_filters(query_params):
+        filters = {}
+        game_mode = query_params.get('game_mode')
+        if game_mode:
+            if game_mode not in dict(Game.GAME_MODE_CHOICES):
+                raise ValueError('Invalid game_mode')
+            filters['game_mode'] = game_mode
+        opponent = query_params.get('opponent', '').strip()
+        if opponent:
+            filters['opponent'] = opponent
+        for param in ('from', 'to'):
+            value = query_params.get(param)
+            if not value:
+                continue
+            try:
+                # parse_datetime은 날짜만 있는 값도 0시로 해석하므로 날짜를 먼저 확인
+                day = parse_date(value)
+                moment = None if day else parse_datetime(value.replace(' ', '+'))
+            except ValueError:
+                moment = day = None
+            if day is not None:
+                # 날짜만 주어지면 'from'은 그날 시작부터, 'to'는 그날 끝까지 (다음 날 0시 미만)
+                if param == 'from':
+                    filters['played_from'] = timezone_utils.make_aware(datetime.combine(day, time.min))
+                else:
+                    filters['played_before'] = timezone_utils.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+            elif moment is not None:
+                if timezone_utils.is_naive(moment):
+                    moment = timezone_utils.make_aware(moment)
+                filters['played_from' if param == 'from' else 'played_to'] = moment
+            else:
+                raise ValueError(f'Invalid {param}')
+        return filters
+
+    @staticmethod
+    def get_queryset(user, game_mode=None, opponent=None, played_from=None, played_to=None, played_before=None):
+        if opponent:
+            # 상대방 후보를 먼저 접두사 인덱스로 찾고, (winner, loser) / (loser, winner) 인덱스로 게임을 조회
+            opponents = AppUser.objects.filter(username__istartswith=opponent).values('id')
+            condition = Q(winner=user, loser__in=opponents) | Q(loser=user, winner__in=opponents)
+        else:
+            condition = Q(winner=user) | Q(loser=user)
+        games = Game.objects.filter(condition)
+        if game_mode:
+            games = games.filter(game_mode=game_mode)
+        if played_from:
+            games = games.filter(played_at__gte=played_from)
+        if played_to:
+            games = games.filter(played_at__lte=played_to)
+        if played_before:
+            games = games.filter(played_at__lt=played_before)
+        return (games
+                .select_related('player1', 'player2')
+                .only('game_id', 'winner', 'loser', 'game_mode', 'played_at', 'player1', 'player2',
+                      'player1__username', 'player1__image', 'player2__username', 'player2__image')
+                .order_by('-played_at', '-game_id'))
+
+    @staticmethod
+    def encode_cursor(game):
+        played_at = game.played_at.astimezone(timezone.utc)
+        return f"{played_at.strftime('%Y-%m-%dT%H:%M:%S.%fZ')},{game.game_id}"
+
+    @staticmethod
+    def decode_cursor(cursor):
+        played_at, game_id = cursor.rsplit(',', 1)
+        played_at = datetime.fromisoformat(played_at.strip().replace(' ', '+'))
+        if played_at.tzinfo is None:
+            raise ValueError('cursor must be timezone aware')
+        return played_at, int(game_id)
+
+    @staticmethod
+    def serialize_game(game, user):
+        other = game.player2 if game.player1_id == user.id else game.player1
+        return {
+            "id": game.game_id,
+            "other": other.username if other else "N/A",
+            "other_img": other.image.url if other is not None else None,
+            "winner": game.winner_id == user.id,
+            "game_mode": game.game_mode,
+            "played_at": game.played_at.strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+
+class GameHistoryExportView(APIView):
+    """
+    로그인한 사용자의 전체 게임 기록을 최신순으로 내려받는 API 엔드포인트입니다.
+    - 'format' 쿼리 파라미터로 'ndjson'(기본값) 또는 'csv'를 선택합니다.
+    - 페이지 단위 COUNT/OFFSET 없이 서버 측 커서로 읽은 행을 StreamingHttpResponse로 바로 흘려보냅니다.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+
+    def get(self, request):
+        export_format = request.accepted_renderer.format
+        response = StreamingHttpResponse(stream_export(request.user, export_format),
+                                         content_type=f'{request.accepted_renderer.media_type}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="games.{export_format}"'
+        # 프록시가 응답을 모아서 보내지 않도록 함
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class HeadToHeadView(APIView):
+    """
+    HeadToHeadView는 로그인한 사용자와 다른 사용자 사이의 상대 전적을 조회하는 API 엔드포인트를 제공합니다.
+    - 승/패와 game_mode별 전적은 게임 결과가 확정될 때 갱신되는 HeadToHead 집계에서 읽습니다.
+    - 'limit' 쿼리 파라미터로 최근 게임을 함께 반환합니다. (기본 10, 최대 H2H_MAX_GAMES)
+      최근 게임은 (winner, loser, played_at) 인덱스 범위만 읽습니다.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, user_id):
+        user = request.user
+        if user_id == user.id:
+            return Response({'error': 'Invalid user'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response({'error': 'Invalid limit'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(limit, 0), H2H_MAX_GAMES)
+
+        other = AppUser.objects.filter(id=user_id).only('id', 'username', 'image').first()
+        if other is None:
+            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        games = []
+        if limit:
+            # HeadToHead 집계와 같이 결과가 확정된(player2가 등록된) 게임만
+            games = (Game.objects.filter(Q(winner=user, loser=other) | Q(winner=other, loser=user), player2__isnull=False)
+                     .only('game_id', 'winner', 'game_mode', 'played_at')
+                     .order_by('-played_at', '-game_id')[:limit])
+        return Response({
+            'opponent': {
+                'id': other.id,
+                'username': other.username,
+                'img': other.image.url if other.image else None,
+            },
+            **head_to_head(user.id, other.id),
+            'games': [{
+                'id': game.game_id,
+                'winner': game.winner_id == user.id,
+                'game_mode': game.game_mode,
+                'played_at': game.played_at.strftime('%Y-%m-%d %H:%M:%S'),
+            } for game in games],
+        })
+
+
+class LeaderboardView(APIView):
+    """
+    LeaderboardView는 game_mode별 레이팅 순위를 조회하는 API 엔드포인트를 제공합니다.
+    - 'mode' 쿼리 파라미터로 게임 모드를 지정합니다. (기본 'normal')
+    - 'limit'명의 상위 순위를 'top'으로 반환합니다. (기본 10, 최대 LEADERBOARD['MAX_LIMIT'])
+    - 'around=me'를 주면 내 순위와 앞뒤 'k'명(기본 5, 최대 LEADERBOARD['MAX_AROUND'])을 'around'로 함께 반환합니다.
+    - 순위는 프로세스 내부에 정렬된 상태로 보관되므로 순위 조회는 O(log n)이며, DB 쿼리는 사용자 정보 조회 한 번입니다.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        game_mode = request.query_params.get('mode', 'normal')
+        if game_mode not in dict(Game.GAME_MODE_CHOICES):
+            return Response({'error': 'Invalid game mode'}, status=status.HTTP_400_BAD_REQUEST)
+        around = request.query_params.get('around')
+        if around not in (None, 'me'):
+            return Response({'error': 'around must be "me"'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', 10))
+            k = int(request.query_params.get('k', 5))
+        except ValueError:
+            return Response({'error': 'Invalid limit or k'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 0 or k < 0:
+            return Response({'error': 'Invalid limit or k'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(limit, settings.LEADERBOARD['MAX_LIMIT'])
+        k = min(k, settings.LEADERBOARD['MAX_AROUND'])
+
+        top = leaderboard.top(game_mode, limit)
+        nearby = leaderboard.around(game_mode, request.user.id, k) if around else []
+        users = AppUser.objects.only('id', 'username', 'image').in_bulk(
+            {user_id for _, user_id, _, _ in top + nearby})
+
+        data = {
+            'mode': game_mode,
+            'total': leaderboard.total(game_mode),
+            'top': [self.serialize_entry(entry, users) for entry in top],
+        }
+        if around:
+            data['around'] = [self.serialize_entry(entry, users) for entry in nearby]
+            data['rank'] = leaderboard.rank(game_mode, request.user.id)
+        return Response(data)
+
+    @staticmethod
+    def serialize_entry(entry, users):
+        rank, user_id, rating, games = entry
+        user = users.get(user_id)
+        return {
+            'rank': rank,
+            'id': user_id,
+            'username': user.username if user else 'N/A',
+            'img': user.image.url if user and user.image else None,
+            'rating': round(rating, 1),
+            'games': games,
+        }
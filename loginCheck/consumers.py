@@ -1,41 +1,140 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
 import json
-from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from friend.graph import friend_graph
+from friend.notifications import friend_notification_group_name
+from .presence import normalize_user_id, presence_group_name, registry, tracker
 
 CustomUser = get_user_model()
 
 
 class UserStatusConsumer(AsyncWebsocketConsumer):
+    """
+    친구 접속 상태를 전달하는 웹소켓 consumer입니다. (ws/friend/status)
+    - {"userid": [...]}: 요청한 사용자들의 접속 상태를 한 번 응답합니다. (기존 polling 방식)
+    - {"type": "subscribe", "userid": [...]}: 사용자들을 구독하고 현재 상태를 {"type": "subscribed", "statuses": {...}}로 응답합니다.
+      'userid'를 생략하면 친구 목록 전체를 구독합니다.
+      이후 구독한 사용자가 접속/해제할 때마다 {"type": "presence", "userid": id, "login": bool}를 push합니다.
+    - {"type": "unsubscribe", "userid": [...]}: 구독을 해제합니다.
+    """
+
     async def connect(self):
         user = self.scope["user"]
+        self.subscriptions = set()
         if user.is_authenticated:
+            tracker.ensure_heartbeat()
             await self.update_user_login_status(user, True)
             await self.accept()
 
     async def disconnect(self, close_code):
         user = self.scope["user"]
+        for user_id in self.subscriptions:
+            await self.channel_layer.group_discard(presence_group_name(user_id), self.channel_name)
+        self.subscriptions = set()
         if user.is_authenticated:
             await self.update_user_login_status(user, False)
 
     async def receive(self, text_data=None, bytes_data=None):
         if text_data:
             data = json.loads(text_data)
+            message_type = data.get('type')
             user_ids = data.get('userid', [])
-            login_statuses = await self.get_users_login_status(user_ids)
-            await self.send(text_data=json.dumps(login_statuses))
+            if message_type == 'subscribe':
+                if 'userid' not in data:
+                    # 대상을 주지 않으면 내 친구 전체를 구독
+                    user_ids = await self.get_friend_ids()
+                await self.subscribe(user_ids)
+            elif message_type == 'unsubscribe':
+                await self.unsubscribe(user_ids)
+            else:
+                login_statuses = await self.get_users_login_status(user_ids)
+                await self.send(text_data=json.dumps(login_statuses))
 
-    @sync_to_async
-    def update_user_login_status(self, user, status):
-        CustomUser.objects.filter(id=user.id).update(login=status)
+    async def subscribe(self, user_ids):
+        limit = settings.PRESENCE['MAX_SUBSCRIPTIONS']
+        for user_id in user_ids:
+            normalized = normalize_user_id(user_id)
+            if normalized is None or normalized in self.subscriptions:
+                continue
+            if len(self.subscriptions) >= limit:
+                break
+            await self.channel_layer.group_add(presence_group_name(normalized), self.channel_name)
+            self.subscriptions.add(normalized)
+        login_statuses = await self.get_users_login_status(user_ids)
+        await self.send(text_data=json.dumps({'type': 'subscribed', 'statuses': login_statuses}))
 
-    @sync_to_async
-    def get_users_login_status(self, user_ids):
-        statuses = {}
+    async def unsubscribe(self, user_ids):
+        removed = []
         for user_id in user_ids:
-            user = CustomUser.objects.get(id=user_id)
-            if user:
-                statuses[user_id] = user.login
-            else:
-                statuses[user_id] = False
+            normalized = normalize_user_id(user_id)
+            if normalized in self.subscriptions:
+                await self.channel_layer.group_discard(presence_group_name(normalized), self.channel_name)
+                self.subscriptions.discard(normalized)
+                removed.append(normalized)
+        await self.send(text_data=json.dumps({'type': 'unsubscribed', 'userid': removed}))
+
+    async def presence_update(self, event):
+        # Redis 채널 레이어(운영 환경)에서는 다른 프로세스에서 온 상태 변경도 이 레지스트리에 반영됨
+        # (InMemoryChannelLayer에서는 같은 프로세스의 변경만 전달됨)
+        registry.set(event['userid'], event['login'])
+        await self.send(text_data=json.dumps({
+            'type': 'presence',
+            'userid': event['userid'],
+            'login': event['login'],
+        }))
+
+    async def update_user_login_status(self, user, status):
+        # login/last_seen은 tracker가 주기적으로 모아서 기록하고, 실제 0↔1 전환만 구독자에게 알림
+        if status:
+            await database_sync_to_async(tracker.connect)(user.id, self.channel_name)
+            registry.set(user.id, True)
+        else:
+            await database_sync_to_async(tracker.disconnect)(user.id, self.channel_name)
+
+    @database_sync_to_async
+    def get_friend_ids(self):
+        return list(friend_graph.friend_ids(self.scope["user"].id))
+
+    async def get_users_login_status(self, user_ids):
+        # 레지스트리에 있는 id는 DB 없이 응답하고, 나머지는 id__in 쿼리 한 번으로 조회
+        statuses, cold = registry.lookup(user_ids)
+        if cold:
+            statuses = await database_sync_to_async(registry.get_many)(user_ids)
         return statuses
+
+
+class FriendNotificationConsumer(AsyncWebsocketConsumer):
+    """
+    친구 요청 알림을 전달하는 웹소켓 consumer입니다. (ws/friend/notifications)
+    - 연결하면 받은 친구 요청 수를 {"type": "pending", "count": n}으로 한 번 보냅니다.
+    - 이후 친구 요청을 보내거나/수락하거나/삭제할 때마다 커밋 이후
+      {"type": "friend", "event": "requested" | "accepted" | "deleted", "friendRequestId": id,
+       "userid": 요청한 사용자 id, "username": ..., "pending": 받은 친구 요청 수}를 push하므로
+      pending-friends/를 polling할 필요가 없습니다.
+    """
+
+    async def connect(self):
+        user = self.scope["user"]
+        self.group_name = None
+        if user.is_authenticated:
+            self.group_name = friend_notification_group_name(user.id)
+            await self.channel_layer.group_add(self.group_name, self.channel_name)
+            await self.accept()
+            count = await database_sync_to_async(friend_graph.pending_count)(user.id)
+            await self.send(text_data=json.dumps({'type': 'pending', 'count': count}))
+
+    async def disconnect(self, close_code):
+        if self.group_name:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def friend_event(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'friend',
+            'event': event['event'],
+            'friendRequestId': event['friendRequestId'],
+            'userid': event['userid'],
+            'username': event['username'],
+            'pending': event['pending'],
+        }))
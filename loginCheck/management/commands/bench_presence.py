@@ -0,0 +1,184 @@
+import asyncio
+import json
+import random
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ts.bench import percentile
+
+User = get_user_model()
+
+BENCH_PREFIX = 'bench_presence_'
+
+
+class QueryCounter:
+    """
+    모든 스레드(sync_to_async 스레드 포함)의 DB 커넥션에서 실행된 쿼리 수를 셉니다.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self):
+        connection.execute_wrappers.append(self)
+        connection_created.connect(self._on_connection_created, weak=False)
+
+    def uninstall(self):
+        connection_created.disconnect(self._on_connection_created)
+        if self in connection.execute_wrappers:
+            connection.execute_wrappers.remove(self)
+
+    def _on_connection_created(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def take(self):
+        with self._lock:
+            count, self.count = self.count, 0
+        return count
+
+
+class Command(BaseCommand):
+    help = ('ts.asgi.application + TokenAuthMiddleware + UserStatusConsumer를 프로세스 안에서 구동하여 '
+            '웹소켓 N개를 열고 상태 조회를 재생하며 지연 시간과 DB 쿼리 수를 측정합니다. (네트워크 사용 없음)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=200, help='동시에 열 웹소켓 수')
+        parser.add_argument('--rate', type=float, default=200, help='초당 전체 상태 조회 메시지 수')
+        parser.add_argument('--duration', type=float, default=10, help='상태 조회를 재생할 시간(초)')
+        parser.add_argument('--ids-per-query', type=int, default=20, help='메시지 하나에 담을 user id 수')
+        parser.add_argument('--timeout', type=float, default=5, help='응답 대기 시간(초)')
+        parser.add_argument('--keep-users', action='store_true', help='측정용 사용자를 지우지 않음')
+
+    def handle(self, *args, **options):
+        users = self.create_users(options['connections'])
+        counter = QueryCounter()
+        counter.install()
+        try:
+            report = asyncio.run(self.run(users, counter, options))
+        finally:
+            counter.uninstall()
+            if not options['keep_users']:
+                User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+        self.print_report(report)
+
+    def create_users(self, count):
+        existing = set(User.objects.filter(username__startswith=BENCH_PREFIX).values_list('username', flat=True))
+        User.objects.bulk_create([
+            User(username=f'{BENCH_PREFIX}{i}', email=f'{BENCH_PREFIX}{i}@bench.local', password='!')
+            for i in range(count) if f'{BENCH_PREFIX}{i}' not in existing
+        ])
+        return list(User.objects.filter(username__startswith=BENCH_PREFIX).order_by('id')[:count])
+
+    async def run(self, users, counter, options):
+        from ts.asgi import application
+
+        user_ids = [user.id for user in users]
+        tokens = [str(AccessToken.for_user(user)) for user in users]
+        timeout = options['timeout']
+
+        # 1. 연결
+        counter.take()
+        connect_latencies = []
+
+        async def open_socket(token):
+            communicator = WebsocketCommunicator(application, f'/ws/friend/status?token={token}')
+            started = time.perf_counter()
+            connected, _ = await communicator.connect(timeout=timeout)
+            connect_latencies.append(time.perf_counter() - started)
+            return communicator if connected else None
+
+        started = time.perf_counter()
+        sockets = await asyncio.gather(*(open_socket(token) for token in tokens))
+        connect_elapsed = time.perf_counter() - started
+        sockets = [socket for socket in sockets if socket is not None]
+        connect_queries = counter.take()
+
+        # 2. 상태 조회 재생
+        round_trips = []
+        errors = 0
+
+        async def query(socket):
+            nonlocal errors
+            sample = random.sample(user_ids, min(options['ids_per_query'], len(user_ids)))
+            started = time.perf_counter()
+            try:
+                await socket.send_to(text_data=json.dumps({'userid': sample}))
+                await socket.receive_from(timeout=timeout)
+            except Exception:
+                errors += 1
+                return
+            round_trips.append(time.perf_counter() - started)
+
+        # 한 소켓에서 응답이 섞이지 않도록 소켓별로 요청을 직렬화
+        locks = {id(socket): asyncio.Lock() for socket in sockets}
+
+        async def locked_query(socket):
+            async with locks[id(socket)]:
+                await query(socket)
+
+        tasks = []
+        interval = 1 / options['rate'] if options['rate'] > 0 else 0
+        started = time.perf_counter()
+        deadline = started + options['duration']
+        next_at = started
+        while sockets and time.perf_counter() < deadline:
+            tasks.append(asyncio.ensure_future(locked_query(random.choice(sockets))))
+            next_at += interval
+            await asyncio.sleep(max(0, next_at - time.perf_counter()))
+        await asyncio.gather(*tasks)
+        query_elapsed = time.perf_counter() - started
+        query_queries = counter.take()
+
+        # 3. 연결 종료
+        await asyncio.gather(*(socket.disconnect() for socket in sockets))
+        from loginCheck.presence import tracker
+        await sync_to_async(tracker.flush)()
+        disconnect_queries = counter.take()
+
+        return {
+            'connections': len(sockets),
+            'failed_connections': len(tokens) - len(sockets),
+            'connect_elapsed': connect_elapsed,
+            'connect_latencies': connect_latencies,
+            'connect_queries': connect_queries,
+            'messages': len(round_trips),
+            'errors': errors,
+            'query_elapsed': query_elapsed,
+            'round_trips': round_trips,
+            'query_queries': query_queries,
+            'disconnect_queries': disconnect_queries,
+        }
+
+    def print_report(self, report):
+        def ms(values, p):
+            return f'{percentile(values, p) * 1000:.2f}ms'
+
+        messages = report['messages']
+        self.stdout.write(f"connections: {report['connections']} (failed {report['failed_connections']}), "
+                          f"{report['connect_elapsed']:.2f}s")
+        self.stdout.write(f"connect latency p50={ms(report['connect_latencies'], 50)} "
+                          f"p95={ms(report['connect_latencies'], 95)} p99={ms(report['connect_latencies'], 99)}")
+        self.stdout.write(f"connect DB queries: {report['connect_queries']} "
+                          f"({report['connect_queries'] / max(report['connections'], 1):.2f}/connection)")
+        self.stdout.write(f"messages: {messages} (errors {report['errors']}), "
+                          f"{messages / max(report['query_elapsed'], 1e-9):.1f} msg/s")
+        self.stdout.write(f"round trip p50={ms(report['round_trips'], 50)} "
+                          f"p95={ms(report['round_trips'], 95)} p99={ms(report['round_trips'], 99)}")
+        self.stdout.write(f"query DB queries: {report['query_queries']} "
+                          f"({report['query_queries'] / max(messages, 1):.2f}/message)")
+        self.stdout.write(f"disconnect DB queries: {report['disconnect_queries']}")
@@ -5,6 +5,7 @@ from urllib.parse import parse_qs
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django.contrib.auth import get_user_model
+from account.authentication import get_cached_user
 
 
 @database_sync_to_async
@@ -12,7 +13,9 @@ def get_user_from_token(token):
     try:
         access_token = AccessToken(token)
         user_id = access_token['user_id']
-        user = get_user_model().objects.get(id=user_id)
+        user = get_cached_user(user_id)
+        if not user.is_active:
+            return AnonymousUser()
         return user
     except (InvalidToken, TokenError, get_user_model().DoesNotExist):
         return AnonymousUser()
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:21
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PresenceConnection',
+            fields=[
+                ('channel_name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('worker_id', models.CharField(max_length=100)),
+                ('connected_at', models.DateTimeField(auto_now_add=True)),
+                ('last_heartbeat', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='presence_connections', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'presence_connection',
+                'indexes': [models.Index(fields=['worker_id'], name='presence_conn_worker_idx'), models.Index(fields=['last_heartbeat'], name='presence_conn_heartbeat_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,26 @@
 from django.db import models
+from django.contrib.auth import get_user_model
+from django.utils import timezone
 
-# Create your models here.
+AppUser = get_user_model()
+
+
+class PresenceConnection(models.Model):
+    """
+    열려 있는 웹소켓 연결 하나를 나타냅니다.
+    - 여러 daphne 프로세스가 공유하는 접속 상태 저장소로, 사용자별 연결 수를 이 테이블의 행 수로 계산합니다.
+    - 각 프로세스는 자신의 worker_id로 last_heartbeat를 주기적으로 갱신하며,
+      갱신이 끊긴 연결(비정상 종료된 워커)은 sweeper가 정리합니다.
+    """
+    channel_name = models.CharField(max_length=255, primary_key=True)
+    user = models.ForeignKey(AppUser, related_name='presence_connections', on_delete=models.CASCADE)
+    worker_id = models.CharField(max_length=100)
+    connected_at = models.DateTimeField(auto_now_add=True)
+    last_heartbeat = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'presence_connection'
+        indexes = [
+            models.Index(fields=['worker_id'], name='presence_conn_worker_idx'),
+            models.Index(fields=['last_heartbeat'], name='presence_conn_heartbeat_idx'),
+        ]
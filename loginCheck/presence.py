@@ -0,0 +1,246 @@
+import asyncio
+import atexit
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import timedelta
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from account.authentication import invalidate_cached_user
+from ts.cache import LRUTTLCache
+from .models import PresenceConnection
+
+logger = logging.getLogger(__name__)
+
+CustomUser = get_user_model()
+
+
+def normalize_user_id(user_id):
+    try:
+        return int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+
+class PresenceRegistry:
+    """
+    프로세스 내부의 접속 상태(presence) 레지스트리입니다.
+    - 이 프로세스의 connect/disconnect에서 갱신된 상태와, DB에서 읽어온 상태를 CACHE_TTL초 동안 보관합니다.
+    - 레지스트리에 없는 id(cold)만 모아 id__in 쿼리 한 번으로 조회합니다.
+    - 존재하지 않거나 잘못된 id는 오프라인(False)으로 응답합니다.
+    """
+
+    def __init__(self, maxsize=None, ttl=None):
+        self._cache = LRUTTLCache(
+            maxsize=maxsize or settings.PRESENCE['CACHE_SIZE'],
+            ttl=ttl or settings.PRESENCE['CACHE_TTL'],
+        )
+
+    def set(self, user_id, online):
+        self._cache.set(user_id, online)
+
+    def lookup(self, user_ids):
+        """
+        레지스트리만으로 응답 가능한 상태와, DB 조회가 필요한 id 목록을 반환합니다.
+        """
+        statuses = {}
+        cold = set()
+        for user_id in user_ids:
+            normalized = normalize_user_id(user_id)
+            if normalized is None:
+                statuses[user_id] = False
+                continue
+            online = self._cache.get(normalized)
+            if online is None:
+                cold.add(normalized)
+            else:
+                statuses[user_id] = online
+        return statuses, cold
+
+    def load(self, user_ids):
+        """
+        cold id들의 상태를 DB에서 한 번에 읽어 레지스트리에 채웁니다. (동기 함수)
+        """
+        found = dict(CustomUser.objects.filter(id__in=user_ids).values_list('id', 'login'))
+        for user_id in user_ids:
+            online = found.get(user_id, False)
+            self._cache.set(user_id, online)
+        return found
+
+    def get_many(self, user_ids):
+        statuses, cold = self.lookup(user_ids)
+        if cold:
+            found = self.load(cold)
+            for user_id in user_ids:
+                if user_id not in statuses:
+                    statuses[user_id] = found.get(normalize_user_id(user_id), False)
+        return statuses
+
+
+registry = PresenceRegistry()
+
+
+def presence_group_name(user_id):
+    return f'presence_{user_id}'
+
+
+class PresenceWriteBuffer:
+    """
+    접속 상태가 바뀐 사용자를 모아두는 write-behind 버퍼입니다.
+    - 한 flush 주기 동안 같은 사용자의 connect/disconnect가 여러 번 일어나도 한 번만 기록됩니다.
+    - 사용자별로 마지막 이벤트 시각을 보관하여 last_seen으로 씁니다.
+    """
+
+    def __init__(self):
+        self._dirty = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._dirty)
+
+    def mark(self, user_id, seen_at=None):
+        with self._lock:
+            self._dirty[user_id] = seen_at or timezone.now()
+
+    def drain(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        return dirty
+
+
+class PresenceTracker:
+    """
+    사용자별 웹소켓 연결 수를 PresenceConnection 테이블로 관리합니다.
+    - 여러 탭/여러 daphne 프로세스의 연결을 모두 세며, 연결 수가 0↔1로 바뀔 때만 User.login이 바뀝니다.
+    - connect/disconnect는 연결 행만 쓰고 사용자를 버퍼에 표시합니다. User.login/last_seen은
+      FLUSH_INTERVAL마다 버퍼의 사용자를 모아 bulk update로 반영되므로, 재접속이 몰려도 user 테이블 쓰기는
+      주기당 사용자별 한 번으로 합쳐집니다.
+    - login 값은 flush 시점의 연결 유무로 다시 계산하므로, 주기 안에서 접속/해제를 반복(flap)해도 최종 상태만 기록됩니다.
+    - 각 프로세스는 HEARTBEAT_INTERVAL마다 자신의 연결을 갱신하고, CONNECTION_TTL 동안 갱신되지 않은
+      연결(비정상 종료된 워커)을 정리합니다.
+    - 정상 종료 시(atexit) 이 프로세스의 연결을 지우고 버퍼를 flush합니다.
+    """
+
+    def __init__(self, worker_id=None):
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.buffer = PresenceWriteBuffer()
+        self._tasks = []
+        self._local_channels = set()
+
+    @staticmethod
+    def _has_connection():
+        return Exists(PresenceConnection.objects.filter(user_id=OuterRef('pk')))
+
+    def connect(self, user_id, channel_name):
+        self._local_channels.add(channel_name)
+        # channel_name은 연결마다 고유하므로 조회 없이 바로 insert
+        PresenceConnection.objects.create(channel_name=channel_name, user_id=user_id, worker_id=self.worker_id)
+        self.buffer.mark(user_id)
+
+    def disconnect(self, user_id, channel_name):
+        PresenceConnection.objects.filter(channel_name=channel_name).delete()
+        self._local_channels.discard(channel_name)
+        self.buffer.mark(user_id)
+
+    def flush(self):
+        """
+        버퍼에 모인 사용자의 login/last_seen을 한 번에 기록합니다.
+        온라인으로 바뀐 user_id 목록과 오프라인으로 바뀐 user_id 목록을 반환합니다.
+        """
+        dirty = self.buffer.drain()
+        if not dirty:
+            return [], []
+        try:
+            rows = (CustomUser.objects.filter(id__in=dirty)
+                    .annotate(online=self._has_connection())
+                    .values_list('id', 'login', 'online'))
+            users = []
+            went_online, went_offline = [], []
+            for user_id, login, online in rows:
+                if online != login:
+                    (went_online if online else went_offline).append(user_id)
+                users.append(CustomUser(id=user_id, login=online, last_seen=dirty[user_id]))
+            CustomUser.objects.bulk_update(users, ['login', 'last_seen'], batch_size=500)
+        except Exception:
+            # 기록하지 못한 사용자는 다음 주기에 다시 시도
+            for user_id, seen_at in dirty.items():
+                self.buffer.mark(user_id, seen_at)
+            raise
+        invalidate_cached_user(*dirty)
+        return went_online, went_offline
+
+    def heartbeat(self):
+        return PresenceConnection.objects.filter(worker_id=self.worker_id).update(last_heartbeat=timezone.now())
+
+    def sweep(self):
+        """
+        만료된 연결을 지우고, login 값이 실제 연결 유무와 어긋난 사용자를 버퍼에 넣어 flush합니다.
+        (다른 프로세스의 flush와 겹쳐 잘못 기록된 상태도 여기서 바로잡힙니다.)
+        """
+        cutoff = timezone.now() - timedelta(seconds=settings.PRESENCE['CONNECTION_TTL'])
+        stale = PresenceConnection.objects.filter(last_heartbeat__lt=cutoff)
+        candidates = set(stale.values_list('user_id', flat=True))
+        stale.delete()
+        candidates.update(CustomUser.objects.filter(login=True).exclude(self._has_connection()).values_list('id', flat=True))
+        candidates.update(CustomUser.objects.filter(login=False).filter(self._has_connection()).values_list('id', flat=True))
+        for user_id in candidates:
+            self.buffer.mark(user_id)
+        return self.flush()
+
+    def shutdown(self):
+        if not self._local_channels and not len(self.buffer):
+            return
+        try:
+            connections = PresenceConnection.objects.filter(worker_id=self.worker_id)
+            for user_id in set(connections.values_list('user_id', flat=True)):
+                self.buffer.mark(user_id)
+            connections.delete()
+            self._local_channels.clear()
+            self.flush()
+        except DatabaseError:
+            logger.exception('presence shutdown flush failed')
+
+    def ensure_heartbeat(self):
+        """현재 이벤트 루프에서 flush/heartbeat 작업이 돌고 있지 않으면 시작합니다."""
+        loop = asyncio.get_running_loop()
+        if any(not task.done() and task.get_loop() is loop for task in self._tasks):
+            return
+        self._tasks = [
+            loop.create_task(self._periodic('FLUSH_INTERVAL', self.flush)),
+            loop.create_task(self._periodic('HEARTBEAT_INTERVAL', self._heartbeat_and_sweep)),
+        ]
+
+    def _heartbeat_and_sweep(self):
+        self.heartbeat()
+        return self.sweep()
+
+    async def _periodic(self, interval, func):
+        channel_layer = get_channel_layer()
+        while True:
+            await asyncio.sleep(settings.PRESENCE[interval])
+            try:
+                went_online, went_offline = await database_sync_to_async(func)()
+            except Exception:
+                logger.exception('presence %s failed', func.__name__)
+                continue
+            for status, user_ids in ((True, went_online), (False, went_offline)):
+                for user_id in user_ids:
+                    registry.set(user_id, status)
+                    await channel_layer.group_send(presence_group_name(user_id), {
+                        'type': 'presence.update',
+                        'userid': user_id,
+                        'login': status,
+                    })
+
+
+tracker = PresenceTracker()
+atexit.register(tracker.shutdown)
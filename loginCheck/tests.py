@@ -1,3 +1,173 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from account.models import User
+from friend.graph import friend_graph
+from .middleware import TokenAuthMiddleware
+from .models import PresenceConnection
+from .presence import PresenceRegistry, PresenceTracker, tracker
+from .urls import websocket_urlpatterns
+
+
+class PresenceRegistryTest(TestCase):
+    def setUp(self):
+        self.online = User.objects.create_user('online', 'online@test.com', 'password')
+        self.offline = User.objects.create_user('offline', 'offline@test.com', 'password')
+        User.objects.filter(id=self.online.id).update(login=True)
+        self.registry = PresenceRegistry(maxsize=100, ttl=60)
+
+    def test_cold_ids_are_loaded_in_one_query(self):
+        ids = [self.online.id, str(self.offline.id), 999999, 'abc']
+        with self.assertNumQueries(1):
+            statuses = self.registry.get_many(ids)
+        # 요청한 키 그대로 응답하며, 없는 id와 잘못된 id는 오프라인
+        self.assertEqual(statuses, {self.online.id: True, str(self.offline.id): False, 999999: False, 'abc': False})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.registry.get_many(ids), statuses)
+
+    def test_local_updates_are_served_from_registry(self):
+        self.registry.set(self.offline.id, True)
+        with self.assertNumQueries(1):
+            statuses = self.registry.get_many([self.online.id, self.offline.id])
+        self.assertEqual(statuses, {self.online.id: True, self.offline.id: True})
+
+        self.assertEqual(self.registry.lookup([self.online.id, self.offline.id]),
+                         ({self.online.id: True, self.offline.id: True}, set()))
+
+
+class PresenceTrackerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('user', 'user@test.com', 'password')
+        # 서로 다른 daphne 프로세스 두 개를 흉내냄
+        self.worker_a = PresenceTracker(worker_id='worker-a')
+        self.worker_b = PresenceTracker(worker_id='worker-b')
+
+    def login(self):
+        self.user.refresh_from_db(fields=['login'])
+        return self.user.login
+
+    def test_multiple_tabs_stay_online_until_last_disconnect(self):
+        self.worker_a.connect(self.user.id, 'tab-1')
+        self.worker_b.connect(self.user.id, 'tab-2')
+        self.assertEqual(self.worker_a.flush(), ([self.user.id], []))
+
+        self.worker_a.disconnect(self.user.id, 'tab-1')
+        self.assertEqual(self.worker_a.flush(), ([], []))
+        self.assertTrue(self.login())
+
+        self.worker_b.disconnect(self.user.id, 'tab-2')
+        self.assertEqual(self.worker_b.flush(), ([], [self.user.id]))
+        self.assertFalse(self.login())
+
+    def test_flush_coalesces_flaps_into_one_write(self):
+        for i in range(10):
+            self.worker_a.connect(self.user.id, f'tab-{i}')
+            self.worker_a.disconnect(self.user.id, f'tab-{i}')
+        self.worker_a.connect(self.user.id, 'tab-last')
+
+        # SELECT 한 번 + bulk UPDATE 한 번
+        with self.assertNumQueries(2):
+            self.assertEqual(self.worker_a.flush(), ([self.user.id], []))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.login)
+        self.assertIsNotNone(self.user.last_seen)
+
+    def test_sweep_removes_connections_of_crashed_worker(self):
+        self.worker_a.connect(self.user.id, 'tab-1')
+        self.worker_a.flush()
+        PresenceConnection.objects.update(last_heartbeat=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(self.worker_b.sweep(), ([], [self.user.id]))
+        self.assertFalse(self.login())
+        self.assertFalse(PresenceConnection.objects.exists())
+
+    def test_heartbeat_keeps_connections_alive(self):
+        self.worker_a.connect(self.user.id, 'tab-1')
+        self.worker_a.flush()
+        PresenceConnection.objects.update(last_heartbeat=timezone.now() - timedelta(hours=1))
+        self.worker_a.heartbeat()
+
+        self.assertEqual(self.worker_b.sweep(), ([], []))
+        self.assertTrue(self.login())
+
+    def test_shutdown_flushes_buffered_state(self):
+        self.worker_a.connect(self.user.id, 'tab-1')
+        self.worker_a.shutdown()
+
+        self.assertFalse(self.login())
+        self.assertIsNotNone(User.objects.get(id=self.user.id).last_seen)
+        self.assertFalse(PresenceConnection.objects.exists())
+
+
+@override_settings(PRESENCE={**settings.PRESENCE, 'FLUSH_INTERVAL': 0.05})
+class UserStatusConsumerTest(TransactionTestCase):
+    def tearDown(self):
+        # 테스트 DB가 지워지기 전에 남은 버퍼를 기록
+        tracker.flush()
+
+    def communicator(self, user):
+        application = TokenAuthMiddleware(websocket_urlpatterns)
+        return WebsocketCommunicator(application, f'/ws/friend/status?token={AccessToken.for_user(user)}')
+
+    async def test_subscriber_receives_only_real_transitions(self):
+        watcher, user = await sync_to_async(lambda: [
+            User.objects.create_user(name, f'{name}@test.com', 'password') for name in ('watcher', 'user')
+        ])()
+        watcher_socket = self.communicator(watcher)
+        await watcher_socket.connect()
+        await watcher_socket.send_to(text_data=json.dumps({'type': 'subscribe', 'userid': [user.id]}))
+        snapshot = json.loads(await watcher_socket.receive_from())
+        self.assertEqual(snapshot, {'type': 'subscribed', 'statuses': {str(user.id): False}})
+
+        tab1, tab2 = self.communicator(user), self.communicator(user)
+        await tab1.connect()
+        await tab2.connect()
+        self.assertEqual(json.loads(await watcher_socket.receive_from())['login'], True)
+        self.assertTrue(await watcher_socket.receive_nothing())
+
+        await tab1.disconnect()
+        self.assertTrue(await watcher_socket.receive_nothing())
+        await tab2.disconnect()
+        self.assertEqual(json.loads(await watcher_socket.receive_from())['login'], False)
+
+        await watcher_socket.disconnect()
+
+
+class FriendNotificationConsumerTest(TransactionTestCase):
+    def setUp(self):
+        friend_graph.clear()
+
+    async def test_request_and_accept_are_pushed_after_commit(self):
+        alice, bob = await sync_to_async(lambda: [
+            User.objects.create_user(name, f'{name}@test.com', 'password') for name in ('alice', 'bob')
+        ])()
+        application = TokenAuthMiddleware(websocket_urlpatterns)
+        sockets = {}
+        for user in (alice, bob):
+            sockets[user.id] = WebsocketCommunicator(
+                application, f'/ws/friend/notifications?token={AccessToken.for_user(user)}')
+            await sockets[user.id].connect()
+            self.assertEqual(json.loads(await sockets[user.id].receive_from()), {'type': 'pending', 'count': 0})
+
+        def post(user, url, data):
+            client = APIClient()
+            client.force_authenticate(user)
+            return client.post(url, data, format='json')
+
+        await sync_to_async(post)(alice, '/api/friend/send-friend-request/', {'user_id': bob.id})
+        event = json.loads(await sockets[bob.id].receive_from())
+        self.assertEqual((event['event'], event['userid'], event['pending']), ('requested', alice.id, 1))
+
+        await sync_to_async(post)(bob, '/api/friend/accept-friend-request/',
+                                  {'friend_request_id': event['friendRequestId']})
+        self.assertEqual(json.loads(await sockets[bob.id].receive_from())['pending'], 0)
+        for socket in sockets.values():
+            await socket.disconnect()
@@ -1,8 +1,12 @@
 from django.urls import path
 from channels.routing import URLRouter
-from .consumers import UserStatusConsumer
+from game.consumers import GameConsumer, MatchmakingConsumer
+from .consumers import FriendNotificationConsumer, UserStatusConsumer
 
 websocket_urlpatterns = URLRouter([
     path("ws/friend/status", UserStatusConsumer.as_asgi()),
+    path("ws/friend/notifications", FriendNotificationConsumer.as_asgi()),
+    path("ws/game/matchmaking", MatchmakingConsumer.as_asgi()),
+    path("ws/game/play/<int:game_id>", GameConsumer.as_asgi()),
     # 추가 웹소켓 경로 설정
 ])
\ No newline at end of file
@@ -0,0 +1,7 @@
+def percentile(values, p):
+    """벤치마크 명령어에서 사용하는 백분위수 (가장 가까운 순위, 값이 없으면 0)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUTTLCache:
+    """
+    프로세스 내부에서 사용하는 크기 제한(LRU) + 만료 시간(TTL) 캐시입니다.
+    - 여러 스레드(DRF 워커, sync_to_async 스레드)에서 동시에 접근해도 안전하도록 잠금을 사용합니다.
+    - 프로세스 간 공유되지 않으므로, 다른 프로세스에서 일어난 변경은 최대 ttl초 동안 반영되지 않을 수 있습니다.
+    - hits/misses 카운터로 적중률을 확인할 수 있습니다.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # invalidate가 일어날 때마다 증가하며, 로딩 중에 무효화된 값이 캐시에 저장되는 것을 막습니다.
+        self._generation = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key, default=None, count=True):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > self.clock():
+                    self._data.move_to_end(key)
+                    if count:
+                        self.hits += 1
+                    return value
+                del self._data[key]
+            if count:
+                self.misses += 1
+            return default
+
+    def set(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, loader):
+        """
+        캐시에 값이 없으면 loader()로 읽어와 저장합니다.
+        loader()가 None을 반환하면 저장하지 않습니다.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        generation = self._generation
+        value = loader()
+        if value is not None:
+            self.set(key, value, generation=generation)
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+    def invalidate_matching(self, predicate):
+        """predicate(key)가 참인 모든 항목을 무효화합니다. (전체 항목을 훑으므로 키를 알 수 없을 때만 사용)"""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
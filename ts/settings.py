@@ -34,9 +34,10 @@ environ.Env.read_env(os.path.join(BASE_DIR, 'private-resources', ".env"))
 SECRET_KEY = env('DJANGO_SECRET_KEY')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# 운영 환경에서는 .env에 DEBUG=False와 ALLOWED_HOSTS를 지정합니다.
+DEBUG = env('DEBUG')
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', default=[])
 
 # Application definition
 
@@ -64,6 +65,27 @@ INSTALLED_APPS = [
 # asgi application setting
 ASGI_APPLICATION = "ts.asgi.application"
 
+# channels layer setting (presence 구독, 친구 알림, 게임 프레임 등 그룹 메시지 전달에 사용)
+# InMemoryChannelLayer는 한 프로세스 안에서만 전달되므로, daphne 워커가 여러 개인 운영 환경(DEBUG=False)에서는
+# Redis 채널 레이어를 사용합니다. 기본값은 docker-compose의 redis 서비스(호스트 포트 16379)이며,
+# 개발/테스트에서도 REDIS_URL을 주면 Redis를 사용합니다.
+REDIS_URL = env('REDIS_URL', default='' if DEBUG else 'redis://127.0.0.1:16379/0')
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [REDIS_URL],
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+
 AUTH_USER_MODEL = 'account.User'
 REST_USE_JWT = True
 LOGIN_URL = "/account/login/"
@@ -71,7 +93,7 @@ APPEND_SLASH = False
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'account.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -93,6 +115,12 @@ SIMPLE_JWT = {
     "USER_AUTHENTICATION_RULE": "rest_framework_simplejwt.authentication.default_user_authentication_rule",
 }
 
+# JWT 인증 시 사용하는 프로세스 내부 사용자 캐시 (account.authentication)
+USER_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,  # 초
+}
+
 MIDDLEWARE = [
     'ts.middleware.CustomExceptionHandlerMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # 추가
@@ -219,3 +247,78 @@ EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD')
 EMAIL_USE_TLS = True
 # TLS 보완 방법
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+
+# 인증 메일 outbox 워커 설정 (account.outbox)
+EMAIL_OUTBOX = {
+    'AUTOSTART': not TESTING,  # 커밋 후 프로세스 내부 워커 스레드를 자동으로 실행
+    'BATCH_SIZE': 50,
+    'POLL_INTERVAL': 5,  # 초
+    'LEASE': 60,  # 초, 가져간 행을 다른 워커가 가져가지 않는 시간
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE': 5,  # 초
+    'BACKOFF_MAX': 600,  # 초
+}
+
+# 웹소켓 접속 상태(presence) 설정 (loginCheck.presence)
+PRESENCE = {
+    'CACHE_SIZE': 100000,
+    'CACHE_TTL': 30,  # 초
+    'MAX_SUBSCRIPTIONS': 1000,  # 웹소켓 하나가 구독할 수 있는 최대 사용자 수
+    'FLUSH_INTERVAL': 1,  # 초, 버퍼에 모인 접속 상태 변경을 user 테이블에 기록하는 주기
+    'HEARTBEAT_INTERVAL': 15,  # 초, 프로세스가 자신의 연결을 갱신하는 주기
+    'CONNECTION_TTL': 60,  # 초, 이 시간 동안 갱신되지 않은 연결은 끊긴 것으로 간주
+}
+
+# 친구 관계 캐시 설정 (friend.graph)
+FRIEND_GRAPH = {
+    'CACHE_SIZE': 50000,
+    'TTL': 60,  # 초
+    'SUGGESTION_TTL': 60,  # 초, 친구 추천/공통 친구 결과를 재사용하는 시간
+    'SUGGESTION_LIMIT': 50,  # 친구 추천 최대 개수
+}
+
+# 게임 모드별 Elo 레이팅 설정 (game.rating)
+RATING = {
+    'INITIAL': 1500,
+    'K_FACTOR': 32,
+}
+
+# 레이팅 순위표 설정 (game.leaderboard)
+LEADERBOARD = {
+    'TTL': 300,  # 초, 다른 프로세스의 레이팅 변경을 반영하기 위해 순위를 다시 읽는 주기
+    'MAX_LIMIT': 100,  # top에 포함할 수 있는 최대 인원
+    'MAX_AROUND': 50,  # 내 순위 앞뒤로 포함할 수 있는 최대 인원
+}
+
+# 매치메이킹 설정 (game.matchmaking)
+MATCHMAKING = {
+    'INITIAL_WINDOW': 50,  # 대기열에 들어온 직후 허용하는 레이팅 차이
+    'WIDEN_PER_SECOND': 10,  # 대기 1초마다 넓어지는 레이팅 차이
+    'MAX_WINDOW': 400,
+    'SWEEP_INTERVAL': 0.5,  # 초, 넓어진 허용 범위로 대기열을 다시 확인하는 주기
+}
+
+# 서버 게임 엔진 설정 (game.engine), 필드 크기는 가로/세로 1 기준
+GAME_ENGINE = {
+    'KEYFRAME_INTERVAL': 60,  # 틱, 이 주기마다 바뀌지 않은 필드까지 모두 보냄
+    'MODES': {
+        'normal': {'TICK_RATE': 60, 'BALL_SPEED': 0.6, 'BALL_ACCEL': 1.05, 'MAX_BALL_SPEED': 1.5,
+                   'PADDLE_SPEED': 1.2, 'PADDLE_HEIGHT': 0.2, 'WIN_SCORE': 5, 'OBSTACLE': False},
+        'speed': {'TICK_RATE': 120, 'BALL_SPEED': 1.2, 'BALL_ACCEL': 1.08, 'MAX_BALL_SPEED': 3.0,
+                  'PADDLE_SPEED': 1.8, 'PADDLE_HEIGHT': 0.2, 'WIN_SCORE': 5, 'OBSTACLE': False},
+        'object': {'TICK_RATE': 60, 'BALL_SPEED': 0.6, 'BALL_ACCEL': 1.05, 'MAX_BALL_SPEED': 1.5,
+                   'PADDLE_SPEED': 1.2, 'PADDLE_HEIGHT': 0.2, 'WIN_SCORE': 5, 'OBSTACLE': True},
+    },
+}
+
+# 게임 결과 생성 Idempotency-Key 설정 (game.idempotency)
+IDEMPOTENCY = {
+    'TTL': 24 * 60 * 60,  # 초, 이 시간이 지난 키는 재사용할 수 있고 purge_idempotency_keys로 지워짐
+}
+
+# game 테이블 월 단위 파티션 설정 (game.partitions, PostgreSQL 전용)
+GAME_PARTITIONS = {
+    'MONTHS_AHEAD': 3,  # create_game_partitions가 미리 만들어 두는 이후 개월 수
+    'HOT_MONTHS': 12,  # 이번 달을 포함해 game 테이블에 남겨 두는 개월 수, 이전 파티션은 집계 후 분리
+    'ARCHIVE_SCHEMA': 'archive',  # 분리한 파티션을 옮겨 두는 스키마
+}